@@ -1,239 +1,142 @@
 import streamlit as st
-import pulp
-import pandas as pd
 import math
-import io
-from collections import defaultdict
+import os
+import uuid
+from functools import partial
+
+from diagnostics import PhaseTimer, log_record, peak_memory_mb
+from patterns import WEEKS, get_pattern_registry, patterns_for_services, weekly_demand
+from scenario_store import ScenarioStore
+from solve_cache import CACHEABLE_STATUSES, SolveCache, scenario_fingerprint
+from solve_service import FINISHED_STATES, JOB_DONE, JOB_FAILED, JOB_QUEUED, ServiceBusy, SolveService
+from solvers import BACKEND_LABELS, FAST_BACKEND, FAST_BACKEND_LABEL, STATUS_FEASIBLE, available_backends
+
+# ARRANQUE EN FRÍO: la primera pintura solo carga streamlit, numpy y los
+# patrones. Los módulos pesados (pandas, altair, PuLP a través de
+# optimizer / roster / sweep / horizon, openpyxl a través de export) se
+# importan en la sección que los usa, al resolver, descargar o abrir un
+# expander ('benchmarks/bench_startup.py' mide el objetivo).
+
+# Nombre de cada backend en los resultados (incluida la vía rápida sin solver)
+SOLVER_LABELS = {**BACKEND_LABELS, FAST_BACKEND: FAST_BACKEND_LABEL}
+
+# --- CACHÉS POR PROCESO (compartidas entre sesiones y reruns) ---
+@st.cache_resource
+def get_solve_cache():
+    """Caché LRU de resoluciones. OPTIMIZER_CACHE_DIR activa el nivel en disco."""
+    return SolveCache(
+        max_entries=int(os.environ.get("OPTIMIZER_CACHE_SIZE", "256")),
+        disk_dir=os.environ.get("OPTIMIZER_CACHE_DIR") or None,
+    )
+
+@st.cache_resource
+def get_scenario_store():
+    """
+    Histórico persistente de escenarios (SQLite) compartido por todas las
+    sesiones. OPTIMIZER_STORE_PATH: ruta del fichero (por defecto
+    'escenarios.sqlite'; vacío lo desactiva).
+    """
+    path = os.environ.get("OPTIMIZER_STORE_PATH", "escenarios.sqlite")
+    return ScenarioStore(path) if path else None
 
-# --- FUNCIÓN 1: SIN CAMBIOS ---
-def generate_3week_patterns():
+def export_and_log(df, fmt, session_id):
     """
-    Genera TODOS los patrones de trabajo posibles que se pueden
-    realizar en 3 semanas de trabajo (1 finde libre).
-    
-    Devuelve: { "display_str": {"pulp": (Sáb/sem, Dom/sem), "components": (s,d,c)} }
+    Genera el fichero al pulsar descargar y registra cuánto tardó. Se
+    devuelven bytes: st.download_button guarda el fichero completo en
+    memoria para servirlo, así que un fichero temporal no ahorra nada.
     """
-    pattern_map = {}
-    # s = sábados solos, d = domingos solos, c = fines de semana completos
-    for c in range(4): # 0, 1, 2, 3
-        for s in range(4): # 0, 1, 2, 3
-            for d in range(4): # 0, 1, 2, 3
-                
-                total_weekends_worked = s + d + c
-                
-                if total_weekends_worked > 0 and total_weekends_worked <= 3:
-                    
-                    # Aporte SEMANAL (promedio sobre las 3 semanas de trabajo)
-                    # NOTA: Este valor "pulp" ya no se usa en el modelo, pero se mantiene
-                    # para no alterar la estructura de datos.
-                    avg_s = (s + c) / 3.0
-                    avg_d = (d + c) / 3.0
-                    
-                    pulp_tuple = (avg_s, avg_d)
-                    components = (s, d, c)
-                    
-                    parts = []
-                    if s > 0: parts.append(f"{s} Sáb. solo(s)")
-                    if d > 0: parts.append(f"{d} Dom. solo(s)")
-                    if c > 0: parts.append(f"{c} Finde(s) Completo(s)")
-                    
-                    display_str = ", ".join(parts)
-
-                    if display_str:
-                        pattern_map[display_str] = {
-                            "pulp": pulp_tuple, # Clave "pulp" ya no se usa en el modelo
-                            "components": components,
-                            "work_weeks": total_weekends_worked
-                        }
-                        
-    return pattern_map
-
-# --- FUNCIÓN 2: SIN CAMBIOS ---
-def generate_schedule_df(results_vars, employee_types_data, master_map):
+    from export import export_schedule_bytes
+
+    timer = PhaseTimer()
+    with timer.phase("export"):
+        data = export_schedule_bytes(df, fmt)
+    log_record({
+        "event": "exportar", "session": session_id, "format": fmt, "rows": len(df), "bytes": len(data),
+        "phases": timer.phases, "peak_memory_mb": peak_memory_mb(),
+    })
+    return data
+
+def demand_label(demand, day):
+    """'116/sáb' si la demanda es igual todas las semanas; si no, el valor de cada semana."""
+    weekly = list(weekly_demand(demand).values())
+    if len(set(weekly)) == 1:
+        return f"{weekly[0]}/{day}"
+    return f"{day}: " + " · ".join(str(n) for n in weekly)
+
+def apply_pattern_set(patterns_by_type):
+    """Callback: deja en los selectores de patrones solo los del conjunto mínimo (antes de pintarlos)."""
+    for type_name, labels in patterns_by_type.items():
+        options = patterns_for_services(st.session_state.get(f"serv_{type_name}", 4))
+        st.session_state[f"multi_{type_name}"] = [label for label in options if label in labels]
+
+@st.cache_resource
+def get_solve_service():
     """
-    Genera la plantilla de turnos detallada.
-    LA LÓGICA DE ASIGNACIÓN AQUÍ DEBE SER IDÉNTICA A LA
-    DE 'precalculate_contributions' PARA QUE EL MODELO FUNCIONE.
+    Servicio de resolución compartido por todas las sesiones.
+    OPTIMIZER_SOLVE_WORKERS: procesos resolutores (por defecto, nº de núcleos).
+    OPTIMIZER_SOLVE_QUEUE: trabajos que pueden esperar en cola (por defecto 32).
     """
-    schedule_rows = []
-    weeks = [1, 2, 3, 4]
-    week_cols_final = [f"Semana {w}" for w in weeks]
-
-    id_counters = defaultdict(int)
-    temp_rows = []
-
-    for type_name in employee_types_data.keys():
-        for pattern_str in employee_types_data[type_name]["selected_patterns"]:
-            for rest_week in weeks:
-                # Usamos round() y luego int() por seguridad con los floats de PuLP
-                num_empleados = int(round(results_vars[type_name][pattern_str][rest_week].value()))
-                
-                if num_empleados > 0:
-                    for i in range(num_empleados):
-                        id_counters[type_name] += 1
-                        employee_index = id_counters[type_name]
-                        
-                        temp_rows.append({
-                            "type_name": type_name,
-                            "pattern_str": pattern_str,
-                            "rest_week": rest_week,
-                            "id": f"{type_name}-{employee_index}",
-                            "sort_key": employee_index
-                        })
-
-    temp_rows.sort(key=lambda x: x["sort_key"])
-
-    for emp in temp_rows:
-        final_row = {
-            "ID Empleado": emp["id"],
-            "Tipo": f"Tipo {emp['type_name']}",
-            "Patrón Asignado": emp["pattern_str"]
-        }
-        
-        s, d, c = master_map[emp["pattern_str"]]["components"]
-        
-        work_weeks = [w for w in weeks if w != emp["rest_week"]]
-        
-        work_schedule = {}
-        
-        # --- Lógica de asignación determinística (DEBE SER IDÉNTICA A LA PRECALCULADA) ---
-        weeks_for_c = work_weeks[:c]
-        for wk in weeks_for_c:
-            work_schedule[wk] = "Finde Completo"
-        
-        available_weeks = [w for w in work_weeks if w not in work_schedule][:s]
-        for wk in available_weeks:
-            work_schedule[wk] = "Sábado"
-
-        available_weeks = [w for w in work_weeks if w not in work_schedule][:d]
-        for wk in available_weeks:
-            work_schedule[wk] = "Domingo"
-        
-        available_weeks = [w for w in work_weeks if w not in work_schedule]
-        for wk in available_weeks:
-            work_schedule[wk] = "Descanso" 
-        # --- Fin de la lógica de asignación ---
-
-        for w in weeks:
-            col_name = f"Semana {w}"
-            if w == emp["rest_week"]:
-                final_row[col_name] = "Descanso (LIBRE)"
-            else:
-                final_row[col_name] = work_schedule[w]
-        
-        schedule_rows.append(final_row)
-
-    if not schedule_rows:
-        return pd.DataFrame()
+    return SolveService(
+        max_workers=int(os.environ.get("OPTIMIZER_SOLVE_WORKERS", "0")) or None,
+        max_queue=int(os.environ.get("OPTIMIZER_SOLVE_QUEUE", "32")),
+    )
 
-    df = pd.DataFrame(schedule_rows)
-    
-    cols_order = ["ID Empleado", "Tipo", "Patrón Asignado"] + week_cols_final
-    if not all(col in df.columns for col in cols_order):
-        # Fallback si df está vacío o columnas no coinciden
-        df = pd.DataFrame(columns=cols_order)
-    else:
-        df = df.reindex(columns=cols_order) 
-
-    total_s_trab = {"ID Empleado": "TOTAL SÁB. TRABAJADOS (Semana)"}
-    total_d_trab = {"ID Empleado": "TOTAL DOM. TRABAJADOS (Semana)"}
-    total_finde_desc = {"ID Empleado": "TOTAL FINDES DESCANSO (Semana)"}
-    
-    for col_name in week_cols_final:
-        if col_name in df:
-            total_s_trab[col_name] = (df[col_name] == 'Sábado').sum() + (df[col_name] == 'Finde Completo').sum()
-            total_d_trab[col_name] = (df[col_name] == 'Domingo').sum() + (df[col_name] == 'Finde Completo').sum()
-            total_finde_desc[col_name] = (df[col_name] == 'Descanso').sum() + (df[col_name] == 'Descanso (LIBRE)').sum()
-        else:
-            total_s_trab[col_name] = 0; total_d_trab[col_name] = 0; total_finde_desc[col_name] = 0
-
-    totals_df = pd.DataFrame([total_s_trab, total_d_trab, total_finde_desc])
-    # Usamos concat en lugar de append (deprecated)
-    df = pd.concat([df, totals_df], ignore_index=True)
-
-    total_s_mes = sum(total_s_trab[col] for col in week_cols_final)
-    total_d_mes = sum(total_d_trab[col] for col in week_cols_final)
-    
-    gt_s = {"ID Empleado": "GRAN TOTAL SÁBADOS (Mes)", f"Semana 1": total_s_mes}
-    gt_d = {"ID Empleado": "GRAN TOTAL DOMINGOS (Mes)", f"Semana 1": total_d_mes}
-    
-    for col in week_cols_final[1:] + ["Tipo", "Patrón Asignado"]:
-        if col not in gt_s: gt_s[col] = ""
-        if col not in gt_d: gt_d[col] = ""
-
-    gt_df = pd.DataFrame([gt_s, gt_d])
-    df = pd.concat([df, gt_df], ignore_index=True)
-    
-    return df
-
-# --- FUNCIÓN 3: NUEVA FUNCIÓN DE PRECÁLCULO (LA CORRECCIÓN CLAVE) ---
-def precalculate_contributions(master_pattern_map, weeks_list):
+def start_task(job_key, context, fn, *args, **kwargs):
     """
-    Precalcula la contribución EXACTA (Sáb, Dom) para cada patrón,
-    cada semana de descanso posible, y cada semana del mes.
-    
-    Usa la MISMA lógica de asignación que 'generate_schedule_df'.
-    
-    Devuelve: { pattern_str: { rest_week: { week: (s_contrib, d_contrib) } } }
+    Envía una tarea larga (barrido, ...) al servicio de resolución, como
+    "Calcular": el script no se bloquea y la tarea usa el pool del
+    servicio. Cancela la tarea anterior de la misma sección. 'context' se
+    guarda con el trabajo y se pasa a 'on_done' en 'show_task'.
     """
-    contribution_map = {}
-    
-    for pattern_str, data in master_pattern_map.items():
-        s, d, c = data["components"]
-        contribution_map[pattern_str] = {}
-        
-        for rest_week in weeks_list:
-            contribution_map[pattern_str][rest_week] = {}
-            work_weeks = [w for w in weeks_list if w != rest_week]
-            
-            work_schedule = {} # {semana: "Sábado" | "Domingo" | "Finde Completo" | "Descanso"}
-            
-            # --- Lógica de asignación determinística (IDÉNTICA A LA DE generate_schedule_df) ---
-            weeks_for_c = work_weeks[:c]
-            for wk in weeks_for_c:
-                work_schedule[wk] = "Finde Completo"
-            
-            available_weeks = [w for w in work_weeks if w not in work_schedule][:s]
-            for wk in available_weeks:
-                work_schedule[wk] = "Sábado"
+    service = get_solve_service()
+    previous = st.session_state.pop(job_key, None)
+    if previous:
+        service.cancel(previous["job_id"])
+    try:
+        st.session_state[job_key] = {**context, "job_id": service.submit_task(fn, *args, **kwargs)}
+    except ServiceBusy:
+        st.session_state[f"{job_key}_error"] = (
+            "El servidor está atendiendo demasiadas resoluciones; inténtelo de nuevo en unos segundos."
+        )
 
-            available_weeks = [w for w in work_weeks if w not in work_schedule][:d]
-            for wk in available_weeks:
-                work_schedule[wk] = "Domingo"
-            
-            available_weeks = [w for w in work_weeks if w not in work_schedule]
-            for wk in available_weeks:
-                work_schedule[wk] = "Descanso"
-            # --- Fin de la lógica de asignación ---
-            
-            # Rellenar el mapa de contribución para las 4 semanas
-            for w in weeks_list:
-                if w == rest_week:
-                    # Está descansando esta semana
-                    contribution_map[pattern_str][rest_week][w] = (0, 0)
-                else:
-                    # Está trabajando, ver qué le toca
-                    assignment = work_schedule[w]
-                    s_contrib = 1 if (assignment == "Sábado" or assignment == "Finde Completo") else 0
-                    d_contrib = 1 if (assignment == "Domingo" or assignment == "Finde Completo") else 0
-                    contribution_map[pattern_str][rest_week][w] = (s_contrib, d_contrib)
-                    
-    return contribution_map
-
-# --- FUNCIÓN 4: SIN CAMBIOS (antes 3) ---
-def convert_df_to_excel(df):
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        df.to_excel(writer, index=False, sheet_name='Plantilla_Turnos')
-        worksheet = writer.sheets['Plantilla_Turnos']
-        # Ajustar ancho de columnas
-        for i, col in enumerate(df.columns):
-            column_len = max(df[col].astype(str).map(len).max(), len(col)) + 2
-            # Proteger contra columnas vacías que dan error en max()
-            if pd.isna(column_len):
-                column_len = len(col) + 2
-            worksheet.column_dimensions[chr(65 + i)].width = column_len
-    return output.getvalue()
+@st.fragment(run_every=0.5)
+def task_progress(job_key, unit, on_done):
+    """Progreso de una tarea de 'start_task'; al terminar llama a on_done(resultado, trabajo) y relanza la app."""
+    job = st.session_state.get(job_key)
+    if job is None:
+        return
+    service = get_solve_service()
+    snapshot = service.poll(job["job_id"])
+
+    if snapshot is None or snapshot["state"] in FINISHED_STATES:
+        del st.session_state[job_key]
+        if snapshot is None:
+            st.session_state[f"{job_key}_error"] = "La tarea caducó antes de terminar."
+        elif snapshot["state"] == JOB_FAILED:
+            st.session_state[f"{job_key}_error"] = f"Error en la tarea: {snapshot['error']}"
+        elif snapshot["state"] == JOB_DONE:
+            on_done(snapshot["result"], job)
+        st.rerun()
+
+    progress = snapshot["progress"]
+    if snapshot["state"] == JOB_QUEUED:
+        st.info(f"⏳ En cola (posición {snapshot['position']}) · esperando {snapshot['wait']:.1f} s")
+    elif progress and len(progress) == 2:
+        done, total = progress
+        st.progress(done / total if total else 1.0, text=f"{done}/{total} {unit} · {snapshot['elapsed']:.1f} s")
+    else:
+        st.info(f"⚙️ {progress[0] if progress else 'Calculando…'} ({snapshot['elapsed']:.1f} s)")
+    if st.button("Cancelar", key=f"{job_key}_cancel"):
+        service.cancel(job["job_id"])
+        del st.session_state[job_key]
+        st.rerun()
+
+def show_task(job_key, unit, on_done):
+    """Progreso de la tarea de la sección (si hay una en curso) y su error, si falló."""
+    if job_key in st.session_state:
+        task_progress(job_key, unit, on_done)
+    if f"{job_key}_error" in st.session_state:
+        st.error(st.session_state.pop(f"{job_key}_error"))
 
 # --- CONFIGURACIÓN DE LA PÁGINA WEB ---
 st.set_page_config(page_title="Optimizador de Plantilla", layout="wide")
@@ -251,18 +154,59 @@ st.title("Optimizador de Plantilla de Fin de Semana (Cobertura Semanal)")
 st.write("Esta herramienta calcula la plantilla mínima para cubrir la demanda **cada semana**, asumiendo que cada empleado rota un fin de semana libre al mes.")
 
 # --- DATOS GLOBALES PARA EL MODELO (SECCIÓN MODIFICADA) ---
-master_pattern_map = generate_3week_patterns()
-WEEKS = [1, 2, 3, 4]
-# Precalcular el mapa de contribución EXACTA
-CONTRIBUTION_MAP = precalculate_contributions(master_pattern_map, WEEKS)
+# Registro de patrones (ids, componentes y contribución EXACTA), memorizado para todo el proceso.
+# La interfaz trabaja con los textos de los patrones; el modelo y los resultados, con sus ids.
+PATTERNS = get_pattern_registry()
+
+# --- AJUSTES DEL SOLVER (BARRA LATERAL) ---
+with st.sidebar:
+    st.header("Ajustes del solver")
+    solver_backend = st.selectbox(
+        "Solver", available_backends(), format_func=lambda backend: BACKEND_LABELS[backend],
+        help="HiGHS aparece si está instalado el paquete 'highspy'."
+    )
+    solver_threads = st.number_input("Hilos (0 = por defecto)", min_value=0, value=0, step=1)
+    solver_time_limit = st.number_input(
+        "Límite de tiempo (s, 0 = sin límite)", min_value=0, value=0, step=5,
+        help="Al agotarse se muestra la mejor solución encontrada hasta ese momento."
+    )
+    solver_gap_pct = st.number_input("Gap relativo para parar (%)", min_value=0.0, value=0.0, step=0.5)
+
+    SOLVER_OPTIONS = {
+        "backend": solver_backend,
+        "threads": solver_threads or None,
+        "time_limit": solver_time_limit or None,
+        "gap_rel": solver_gap_pct / 100 if solver_gap_pct else None,
+    }
 
 # --- ENTRADAS DEL USUARIO (SECCIÓN MODIFICADA) ---
 config_expander = st.expander("Configuración de Demanda y Empleados", expanded=True)
 with config_expander:
     st.header("Parámetros de Entrada")
 
+    SEDE = st.text_input(
+        "Sede", value="", key="site_name",
+        help="Identifica el escenario en el histórico (opcional).",
+    ).strip()
+
     DEMANDA_SABADO = st.number_input("Plazas necesarias por Sábado (cada semana)", min_value=0, value=116, step=1)
     DEMANDA_DOMINGO = st.number_input("Plazas necesarias por Domingo (cada semana)", min_value=0, value=81, step=1)
+
+    if st.checkbox("Demanda distinta por semana", key="per_week_demand"):
+        import pandas as pd
+
+        weekly_demand_df = st.data_editor(
+            pd.DataFrame({"Semana": WEEKS, "Sábado": DEMANDA_SABADO, "Domingo": DEMANDA_DOMINGO}),
+            hide_index=True,
+            disabled=["Semana"],
+            key="weekly_demand_editor",
+            column_config={
+                "Sábado": st.column_config.NumberColumn(min_value=0, step=1),
+                "Domingo": st.column_config.NumberColumn(min_value=0, step=1),
+            },
+        ).fillna(0)
+        DEMANDA_SABADO = dict(zip(WEEKS, weekly_demand_df["Sábado"].astype(int)))
+        DEMANDA_DOMINGO = dict(zip(WEEKS, weekly_demand_df["Domingo"].astype(int)))
     
     st.markdown("---")
 
@@ -283,12 +227,7 @@ with config_expander:
             key=f"serv_{type_name}"
         )
         
-        filtered_options = []
-        for pattern_str, data in master_pattern_map.items():
-            s, d, c = data["components"]
-            total_services = s + d + (c * 2)
-            if total_services == services_per_employee:
-                filtered_options.append(pattern_str)
+        filtered_options = patterns_for_services(services_per_employee)
         
         if filtered_options:
             selected_display_options = st.multiselect(
@@ -309,129 +248,246 @@ with config_expander:
         }
 
 # --- BOTÓN DE CÁLCULO ---
+# La resolución se envía al servicio de resolución (procesos aparte) y el
+# script no se bloquea: un fragmento consulta el trabajo hasta que termina.
+session_id = st.session_state.setdefault("diag_session", uuid.uuid4().hex[:12])
+
 if st.button("Calcular Plantilla Óptima", type="primary"):
+    st.session_state.pop("solve_error", None)
+    previous_job = st.session_state.pop("solve_job", None)
+    if previous_job:
+        get_solve_service().cancel(previous_job["job_id"])
+
+    solve_inputs = {
+        "demanda_sabado": DEMANDA_SABADO,
+        "demanda_domingo": DEMANDA_DOMINGO,
+        "employee_types_data": employee_types_data,
+        "site": SEDE,
+        "cache_key": scenario_fingerprint(
+            DEMANDA_SABADO, DEMANDA_DOMINGO, employee_types_data, gap_rel=SOLVER_OPTIONS["gap_rel"]
+        ),
+    }
+    lookup_timer = PhaseTimer()
+    with lookup_timer.phase("cache_lookup"):
+        cached_result = get_solve_cache().get(solve_inputs["cache_key"])
+    stored_run = None
+    store = get_scenario_store()
+    if cached_result is None and store is not None:
+        # Escenario idéntico resuelto en otra sesión (o en otro mes): sin resolver
+        with lookup_timer.phase("store_lookup"):
+            stored_run = store.lookup(solve_inputs["cache_key"])
+        if stored_run is not None:
+            cached_result = stored_run.pop("result")
+            get_solve_cache().put(solve_inputs["cache_key"], cached_result)
+
+    if cached_result is not None:
+        st.session_state["completed_solve"] = {
+            **solve_inputs, "result": cached_result, "from_cache": True, "phases": lookup_timer.phases,
+            "stored_run": stored_run,
+        }
+    else:
+        # Cota de la relajación LP (milisegundos, sin PuLP): se muestra mientras resuelve el MIP
+        from fast_path import lp_lower_bound
+
+        with lookup_timer.phase("lp_bound"):
+            lp_bound = lp_lower_bound(DEMANDA_SABADO, DEMANDA_DOMINGO, employee_types_data)
+        try:
+            # Última solución óptima de la sesión como arranque en caliente
+            job_id = get_solve_service().submit(
+                DEMANDA_SABADO, DEMANDA_DOMINGO, employee_types_data,
+                warm_start=st.session_state.get("last_solution_x"), solver_options=SOLVER_OPTIONS,
+            )
+            st.session_state["solve_job"] = {
+                **solve_inputs, "job_id": job_id, "phases": lookup_timer.phases, "lp_bound": lp_bound,
+            }
+        except ServiceBusy:
+            st.session_state["solve_error"] = (
+                "El servidor está atendiendo demasiadas resoluciones; inténtelo de nuevo en unos segundos."
+            )
 
-    # Totales mensuales de demanda (para el resumen)
-    TOTAL_DEMANDA_SABADO = DEMANDA_SABADO * 4
-    TOTAL_DEMANDA_DOMINGO = DEMANDA_DOMINGO * 4
 
-    model = pulp.LpProblem("Minimizar_Plantilla_Fin_de_Semana_Semanal", pulp.LpMinimize)
+@st.fragment(run_every=0.5)
+def solve_progress():
+    """Progreso del trabajo en curso; al terminar relanza la app para mostrar el resultado."""
+    job = st.session_state.get("solve_job")
+    if job is None:
+        return
+    service = get_solve_service()
+    snapshot = service.poll(job["job_id"])
+
+    if snapshot is None or snapshot["state"] in FINISHED_STATES:
+        del st.session_state["solve_job"]
+        if snapshot is None:
+            st.session_state["solve_error"] = "El trabajo de resolución caducó antes de terminar."
+        elif snapshot["state"] == JOB_FAILED:
+            st.session_state["solve_error"] = f"Error al resolver: {snapshot['error']}"
+        elif snapshot["state"] == JOB_DONE:
+            result = snapshot["result"]
+            if result["status"] in CACHEABLE_STATUSES:
+                get_solve_cache().put(job["cache_key"], result)
+            phases = dict(job["phases"], queue=snapshot["wait"], job=snapshot["elapsed"])
+            store = get_scenario_store()
+            run_id = None
+            if store is not None:
+                run_id = store.save(
+                    job["cache_key"], job["site"], job["demanda_sabado"], job["demanda_domingo"],
+                    job["employee_types_data"], result,
+                )
+            st.session_state["completed_solve"] = {
+                **job, "result": result, "from_cache": False, "phases": phases, "run_id": run_id,
+            }
+        st.rerun()
 
-    # Variables (sin cambios)
-    N_vars = pulp.LpVariable.dicts("TotalEmpleados", employee_type_names, lowBound=0, cat='Integer')
+    if snapshot["state"] == JOB_QUEUED:
+        st.info(f"⏳ En cola (posición {snapshot['position']}) · esperando {snapshot['wait']:.1f} s")
+    else:
+        st.info(f"⚙️ Resolviendo… {snapshot['elapsed']:.1f} s")
+    lp_bound = job["lp_bound"]
+    if lp_bound["infeasible"]:
+        st.caption("La relajación LP ya es infactible: no hay plantilla que cubra la demanda con estos máximos.")
+    else:
+        st.caption(f"Cota inferior (relajación LP): se necesitan al menos {lp_bound['bound']} empleados.")
+    if st.button("Cancelar cálculo"):
+        service.cancel(job["job_id"])
+        del st.session_state["solve_job"]
+        st.rerun()
 
-    x_vars = {}
-    for type_name in employee_type_names:
-        x_vars[type_name] = {}
-        for pattern_str in employee_types_data[type_name]["selected_patterns"]:
-            x_vars[type_name][pattern_str] = pulp.LpVariable.dicts(
-                name=f"Empleados_{type_name}_{pattern_str[:10].replace(' ', '_')}",
-                indices=WEEKS, 
-                lowBound=0,
-                cat='Integer'
-            )
 
-    # Objetivo (sin cambios)
-    model += pulp.lpSum(N_vars), "Minimizar_Plantilla_Total"
+if "solve_job" in st.session_state:
+    solve_progress()
+if "solve_error" in st.session_state:
+    st.error(st.session_state.pop("solve_error"))
 
-    # -----------------------------------------------------------------
-    # --- RESTRICCIONES (SECCIÓN CORREGIDA) ---
-    # -----------------------------------------------------------------
-    
-    # Restricciones de cobertura (UNA POR CADA SEMANA Y DÍA)
-    for w in WEEKS:
-        # Cobertura de Sábados para la semana 'w'
-        model += pulp.lpSum(
-            # Sumar la contribución de este grupo
-            x_vars[type_name][pattern_str][rest_week] * # Multiplicada por su contribución EXACTA en la semana 'w'
-            CONTRIBUTION_MAP[pattern_str][rest_week][w][0] # [0] es Sábado
-            
-            for type_name in employee_type_names
-            for pattern_str in employee_types_data[type_name]["selected_patterns"]
-            for rest_week in WEEKS # Sumar sobre TODAS las semanas de descanso
-        ) >= DEMANDA_SABADO, f"Cobertura_Sabado_Semana_{w}"
-
-        # Cobertura de Domingos para la semana 'w'
-        model += pulp.lpSum(
-            x_vars[type_name][pattern_str][rest_week] * CONTRIBUTION_MAP[pattern_str][rest_week][w][1] # [1] es Domingo
-            
-            for type_name in employee_type_names
-            for pattern_str in employee_types_data[type_name]["selected_patterns"]
-            for rest_week in WEEKS
-        ) >= DEMANDA_DOMINGO, f"Cobertura_Domingo_Semana_{w}"
+completed = st.session_state.pop("completed_solve", None)
+if completed is not None:
+    import pandas as pd
 
-    # Restricciones de vínculo y máximos (sin cambios)
-    for type_name in employee_type_names:
-        model += pulp.lpSum(
-            x_vars[type_name][pattern_str][rest_week]
-            for pattern_str in employee_types_data[type_name]["selected_patterns"]
-            for rest_week in WEEKS
-        ) == N_vars[type_name], f"Vinculo_Plantilla_{type_name}"
-        
-        model += N_vars[type_name] <= employee_types_data[type_name]["max_employees"], f"Maximo_Empleados_{type_name}"
-    
-    # -----------------------------------------------------------------
-    # --- FIN DE LA CORRECCIÓN DE RESTRICCIONES ---
-    # -----------------------------------------------------------------
+    from export import EXPORT_FORMATS, available_formats
+    from schedule import generate_schedule_df
 
-    model.solve(pulp.PULP_CBC_CMD(msg=0))
+    # Entradas con las que se resolvió (pueden haber cambiado mientras esperaba)
+    solved_sabado = completed["demanda_sabado"]
+    solved_domingo = completed["demanda_domingo"]
+    solved_types = completed["employee_types_data"]
+    solved_type_names = list(solved_types)
+    result = completed["result"]
+    from_cache = completed["from_cache"]
 
+    # Totales mensuales de demanda (para el resumen)
+    TOTAL_DEMANDA_SABADO = sum(weekly_demand(solved_sabado).values())
+    TOTAL_DEMANDA_DOMINGO = sum(weekly_demand(solved_domingo).values())
+
+    timer = PhaseTimer()
+    for phase_name, seconds in completed["phases"].items():
+        timer.add(phase_name, seconds)
+    if not from_cache:
+        # Desglose medido dentro de solve_model
+        for phase_name, seconds in result["timings"].items():
+            timer.add(phase_name, seconds)
+    schedule_rows = None
+
+    if result["status"] in ('Optimal', STATUS_FEASIBLE):
+        st.session_state["last_solution_x"] = result["x"]
+        # Solución a la que se asigna el roster (sección propia, sobrevive a los reruns)
+        st.session_state["roster_solution"] = {"x": result["x"], "employee_types_data": solved_types, "N": result["N"]}
+        st.session_state.pop("roster_result", None)
     # --- MOSTRAR RESULTADOS (SECCIÓN CORREGIDA) ---
     st.header("Resultados de la Optimización")
-    status = pulp.LpStatus[model.status]
+    status = result["status"]
     st.write(f"**Estado de la Solución:** {status}")
+    stored_run = completed.get("stored_run")
+    if stored_run is not None:
+        st.caption(
+            f"💾 Resultado recuperado del histórico: ejecución #{stored_run['id']} "
+            f"({stored_run['site'] or 'sin sede'}, {stored_run['created_at']})."
+        )
+    elif from_cache:
+        st.caption("⚡ Resultado recuperado de la caché (escenario ya resuelto).")
+    else:
+        if completed.get("run_id") is not None:
+            st.caption(f"💾 Guardado en el histórico como ejecución #{completed['run_id']}.")
+        solver_stats = result.get("solver")
+        # La vía rápida no construye el modelo ni llama al solver: solo se muestra su fase
+        fast_path_used = solver_stats is not None and solver_stats["backend"] == FAST_BACKEND
+        if fast_path_used:
+            st.caption(
+                f"{FAST_BACKEND_LABEL}: {result['timings']['fast_path']:.3f} s "
+                "(sin construir el modelo ni llamar al solver)"
+            )
+        else:
+            st.caption(
+                f"Construcción del modelo: {result['timings']['build']:.3f} s · "
+                f"Resolución: {result['timings']['solve']:.3f} s"
+            )
+        lp_bound = result.get("lp_bound") or {}
+        if lp_bound.get("bound") is not None and result["objective"] is not None:
+            reached = round(result["objective"]) <= lp_bound["bound"]
+            st.caption(
+                f"Cota inferior (relajación LP): ≥ {lp_bound['bound']} empleados · "
+                + ("la solución la alcanza (óptimo demostrado por la cota)." if reached
+                   else f"la solución queda a {round(result['objective']) - lp_bound['bound']} de la cota.")
+            )
+        if solver_stats and not fast_path_used:
+            gap_txt = f"{solver_stats['gap'] * 100:.2f} %" if solver_stats["gap"] is not None else "—"
+            bound_txt = f"{solver_stats['best_bound']:.2f}" if solver_stats["best_bound"] is not None else "—"
+            nodes_txt = solver_stats["nodes"] if solver_stats["nodes"] is not None else "—"
+            threads_txt = solver_stats.get("threads") or "por defecto"
+            st.caption(
+                f"Solver {SOLVER_LABELS[solver_stats['backend']]} · hilos: {threads_txt} · nodos: {nodes_txt} · "
+                f"mejor cota: {bound_txt} · gap: {gap_txt} · tiempo: {solver_stats['wall_time']:.3f} s"
+            )
+        warm_start_msg = {
+            "skipped_solver": "♻️ Arranque en caliente: la solución anterior, reparada, alcanza la cota inferior (óptima sin ejecutar CBC).",
+            "mip_start": "♻️ Arranque en caliente: la solución anterior, reparada, se usó como solución inicial de CBC.",
+            "repair_failed": "No se pudo adaptar la solución anterior; se resolvió desde cero.",
+            "fast_incumbent": "La vía rápida no pudo certificar el óptimo; su solución se usó como solución inicial de CBC.",
+        }.get(result.get("warm_start"))
+        if warm_start_msg:
+            st.caption(warm_start_msg)
+
+    if status == STATUS_FEASIBLE:
+        st.warning(
+            "**Mejor solución encontrada dentro del límite de tiempo o del gap del solver.** Es válida "
+            "(cubre la demanda) pero no se ha demostrado que sea la mínima; consulte el gap arriba."
+        )
 
-    if status == 'Optimal':
-        total_empleados = pulp.value(model.objective)
+    if status in ('Optimal', STATUS_FEASIBLE):
+        total_empleados = result["objective"]
+        x_counts = result["x"]
         st.success(f"**Número Mínimo de Empleados Necesarios:** {math.ceil(total_empleados)}")
 
         st.subheader("Desglose Total por Tipo de Empleado")
         
         type_totals = {}
         # Controlar que el número de columnas sea al menos 1
-        num_cols = max(1, NUMERO_TIPO_EMPLEADOS)
+        num_cols = max(1, len(solved_type_names))
         cols = st.columns(num_cols)
         
-        for i, type_name in enumerate(employee_type_names):
-            total_tipo = N_vars[type_name].value()
-            # Asegurarse de que total_tipo no sea None (si no hay empleados de ese tipo)
-            total_tipo = total_tipo if total_tipo is not None else 0.0
+        for i, type_name in enumerate(solved_type_names):
+            total_tipo = result["N"].get(type_name, 0)
             type_totals[type_name] = total_tipo
             with cols[i]:
                 st.metric(
                     label=f"Total Empleados Tipo {type_name}",
-                    value=int(round(total_tipo))
+                    value=total_tipo
                 )
 
         results_data = []
-        total_sabados_cubiertos_mes = 0
-        total_domingos_cubiertos_mes = 0
-
-        # --- Lógica para obtener cobertura (SIN CAMBIOS, ya estaba corregida) ---
-        # El valor de la cobertura (LHS) es el 'slack' (constraint.value()) + el lado derecho (RHS)
-        # .value() devuelve el "slack" (LHS - RHS). Queremos el LHS.
-        # LHS = constraint.value() + RHS
-        for w in WEEKS:
-            # Comprobar si la restricción existe antes de acceder
-            if f"Cobertura_Sabado_Semana_{w}" in model.constraints:
-                slack_s = model.constraints[f"Cobertura_Sabado_Semana_{w}"].value()
-                total_sabados_cubiertos_mes += (slack_s + DEMANDA_SABADO)
-            
-            if f"Cobertura_Domingo_Semana_{w}" in model.constraints:
-                slack_d = model.constraints[f"Cobertura_Domingo_Semana_{w}"].value()
-                total_domingos_cubiertos_mes += (slack_d + DEMANDA_DOMINGO)
-        # --- Fin de la lógica de cobertura ---
 
-        for type_name in employee_type_names:
+        # Cobertura (LHS de las restricciones) ya calculada en solve_model
+        total_sabados_cubiertos_mes = sum(result["coverage"]["sat"].values())
+        total_domingos_cubiertos_mes = sum(result["coverage"]["sun"].values())
+
+        for type_name in solved_type_names:
             total_tipo_empleado = type_totals.get(type_name, 0)
             
-            for pattern_str in employee_types_data[type_name]["selected_patterns"]:
+            for pattern_id in PATTERNS.ids(solved_types[type_name]["selected_patterns"]):
                 # Sumamos los empleados de este patrón en sus 4 posibles semanas de descanso
-                num_empleados_total_pattern = sum(x_vars[type_name][pattern_str][rest_week].value() for rest_week in WEEKS)
+                num_empleados_total_pattern = sum(x_counts[type_name][pattern_id][rest_week] for rest_week in WEEKS)
                 
                 if num_empleados_total_pattern > 0.001: 
                     
-                    s, d, c = master_pattern_map[pattern_str]["components"]
+                    s, d, c = PATTERNS.components[pattern_id].tolist()
                     servicios_mes_por_persona = s + d + (c * 2)
                     
                     # Contribución total al mes de este grupo de empleados
@@ -443,7 +499,7 @@ if st.button("Calcular Plantilla Óptima", type="primary"):
 
                     results_data.append({
                         "Tipo": f"Tipo {type_name}",
-                        "Partición": pattern_str,
+                        "Partición": PATTERNS.labels[pattern_id],
                         "Servicios/Mes (total)": servicios_mes_por_persona,
                         "Nº Empleados": int(round(num_empleados_total_pattern)),
                         "% s/ Total Tipo": pct_del_tipo,
@@ -464,7 +520,7 @@ if st.button("Calcular Plantilla Óptima", type="primary"):
                     value=f"{total_s_int}",
                     delta=f"{delta_s_int} (Excedente)"
                 )
-                st.caption(f"Requeridos: {TOTAL_DEMANDA_SABADO} ({DEMANDA_SABADO}/sáb)")
+                st.caption(f"Requeridos: {TOTAL_DEMANDA_SABADO} ({demand_label(solved_sabado, 'sáb')})")
             with col2:
                 total_d_int = int(round(total_domingos_cubiertos_mes))
                 delta_d_int = total_d_int - TOTAL_DEMANDA_DOMINGO
@@ -473,7 +529,7 @@ if st.button("Calcular Plantilla Óptima", type="primary"):
                     value=f"{total_d_int}",
                     delta=f"{delta_d_int} (Excedente)"
                 )
-                st.caption(f"Requeridos: {TOTAL_DEMANDA_DOMINGO} ({DEMANDA_DOMINGO}/dom)")
+                st.caption(f"Requeridos: {TOTAL_DEMANDA_DOMINGO} ({demand_label(solved_domingo, 'dom')})")
 
             
             st.subheader("Asignación Detallada por Patrón (Resumen)")
@@ -497,17 +553,24 @@ if st.button("Calcular Plantilla Óptima", type="primary"):
             
             st.subheader("Descargar Plantilla de Turnos Semanal")
             
-            df_plantilla = generate_schedule_df(x_vars, employee_types_data, master_pattern_map)
+            with timer.phase("schedule"):
+                df_plantilla = generate_schedule_df(x_counts, solved_types)
+            schedule_rows = len(df_plantilla)
             
             if not df_plantilla.empty:
-                excel_data = convert_df_to_excel(df_plantilla)
-                
-                st.download_button(
-                    label="📥 Descargar Plantilla de Turnos (Excel)",
-                    data=excel_data,
-                    file_name="plantilla_turnos_semanal.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-                )
+                # El fichero se genera solo al pulsar (callable) y el clic no relanza el script
+                formats = available_formats()
+                download_cols = st.columns(len(formats))
+                for col, fmt in zip(download_cols, formats):
+                    label, mime = EXPORT_FORMATS[fmt]
+                    with col:
+                        st.download_button(
+                            label=f"📥 Descargar Plantilla de Turnos ({label})",
+                            data=partial(export_and_log, df_plantilla, fmt, session_id),
+                            file_name=f"plantilla_turnos_semanal.{fmt}",
+                            mime=mime,
+                            on_click="ignore",
+                        )
                 
                 with st.expander("Ver previsualización de la plantilla generada (Los totales semanales DEBEN cuadrar con la demanda)"):
                     st.dataframe(df_plantilla)
@@ -528,3 +591,358 @@ if st.button("Calcular Plantilla Óptima", type="primary"):
         )
     else:
         st.warning(f"**El modelo no encontró una solución óptima.** Estado: {status}. Revise los parámetros de entrada.")
+
+    # --- DIAGNÓSTICO: tiempos por fase, tamaño del modelo y memoria ---
+    diagnostics = {
+        "event": "calcular",
+        "session": session_id,
+        # Misma huella que la caché y el histórico (incluye el gap relativo)
+        "scenario": completed["cache_key"][:16],
+        "demanda": [solved_sabado, solved_domingo],
+        "status": status,
+        "from_cache": from_cache,
+        "phases": {phase_name: round(seconds, 6) for phase_name, seconds in timer.phases.items()},
+        "model_size": result.get("model_size"),
+        "solver": None if from_cache else result.get("solver"),
+        "schedule_rows": schedule_rows,
+        # Medida en el proceso resolutor; sin resolver (caché o histórico) no hay medida
+        "peak_memory_mb": None if from_cache else result.get("peak_memory_mb"),
+    }
+    log_record(diagnostics)
+
+    with st.expander("Diagnóstico (tiempos por fase, tamaño del modelo, memoria)"):
+        st.caption(
+            "'cache_lookup': consulta a la caché · 'lp_bound': cota de la relajación LP · "
+            "'queue': espera en la cola del servicio · "
+            "'job': resolución en el proceso resolutor, con sus fases internas 'build', 'bound' "
+            "(relajación LP), 'repair', 'solve' y 'extract', o 'fast_path' y 'extract' si respondió la "
+            "vía rápida exacta. La exportación se mide al descargar."
+        )
+        st.dataframe(
+            pd.DataFrame(
+                [{"Fase": phase_name, "Tiempo (s)": seconds} for phase_name, seconds in diagnostics["phases"].items()]
+            ),
+            hide_index=True,
+            column_config={"Tiempo (s)": st.column_config.NumberColumn(format="%.4f")},
+        )
+        model_size_info = diagnostics["model_size"]
+        if model_size_info is None and (result.get("solver") or {}).get("backend") == FAST_BACKEND:
+            st.caption(f"{FAST_BACKEND_LABEL}: no se construye el modelo PuLP (sin tamaño de modelo).")
+            diag_cols = st.columns(4)
+        else:
+            model_size_info = model_size_info or {}
+            diag_cols = st.columns(4)
+            diag_cols[0].metric("Variables", model_size_info.get("variables", "—"))
+            diag_cols[1].metric("Restricciones", model_size_info.get("constraints", "—"))
+            diag_cols[2].metric("No nulos", model_size_info.get("nonzeros", "—"))
+        peak = diagnostics["peak_memory_mb"]
+        diag_cols[3].metric("Memoria pico (proceso resolutor)", f"{peak:.0f} MB" if peak is not None else "—")
+
+# --- ASIGNACIÓN DEL ROSTER REAL A LA ÚLTIMA SOLUCIÓN ---
+roster_solution = st.session_state.get("roster_solution")
+if roster_solution is not None:
+    import pandas as pd
+
+    from export import EXPORT_FORMATS, available_formats
+    from roster import ROSTER_COLUMNS, assign_roster, read_roster
+
+    with st.expander("Asignar empleados reales (roster) a la última plantilla resuelta"):
+        st.write(
+            "Sube la lista de empleados de cada tipo (CSV o Parquet) con las columnas "
+            f"`{', '.join(ROSTER_COLUMNS)}` (solo `id_empleado` es obligatoria). Cada empleado se asigna a una "
+            "plaza (patrón, semana de descanso) respetando sus preferencias y, si se conoce, manteniendo la "
+            "semana de descanso del mes anterior."
+        )
+        roster_types = [t for t, n in roster_solution["N"].items() if n]
+        roster_files = {}
+        roster_cols = st.columns(max(len(roster_types), 1))
+        for col, type_name in zip(roster_cols, roster_types):
+            with col:
+                roster_files[type_name] = st.file_uploader(
+                    f"Roster Tipo {type_name} ({roster_solution['N'][type_name]} plazas)",
+                    type=["csv", "parquet"], key=f"roster_file_{type_name}",
+                )
+
+        if st.button("Asignar roster", disabled=not any(roster_files.values())):
+            roster_timer = PhaseTimer()
+            try:
+                with roster_timer.phase("roster_read"):
+                    roster_df = pd.concat(
+                        [read_roster(file, type_name=type_name) for type_name, file in roster_files.items() if file],
+                        ignore_index=True,
+                    )
+                with roster_timer.phase("roster_assign"):
+                    assigned_df, roster_summary = assign_roster(
+                        roster_df, roster_solution["x"], roster_solution["employee_types_data"],
+                        solver_options=SOLVER_OPTIONS,
+                    )
+            except ValueError as exc:
+                st.error(f"No se pudo leer el roster: {exc}")
+            except RuntimeError as exc:
+                st.error(f"No se pudo asignar el roster: {exc}")
+            else:
+                st.session_state["roster_result"] = (assigned_df, roster_summary)
+                log_record({
+                    "event": "roster", "session": session_id, "rows": len(roster_df),
+                    "phases": roster_timer.phases, "peak_memory_mb": peak_memory_mb(),
+                })
+
+        roster_result = st.session_state.get("roster_result")
+        if roster_result is not None:
+            assigned_df, roster_summary = roster_result
+            st.dataframe(roster_summary, hide_index=True, use_container_width=True)
+            st.caption(
+                "Rotación y preferencias: cumplidas / empleados asignados con ese dato. "
+                "Las vacantes son plazas sin empleado; 'Sin asignar', empleados sin plaza."
+            )
+            formats = available_formats()
+            download_cols = st.columns(len(formats))
+            for col, fmt in zip(download_cols, formats):
+                label, mime = EXPORT_FORMATS[fmt]
+                with col:
+                    st.download_button(
+                        label=f"📥 Descargar plantilla con empleados ({label})",
+                        data=partial(export_and_log, assigned_df, fmt, session_id),
+                        file_name=f"plantilla_empleados.{fmt}",
+                        mime=mime,
+                        on_click="ignore",
+                    )
+            preview_rows = min(len(assigned_df), 1_000)
+            st.caption(f"Previsualización ({preview_rows} de {len(assigned_df)} filas):")
+            st.dataframe(assigned_df.head(preview_rows), hide_index=True)
+
+# --- HISTÓRICO DE ESCENARIOS ---
+scenario_store = get_scenario_store()
+if scenario_store is not None:
+    # El historial (consulta y tabla) solo se carga con la sección abierta
+    history_expander = st.expander("Histórico de escenarios resueltos", key="history_open", on_change="rerun")
+    with history_expander:
+        if history_expander.open:
+            st.write(
+                "Cada cálculo se guarda con su sede, demanda, tipos y resultado. Un escenario idéntico "
+                "se recupera del histórico sin volver a resolverlo."
+            )
+            history_cols = st.columns(2)
+            with history_cols[0]:
+                history_site = st.selectbox(
+                    "Sede", [None] + scenario_store.sites(), key="history_site",
+                    format_func=lambda site: "(todas)" if site is None else (site or "(sin sede)"),
+                )
+            with history_cols[1]:
+                history_limit = st.number_input(
+                    "Ejecuciones a mostrar", min_value=10, max_value=5_000, value=200, step=50, key="history_limit"
+                )
+            history_df = scenario_store.history(site=history_site, limit=history_limit)
+            if history_df.empty:
+                st.info("Todavía no hay ejecuciones guardadas.")
+            else:
+                st.dataframe(history_df, hide_index=True, use_container_width=True)
+                compare_ids = st.multiselect(
+                    "Comparar ejecuciones (la primera es la referencia)",
+                    options=history_df["id"].tolist(), key="history_compare",
+                    format_func=lambda run_id: f"#{run_id}",
+                )
+                if len(compare_ids) >= 2:
+                    st.dataframe(scenario_store.compare(compare_ids), hide_index=True, use_container_width=True)
+
+# --- CONJUNTO MÍNIMO DE PATRONES ---
+with st.expander("Conjunto mínimo de patrones: menos distribuciones con la misma plantilla"):
+    st.write(
+        "Busca el menor número de distribuciones (patrones) permitidas, sumando todos los tipos, que alcanza la "
+        "plantilla óptima de la configuración actual, y cuánta plantilla de más supone permitir aún menos."
+    )
+    if st.button("Buscar conjunto mínimo de patrones"):
+        from pattern_search import minimum_pattern_set
+
+        # Cada paso se resuelve en el pool del servicio; la sesión no se bloquea
+        start_task(
+            "pattern_search_job", {"employee_types_data": employee_types_data}, minimum_pattern_set,
+            DEMANDA_SABADO, DEMANDA_DOMINGO, employee_types_data, solver_options=SOLVER_OPTIONS,
+        )
+    show_task(
+        "pattern_search_job", "pasos",
+        lambda search, job: st.session_state.update(pattern_search=(search, job["employee_types_data"])),
+    )
+
+    pattern_search_state = st.session_state.get("pattern_search")
+    if pattern_search_state is not None:
+        import altair as alt
+
+        from pattern_search import pattern_set_summary, tradeoff_frame
+
+        search, searched_types = pattern_search_state
+        if search["pattern_count"] is None:
+            st.warning(f"No hay solución con los patrones permitidos (estado: {search['status']}).")
+        else:
+            if search["status"] == STATUS_FEASIBLE:
+                st.warning("Resultado dentro del límite de tiempo o del gap del solver: puede no ser el mínimo.")
+            search_cols = st.columns(3)
+            search_cols[0].metric("Plantilla óptima", search["optimal_headcount"])
+            search_cols[1].metric("Patrones necesarios", search["pattern_count"])
+            search_cols[2].metric("Patrones permitidos", search["selected_count"])
+            st.dataframe(pattern_set_summary(search, searched_types), hide_index=True, use_container_width=True)
+            minimal_labels = {
+                type_name: [PATTERNS.labels[pattern_id] for pattern_id in pattern_ids]
+                for type_name, pattern_ids in search["patterns"].items()
+            }
+            st.button(
+                "Usar estos patrones en la configuración", on_click=apply_pattern_set, args=(minimal_labels,),
+                help="Deja seleccionados en cada tipo solo los patrones del conjunto mínimo.",
+            )
+
+            st.subheader("Plantilla frente a número de patrones")
+            tradeoff_df = tradeoff_frame(search)
+            chart = alt.Chart(tradeoff_df.dropna(subset=["plantilla"]).astype({"plantilla": "float"})).mark_line(
+                point=True
+            ).encode(
+                x=alt.X("patrones_max:O", title="Patrones permitidos (máximo)"),
+                y=alt.Y("plantilla:Q", title="Plantilla mínima", scale=alt.Scale(zero=False)),
+                tooltip=list(tradeoff_df.columns),
+            )
+            st.altair_chart(chart, use_container_width=True)
+            st.dataframe(tradeoff_df, hide_index=True, use_container_width=True)
+
+# --- ANÁLISIS DE SENSIBILIDAD (BARRIDO DE DEMANDA) ---
+with st.expander("Análisis de sensibilidad: barrido de demanda Sábado x Domingo"):
+    st.write(
+        "Calcula la plantilla mínima para una rejilla de demandas con la configuración de tipos actual. "
+        "Los puntos se deducen por monotonía o por cota cuando es posible y el resto se resuelve en paralelo."
+    )
+    sweep_cols = st.columns(2)
+    with sweep_cols[0]:
+        sweep_sat_min = st.number_input("Sábado desde", min_value=0, value=50, step=1, key="sweep_sat_min")
+        sweep_sat_max = st.number_input("Sábado hasta", min_value=0, value=200, step=1, key="sweep_sat_max")
+        sweep_sat_step = st.number_input("Paso Sábado", min_value=1, value=10, step=1, key="sweep_sat_step")
+    with sweep_cols[1]:
+        sweep_sun_min = st.number_input("Domingo desde", min_value=0, value=30, step=1, key="sweep_sun_min")
+        sweep_sun_max = st.number_input("Domingo hasta", min_value=0, value=150, step=1, key="sweep_sun_max")
+        sweep_sun_step = st.number_input("Paso Domingo", min_value=1, value=10, step=1, key="sweep_sun_step")
+
+    if st.button("Ejecutar barrido"):
+        from sweep import demand_sweep
+
+        # Los puntos se resuelven en el pool del servicio (OPTIMIZER_SOLVE_WORKERS procesos)
+        start_task(
+            "sweep_job", {}, demand_sweep,
+            list(range(sweep_sat_min, sweep_sat_max + 1, sweep_sat_step)),
+            list(range(sweep_sun_min, sweep_sun_max + 1, sweep_sun_step)),
+            employee_types_data,
+            solver_options=SOLVER_OPTIONS,
+        )
+    show_task("sweep_job", "puntos", lambda sweep_df, job: st.session_state.update(sweep_df=sweep_df))
+
+    sweep_df = st.session_state.get("sweep_df")
+    if sweep_df is not None and not sweep_df.empty:
+        import altair as alt
+
+        from sweep import sweep_pivot
+
+        method_counts = sweep_df["metodo"].value_counts()
+        st.caption(
+            " · ".join(f"{method}: {count}" for method, count in method_counts.items())
+            + f" (de {len(sweep_df)} puntos)"
+        )
+        heatmap = alt.Chart(sweep_df.astype({"plantilla_minima": "float"})).mark_rect().encode(
+            x=alt.X("demanda_domingo:O", title="Demanda Domingo"),
+            y=alt.Y("demanda_sabado:O", title="Demanda Sábado", sort="descending"),
+            color=alt.Color("plantilla_minima:Q", title="Plantilla mínima"),
+            tooltip=["demanda_sabado", "demanda_domingo", "estado", "plantilla_minima", "metodo"],
+        )
+        st.altair_chart(heatmap, use_container_width=True)
+        st.dataframe(sweep_pivot(sweep_df), use_container_width=True)
+        st.download_button(
+            label="📥 Descargar barrido (CSV)",
+            data=sweep_df.to_csv(index=False).encode("utf-8-sig"),
+            file_name="barrido_demanda.csv",
+            mime="text/csv",
+            on_click="ignore",
+        )
+
+# --- PLANIFICACIÓN MULTI-MES (HORIZONTE) ---
+horizon_expander = st.expander(
+    "Planificación multi-mes: horizonte de varios bloques de 4 semanas", key="horizon_open", on_change="rerun"
+)
+with horizon_expander:
+    st.write(
+        "Plantilla mínima de cada bloque de 4 semanas de un horizonte (p. ej. 13 bloques = un año) con "
+        "demanda distinta por semana. Los bloques se resuelven uno a uno: los que repiten demanda reutilizan "
+        "el resultado y el resto arranca con la solución del bloque anterior."
+    )
+    horizon_blocks = st.number_input(
+        "Bloques de 4 semanas", min_value=1, max_value=26, value=3, step=1, key="horizon_blocks"
+    )
+    # La tabla editable (pandas) y los resultados solo se cargan con la sección abierta
+    if horizon_expander.open:
+        import altair as alt
+        import pandas as pd
+
+        from horizon import BLOCK_WEEKS, horizon_detail, horizon_summary, solve_horizon
+
+        # Valores iniciales: la demanda semanal de la configuración, repetida en cada bloque
+        base_sat = list(weekly_demand(DEMANDA_SABADO).values())
+        base_sun = list(weekly_demand(DEMANDA_DOMINGO).values())
+        horizon_weeks = range(horizon_blocks * BLOCK_WEEKS)
+        horizon_input = st.data_editor(
+            pd.DataFrame({
+                "Semana": [i + 1 for i in horizon_weeks],
+                "Sábado": [base_sat[i % BLOCK_WEEKS] for i in horizon_weeks],
+                "Domingo": [base_sun[i % BLOCK_WEEKS] for i in horizon_weeks],
+            }),
+            hide_index=True,
+            disabled=["Semana"],
+            key=f"horizon_editor_{horizon_blocks}",
+            use_container_width=True,
+            column_config={
+                "Sábado": st.column_config.NumberColumn(min_value=0, step=1),
+                "Domingo": st.column_config.NumberColumn(min_value=0, step=1),
+            },
+        ).fillna(0)
+
+        if st.button("Planificar horizonte"):
+            # Los bloques se resuelven en el pool del servicio; la sesión no se bloquea
+            start_task(
+                "horizon_job", {}, solve_horizon,
+                horizon_input["Sábado"].tolist(), horizon_input["Domingo"].tolist(), employee_types_data,
+                solver_options=SOLVER_OPTIONS,
+            )
+        show_task(
+            "horizon_job", "bloques",
+            lambda blocks, job: st.session_state.update(
+                horizon_summary=horizon_summary(blocks), horizon_detail=horizon_detail(blocks)
+            ),
+        )
+
+        horizon_df = st.session_state.get("horizon_summary")
+        if horizon_df is not None and not horizon_df.empty:
+            method_counts = horizon_df["metodo"].value_counts()
+            st.caption(
+                f"{len(horizon_df)} bloques en {horizon_df['tiempo_s'].sum():.2f} s · "
+                + " · ".join(f"{method}: {count}" for method, count in method_counts.items())
+            )
+            if horizon_df["plantilla"].notna().any():
+                st.metric("Plantilla máxima del horizonte", int(horizon_df["plantilla"].max()))
+            chart = alt.Chart(horizon_df.astype({"plantilla": "float"})).mark_bar().encode(
+                x=alt.X("bloque:O", title="Bloque"),
+                y=alt.Y("plantilla:Q", title="Plantilla mínima"),
+                color=alt.Color("estado:N", title="Estado"),
+                tooltip=list(horizon_df.columns),
+            )
+            st.altair_chart(chart, use_container_width=True)
+            st.dataframe(horizon_df, hide_index=True, use_container_width=True)
+            download_cols = st.columns(2)
+            with download_cols[0]:
+                st.download_button(
+                    label="📥 Descargar resumen del horizonte (CSV)",
+                    data=horizon_df.to_csv(index=False).encode("utf-8-sig"),
+                    file_name="horizonte_resumen.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                )
+            with download_cols[1]:
+                st.download_button(
+                    label="📥 Descargar plan por bloque y patrón (CSV)",
+                    data=st.session_state["horizon_detail"].to_csv(index=False).encode("utf-8-sig"),
+                    file_name="horizonte_plan.csv",
+                    mime="text/csv",
+                    on_click="ignore",
+                )
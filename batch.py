@@ -0,0 +1,342 @@
+"""
+Resolución por lotes (sin Streamlit) de muchas tiendas/sedes.
+
+Entrada: CSV o Parquet en formato largo, una fila por (sede, tipo):
+
+    sede, demanda_sabado, demanda_domingo, tipo, max_empleados, servicios_mes, patrones
+
+- demanda_sabado / demanda_domingo deben repetirse igual en todas las filas de la
+  sede. Cada una es un número (igual todas las semanas) o un valor por semana:
+  en CSV separados por ';' ("110;95;120;101"), en Parquet también como lista.
+- patrones (opcional): distribuciones permitidas separadas por ';'. Vacío = todas
+  las que suman 'servicios_mes'.
+
+Salida: un único fichero (CSV o Parquet según la extensión) con una fila por
+(sede, tipo, patrón) asignado y los empleados por semana de descanso.
+
+Con --store, las sedes cuyo escenario ya está en el histórico SQLite
+('scenario_store') se sirven de él sin resolver, y las resueltas se guardan.
+
+Con --pool TIPO=MÁXIMO (repetible), las sedes se resuelven juntas: la
+plantilla de ese tipo sumada en todas las sedes no supera el máximo
+('pooling'); 'max_empleados' sigue siendo el máximo de cada sede.
+
+Uso:
+    python batch.py sedes.csv resultados.csv --workers 8 [--store escenarios.sqlite]
+    python batch.py sedes.csv resultados.csv --pool F=120 --pool G=40
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+import pandas as pd
+
+from optimizer import SOLVE_METHODS, solve_model
+from patterns import WEEKS, get_pattern_registry, patterns_for_services, weekly_demand
+from pooling import MAX_ITERATIONS, POOL_METHODS, solve_pooled
+from scenario_store import ScenarioStore
+from solve_cache import scenario_fingerprint
+from solvers import BACKEND_LABELS, available_backends
+
+INPUT_COLUMNS = ["sede", "demanda_sabado", "demanda_domingo", "tipo", "max_empleados", "servicios_mes"]
+PATTERN_SEPARATOR = ";"
+DEMAND_SEPARATOR = ";"
+
+
+def read_table(path):
+    if path.lower().endswith(".parquet"):
+        return pd.read_parquet(path)
+    return pd.read_csv(path, dtype={"sede": str, "tipo": str, "patrones": str})
+
+
+def write_table(df, path):
+    if path.lower().endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def parse_demand(value):
+    """
+    Demanda de una celda: un número o un valor por semana (texto separado
+    por ';' o lista). Devuelve un int si es igual todas las semanas y, si
+    no, una tupla por semana (formato de 'weekly_demand').
+    Lanza ValueError si no hay un valor ni uno por semana.
+    """
+    if isinstance(value, str):
+        parts = [part.strip() for part in value.split(DEMAND_SEPARATOR) if part.strip()]
+        value = parts[0] if len(parts) == 1 else parts
+    if isinstance(value, (list, tuple, np.ndarray)):
+        weekly = tuple(weekly_demand(list(value)).values())
+        return weekly[0] if len(set(weekly)) == 1 else weekly
+    return int(value)
+
+
+def build_site_scenarios(df):
+    """
+    Agrupa las filas por sede y construye los argumentos de 'solve_model'.
+
+    Devuelve [(sede, demanda_sabado, demanda_domingo, employee_types_data)];
+    cada demanda es un int o una tupla por semana ('parse_demand').
+    Lanza ValueError si faltan columnas, una demanda no es válida o no es
+    única por sede.
+    """
+    missing = [col for col in INPUT_COLUMNS if col not in df.columns]
+    if missing:
+        raise ValueError(f"Faltan columnas en la entrada: {', '.join(missing)}")
+
+    has_patterns = "patrones" in df.columns
+    scenarios = []
+
+    for sede, site_df in df.groupby("sede", sort=False):
+        try:
+            demandas = {
+                (parse_demand(sat), parse_demand(sun))
+                for sat, sun in zip(site_df["demanda_sabado"], site_df["demanda_domingo"])
+            }
+        except ValueError as exc:
+            raise ValueError(f"La sede {sede} tiene una demanda no válida: {exc}") from exc
+        if len(demandas) != 1:
+            raise ValueError(f"La sede {sede} tiene varias demandas distintas")
+        demanda_sabado, demanda_domingo = demandas.pop()
+
+        employee_types_data = {}
+        for row in site_df.itertuples(index=False):
+            allowed = patterns_for_services(int(row.servicios_mes))
+            raw = getattr(row, "patrones", None) if has_patterns else None
+            if isinstance(raw, str) and raw.strip():
+                requested = [p.strip() for p in raw.split(PATTERN_SEPARATOR) if p.strip()]
+                unknown = [p for p in requested if p not in allowed]
+                if unknown:
+                    raise ValueError(
+                        f"Sede {sede}, tipo {row.tipo}: patrones no válidos para "
+                        f"{row.servicios_mes} servicios: {unknown}"
+                    )
+                allowed = requested
+
+            employee_types_data[str(row.tipo)] = {
+                "max_employees": int(row.max_empleados),
+                "selected_patterns": allowed,
+            }
+
+        scenarios.append((str(sede), demanda_sabado, demanda_domingo, employee_types_data))
+
+    return scenarios
+
+
+def solve_site(scenario, solver_options=None, method=None):
+    """Resuelve una sede (se ejecuta en un proceso del pool)."""
+    sede, demanda_sabado, demanda_domingo, employee_types_data = scenario
+    start = time.perf_counter()
+    result = solve_model(demanda_sabado, demanda_domingo, employee_types_data,
+                         solver_options=solver_options, method=method)
+    return sede, result, time.perf_counter() - start
+
+
+def _stage_seconds(result, stage):
+    seconds = result["timings"].get(stage)
+    return round(seconds, 4) if seconds is not None else None
+
+
+def result_rows(sede, result, elapsed):
+    """Aplana el resultado de una sede en filas del fichero consolidado."""
+    base = {
+        "sede": sede,
+        "estado": result["status"],
+        "total_empleados": int(round(result["objective"])) if result["objective"] is not None else None,
+        "tiempo_s": round(elapsed, 4),
+        # Vacíos si respondió la vía rápida (sin modelo ni solver)
+        "tiempo_construccion_s": _stage_seconds(result, "build"),
+        "tiempo_resolucion_s": _stage_seconds(result, "solve"),
+        "gap": result["solver"]["gap"] if result.get("solver") else None,
+        "cota_inferior": (result.get("lp_bound") or {}).get("bound"),
+    }
+    labels = get_pattern_registry().labels
+    rows = []
+    for type_name, by_pattern in result["x"].items():
+        for pattern_id, by_rw in by_pattern.items():
+            total_pattern = sum(by_rw.values())
+            if total_pattern == 0:
+                continue
+            row = dict(base, tipo=type_name, empleados_tipo=result["N"][type_name],
+                       patron=labels[pattern_id], empleados_patron=total_pattern)
+            for rest_week in WEEKS:
+                row[f"descanso_semana_{rest_week}"] = by_rw[rest_week]
+            rows.append(row)
+
+    # Sedes infactibles o sin asignación: una fila con el estado
+    return rows or [base]
+
+
+def solve_sites(scenarios, workers=None, solver_options=None, method=None, store=None):
+    """
+    Resuelve las sedes en paralelo con un pool de procesos (un CBC por
+    proceso). Devuelve un DataFrame consolidado en el orden de entrada.
+
+    Con 'store' (ScenarioStore), las sedes ya resueltas se toman del
+    histórico y las nuevas se guardan en él; df.attrs["from_store"] es el
+    número de sedes recuperadas.
+    """
+    workers = workers or os.cpu_count() or 1
+    gap_rel = (solver_options or {}).get("gap_rel")
+    fingerprints = [scenario_fingerprint(*scenario[1:], gap_rel=gap_rel) for scenario in scenarios]
+
+    solved = [None] * len(scenarios)
+    if store is not None:
+        for i, scenario in enumerate(scenarios):
+            start = time.perf_counter()
+            stored_run = store.lookup(fingerprints[i])
+            if stored_run is not None:
+                solved[i] = (scenario[0], stored_run["result"], time.perf_counter() - start)
+    pending = [i for i, entry in enumerate(solved) if entry is None]
+
+    solve_fn = partial(solve_site, solver_options=solver_options, method=method)
+    if workers == 1:
+        fresh = [solve_fn(scenarios[i]) for i in pending]
+    else:
+        # Lotes por tarea para amortizar el envío entre procesos con cientos de sedes
+        chunksize = max(1, len(pending) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            fresh = list(executor.map(solve_fn, [scenarios[i] for i in pending], chunksize=chunksize))
+    for i, entry in zip(pending, fresh):
+        solved[i] = entry
+    if store is not None and fresh:
+        store.save_many(
+            (fingerprints[i], *scenarios[i], result)
+            for i, (_, result, _) in zip(pending, fresh)
+        )
+
+    rows = []
+    for sede, result, elapsed in solved:
+        rows.extend(result_rows(sede, result, elapsed))
+
+    df = _results_frame(rows)
+    df.attrs["from_store"] = len(scenarios) - len(pending)
+    return df
+
+
+def solve_pooled_sites(scenarios, pools, workers=None, solver_options=None, method=None,
+                       max_iterations=MAX_ITERATIONS, time_limit=None):
+    """
+    Resuelve las sedes juntas con bolsas compartidas por tipo ('solve_pooled').
+    Mismas columnas que 'solve_sites'; 'estado' y 'gap' son los de la
+    solución conjunta. df.attrs["pooled"] resume la solución conjunta.
+    """
+    result = solve_pooled(scenarios, pools, workers=workers, solver_options=solver_options, method=method,
+                          max_iterations=max_iterations, time_limit=time_limit)
+    rows = []
+    for sede, *_ in scenarios:
+        plan = result["sites"].get(sede)
+        if plan is None:
+            rows.append({"sede": sede, "estado": result["status"]})
+            continue
+        site_rows = result_rows(sede, plan, sum(plan["timings"].values()))
+        for row in site_rows:
+            row["gap"] = result["gap"]
+        rows.extend(site_rows)
+
+    df = _results_frame(rows)
+    df.attrs["pooled"] = {
+        key: result.get(key)
+        for key in ("status", "objective", "lower_bound", "gap", "pools", "pool_usage", "iterations", "columns",
+                    "infeasible_sites")
+    }
+    return df
+
+
+def _results_frame(rows):
+    df = pd.DataFrame(rows)
+    # Enteros con nulos (sedes infactibles) en lugar de float
+    count_cols = [col for col in df.columns if col.startswith(("total_", "empleados_", "descanso_"))]
+    df[count_cols] = df[count_cols].astype("Int64")
+    return df
+
+
+def parse_pools(values):
+    """['F=120', 'G=40'] -> {'F': 120, 'G': 40}. Lanza ValueError si el formato no es TIPO=MÁXIMO."""
+    pools = {}
+    for value in values or []:
+        type_name, sep, limit = value.partition("=")
+        if not sep or not type_name.strip() or not limit.strip().isdigit():
+            raise ValueError(f"Bolsa no válida (formato TIPO=MÁXIMO): {value}")
+        pools[type_name.strip()] = int(limit)
+    return pools
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Optimizador de plantilla por lotes (varias sedes).")
+    parser.add_argument("entrada", help="CSV o Parquet de sedes")
+    parser.add_argument("salida", help="Fichero de resultados (.csv o .parquet)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Procesos de resolución (por defecto: nº de núcleos)")
+    parser.add_argument("--solver", choices=sorted(BACKEND_LABELS), default="cbc")
+    parser.add_argument("--threads", type=int, default=None, help="Hilos por resolución")
+    parser.add_argument("--time-limit", type=float, default=None,
+                        help="Segundos por sede; al agotarse se guarda la mejor solución (estado Feasible)")
+    parser.add_argument("--gap", type=float, default=None, help="Gap relativo para parar (0.01 = 1 %%)")
+    parser.add_argument("--method", choices=list(SOLVE_METHODS), default=None,
+                        help="auto: vía rápida si es posible · mip: siempre el MIP · "
+                             "check: ambas vías, error si no coinciden")
+    parser.add_argument("--store", default=None,
+                        help="Histórico SQLite de escenarios: reutiliza sedes ya resueltas y guarda las nuevas")
+    parser.add_argument("--pool", action="append", metavar="TIPO=MÁXIMO",
+                        help="Bolsa compartida entre sedes para un tipo (repetible): resuelve las sedes juntas")
+    parser.add_argument("--pool-method", choices=list(POOL_METHODS), default=None,
+                        help="decomposition: generación de columnas por sede (por defecto) · "
+                             "monolithic: un único MIP con todas las sedes")
+    parser.add_argument("--pool-iterations", type=int, default=MAX_ITERATIONS,
+                        help="Iteraciones máximas de la descomposición")
+    parser.add_argument("--pool-time-limit", type=float, default=None,
+                        help="Segundos para la descomposición; al agotarse se da la mejor solución con su gap")
+    args = parser.parse_args(argv)
+
+    if args.solver not in available_backends():
+        parser.error(f"El solver {args.solver} no está disponible (HiGHS requiere 'highspy')")
+    solver_options = {"backend": args.solver, "threads": args.threads,
+                      "time_limit": args.time_limit, "gap_rel": args.gap}
+
+    try:
+        scenarios = build_site_scenarios(read_table(args.entrada))
+        pools = parse_pools(args.pool)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if pools and args.store:
+        parser.error("--store no se puede combinar con --pool (el histórico guarda sedes aisladas)")
+
+    start = time.perf_counter()
+    if pools:
+        try:
+            df = solve_pooled_sites(scenarios, pools, workers=args.workers, solver_options=solver_options,
+                                    method=args.pool_method, max_iterations=args.pool_iterations,
+                                    time_limit=args.pool_time_limit)
+        except ValueError as exc:
+            parser.error(str(exc))
+        write_table(df, args.salida)
+        summary = df.attrs["pooled"]
+        gap = f"{summary['gap'] * 100:.2f} %" if summary["gap"] is not None else "—"
+        usage = ", ".join(
+            f"{type_name}: {(summary['pool_usage'] or {}).get(type_name, '—')}/{limit}"
+            for type_name, limit in summary["pools"].items()
+        )
+        print(f"{len(scenarios)} sedes con bolsas compartidas: {summary['status']} · plantilla {summary['objective']} · "
+              f"cota {summary['lower_bound']} · gap {gap} · bolsas {usage} · {time.perf_counter() - start:.2f} s "
+              f"-> {args.salida}", file=sys.stderr)
+        return 0
+
+    store = ScenarioStore(args.store) if args.store else None
+    df = solve_sites(scenarios, workers=args.workers, solver_options=solver_options, method=args.method,
+                     store=store)
+    write_table(df, args.salida)
+
+    elapsed = time.perf_counter() - start
+    reused = f" ({df.attrs['from_store']} del histórico)" if store is not None else ""
+    print(f"{len(scenarios)} sedes resueltas{reused} en {elapsed:.2f} s -> {args.salida}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+Benchmark de todas las etapas: generación de patrones, contribuciones,
+vía rápida, construcción del modelo, resolución, plantilla y exportación
+a Excel.
+
+'build' y 'solve' miden el MIP ('--method mip' por defecto); la vía rápida
+se cronometra aparte, en su propia etapa, en los escenarios que la admiten.
+
+Recorre una rejilla de escenarios (nº de tipos x demanda x patrones) y
+emite JSON para comparar ejecuciones entre commits o versiones del solver.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_pipeline.py [--types 1 2 3] [--demands 50 500 5000]
+        [--patterns all subset] [--repeat 3] [--solver cbc] [--method mip] [--output run.json]
+    python benchmarks/bench_pipeline.py --compare base.json run.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pulp  # noqa: E402
+
+from export import convert_df_to_excel  # noqa: E402
+from fast_path import fast_path_eligible, fast_result  # noqa: E402
+from optimizer import SOLVE_METHODS, solve_model  # noqa: E402
+from patterns import WEEKS, PatternRegistry, generate_3week_patterns, patterns_for_services  # noqa: E402
+from schedule import generate_schedule_df  # noqa: E402
+
+STAGES = ["patterns", "contributions", "fast_path", "build", "solve", "schedule", "excel"]
+
+# Proporción domingo / sábado de la demanda de los escenarios
+SUNDAY_RATIO = 0.7
+
+
+def scenario_types(n_types, pattern_set):
+    """
+    Tipos de empleado del escenario. Con 'all' cada tipo admite todos los
+    patrones de su nº de servicios (4..1 rotando); con 'subset', uno de
+    cada dos (así siguen cubriéndose sábados y domingos de todas las
+    semanas). El máximo por tipo no limita: se mide el modelo, no la
+    factibilidad.
+    """
+    employee_types_data = {}
+    for i in range(n_types):
+        services = 4 - i % 4
+        patterns = patterns_for_services(services)
+        if pattern_set == "subset":
+            patterns = patterns[::2]
+        employee_types_data[chr(ord("A") + i)] = {"max_employees": 10**7, "selected_patterns": patterns}
+    return employee_types_data
+
+
+def best_of(repeat, fn):
+    """(mejor tiempo, último resultado) de 'repeat' ejecuciones de fn()."""
+    best, value = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def run_scenario(n_types, demand, pattern_set, repeat, solver_options, method="mip"):
+    demanda_sabado, demanda_domingo = demand, max(1, round(demand * SUNDAY_RATIO))
+    employee_types_data = scenario_types(n_types, pattern_set)
+
+    timings = {}
+    timings["patterns"], master_map = best_of(repeat, generate_3week_patterns)
+    # Registro de patrones con el array de contribuciones
+    timings["contributions"], _ = best_of(repeat, lambda: PatternRegistry(master_map, WEEKS))
+
+    # Vía rápida completa (certifique o no la respuesta), aparte del MIP
+    fast_certified = None
+    if fast_path_eligible(employee_types_data):
+        timings["fast_path"], (fast, _, _) = best_of(
+            repeat, lambda: fast_result(demanda_sabado, demanda_domingo, employee_types_data)
+        )
+        fast_certified = fast is not None
+
+    # build y solve salen de los tiempos que mide el propio solve_model
+    build_times, solve_times = [], []
+    for _ in range(repeat):
+        result = solve_model(demanda_sabado, demanda_domingo, employee_types_data,
+                             solver_options=solver_options, method=method)
+        # Con '--method auto' la vía rápida puede responder sin modelo ni solver
+        build_times.append(result["timings"].get("build", 0.0))
+        solve_times.append(result["timings"].get("solve", 0.0))
+    timings["build"], timings["solve"] = min(build_times), min(solve_times)
+
+    rows = None
+    if result["status"] == "Optimal":
+        timings["schedule"], df = best_of(repeat, lambda: generate_schedule_df(result["x"], employee_types_data))
+        timings["excel"], _ = best_of(repeat, lambda: convert_df_to_excel(df))
+        rows = len(df)
+
+    return {
+        "scenario": {"types": n_types, "demanda_sabado": demanda_sabado, "demanda_domingo": demanda_domingo,
+                     "patterns": pattern_set,
+                     "n_patterns": sum(len(data["selected_patterns"]) for data in employee_types_data.values())},
+        "status": result["status"],
+        "objective": result["objective"],
+        "schedule_rows": rows,
+        "fast_path_certified": fast_certified,
+        "timings": {stage: round(timings[stage], 6) for stage in STAGES if stage in timings},
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def scenario_key(run):
+    s = run["scenario"]
+    return (s["types"], s["demanda_sabado"], s["patterns"])
+
+
+def compare(base_path, new_path):
+    """Tabla de ratios nuevo / base por escenario y etapa (>1 = más lento)."""
+    with open(base_path, encoding="utf-8") as fh:
+        base = {scenario_key(run): run for run in json.load(fh)["runs"]}
+    with open(new_path, encoding="utf-8") as fh:
+        new = json.load(fh)["runs"]
+
+    print(f"{'tipos':>5}{'demanda':>9}{'patrones':>9}" + "".join(f"{stage:>14}" for stage in STAGES))
+    for run in new:
+        old = base.get(scenario_key(run))
+        if old is None:
+            continue
+        cells = []
+        for stage in STAGES:
+            t_new, t_old = run["timings"].get(stage), old["timings"].get(stage)
+            cells.append(f"{t_new / t_old:>13.2f}x" if t_new is not None and t_old else f"{'—':>14}")
+        types, demand, pattern_set = scenario_key(run)
+        print(f"{types:>5}{demand:>9}{pattern_set:>9}" + "".join(cells))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--types", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--demands", type=int, nargs="+", default=[50, 500, 5000])
+    parser.add_argument("--patterns", nargs="+", choices=["all", "subset"], default=["all", "subset"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--solver", choices=["cbc", "highs"], default="cbc")
+    parser.add_argument("--method", choices=list(SOLVE_METHODS), default="mip",
+                        help="Vía de resolución de las etapas build/solve ('auto' usa la vía rápida si certifica)")
+    parser.add_argument("--output", help="Fichero JSON de salida (por defecto, stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASE", "NUEVO"), help="Compara dos ficheros JSON")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    solver_options = {"backend": args.solver}
+    runs = []
+    for n_types in args.types:
+        for demand in args.demands:
+            for pattern_set in args.patterns:
+                run = run_scenario(n_types, demand, pattern_set, args.repeat, solver_options, args.method)
+                runs.append(run)
+                print(f"tipos={n_types} demanda={demand} patrones={pattern_set}: "
+                      + " ".join(f"{stage}={t:.4f}" for stage, t in run["timings"].items()), file=sys.stderr)
+
+    report = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "pulp": pulp.__version__,
+            "platform": platform.platform(),
+            "solver": args.solver,
+            "method": args.method,
+            "repeat": args.repeat,
+        },
+        "runs": runs,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Sedes con bolsas compartidas ('pooling'): descomposición por sedes frente
+al MIP conjunto, con la misma instancia aleatoria (semilla fija).
+
+Cada sede tiene un tipo local limitado (A), dos tipos que flotan entre
+sedes (F y G, con bolsa) y un tipo local de 2-3 servicios (B). Las bolsas
+son una fracción ('--tight') de lo que usan las sedes resueltas por
+separado, para que limiten.
+
+Sale con código 1 si las dos vías dan estado u objetivo distintos.
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_pooling.py [--sites 40 150] [--tight 0.8] [--workers 4]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns import patterns_for_services  # noqa: E402
+from pooling import solve_pooled  # noqa: E402
+
+POOLED_TYPES = ("F", "G")
+
+
+def build_sites(num_sites, seed):
+    rng = random.Random(seed)
+    scenarios = []
+    for i in range(num_sites):
+        four, few = patterns_for_services(4), patterns_for_services(rng.choice([2, 3]))
+        employee_types_data = {
+            "A": {"max_employees": rng.randint(3, 25), "selected_patterns": rng.sample(four, rng.randint(1, 3))},
+            "F": {"max_employees": 40, "selected_patterns": four},
+            "G": {"max_employees": 30, "selected_patterns": rng.sample(four, 4)},
+            "B": {"max_employees": rng.randint(20, 40), "selected_patterns": rng.sample(few, rng.randint(1, len(few)))},
+        }
+        scenarios.append((
+            f"S{i}",
+            [rng.randint(2, 18) for _ in range(4)],
+            [rng.randint(2, 18) for _ in range(4)],
+            employee_types_data,
+        ))
+    return scenarios
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sites", type=int, nargs="+", default=[40, 150])
+    parser.add_argument("--tight", type=float, default=0.8, help="Bolsa = fracción del uso de las sedes aisladas")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args(argv)
+
+    print(f"{'sedes':>6}{'iter.':>7}{'planes':>8}{'t desc. (s)':>13}{'t MIP (s)':>11}{'objetivo':>10}{'cota':>8}  estado")
+    ok = True
+    for num_sites in args.sites:
+        scenarios = build_sites(num_sites, args.seed)
+        unlimited = {type_name: 10 ** 6 for type_name in POOLED_TYPES}
+        isolated = solve_pooled(scenarios, unlimited, workers=args.workers)
+        pools = {type_name: int(used * args.tight) for type_name, used in isolated["pool_usage"].items()}
+
+        start = time.perf_counter()
+        decomposition = solve_pooled(scenarios, pools, workers=args.workers)
+        decomposition_time = time.perf_counter() - start
+        start = time.perf_counter()
+        monolithic = solve_pooled(scenarios, pools, method="monolithic")
+        monolithic_time = time.perf_counter() - start
+
+        same = (decomposition["status"], decomposition["objective"]) == (monolithic["status"], monolithic["objective"])
+        ok = ok and same
+        print(f"{num_sites:>6}{decomposition['iterations']:>7}{decomposition['columns']:>8}{decomposition_time:>13.3f}"
+              f"{monolithic_time:>11.3f}{decomposition['objective']!s:>10}{decomposition['lower_bound']!s:>8}  "
+              f"{decomposition['status']}" + ("" if same else f" (MIP conjunto: {monolithic['status']}, "
+                                               f"{monolithic['objective']})"))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Arranque en frío de la interfaz: tiempo de la primera ejecución de app.py
+(primera pintura) en un proceso nuevo y módulos pesados que carga.
+
+Cada medida lanza un proceso Python nuevo que ejecuta app.py con
+streamlit.testing (AppTest). Se descuenta lo que tarda AppTest en
+ejecutar un script vacío en ese mismo proceso (descubrimiento de
+componentes, espera de los mensajes), que no depende de la app: queda el
+coste propio de app.py en frío (imports, registro de patrones, widgets).
+El histórico usa un fichero temporal.
+
+El objetivo es relativo a la misma máquina: se mide igual una referencia
+que importa los módulos pesados al inicio (la primera pintura antes de
+diferirlos) y la mediana de app.py no debe pasar de STARTUP_TARGET_RATIO
+veces la de la referencia. '--target' fija en su lugar un objetivo
+absoluto en segundos.
+
+Sale con código 1 si la mediana supera el objetivo o si la primera
+pintura carga algún módulo pesado (PuLP, pandas, openpyxl...).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/bench_startup.py [--runs 5] [--ratio 0.35 | --target SEGUNDOS]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# No deben cargarse hasta resolver, descargar o abrir una sección que los use
+HEAVY_MODULES = ["pulp", "pandas", "pyarrow", "altair", "openpyxl", "xlsxwriter"]
+
+# Objetivo: coste propio de app.py / coste de la referencia con los módulos
+# pesados importados al inicio. Medido en dos máquinas: 0,11 / 0,75 s y
+# 0,16-0,20 / 0,8-1,1 s (0,15-0,25; el resto es numpy y el registro de patrones).
+STARTUP_TARGET_RATIO = 0.35
+
+# Referencia: la primera pintura importando todo al inicio
+_BASELINE_APP = "import streamlit as st\n" + "".join(f"import {m}\n" for m in HEAVY_MODULES) + "st.write('referencia')\n"
+
+_CHILD = """
+import json, sys, tempfile, time
+from streamlit.testing.v1 import AppTest
+
+def timed_run(path):
+    at = AppTest.from_file(path, default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    return at, time.perf_counter() - start
+
+with tempfile.NamedTemporaryFile("w", suffix=".py", delete=False) as fh:
+    fh.write("import streamlit as st\\nst.write('vacío')\\n")
+timed_run(fh.name)  # el primer AppTest del proceso inicializa Streamlit
+_, overhead = timed_run(fh.name)
+at, elapsed = timed_run(sys.argv[1])
+print(json.dumps({
+    "seconds": elapsed - overhead,
+    "exception": [str(e.value) for e in at.exception],
+    "heavy": [m for m in json.loads(sys.argv[2]) if m in sys.modules],
+}))
+"""
+
+
+def measure_once(store_path, app_path):
+    env = dict(os.environ, OPTIMIZER_STORE_PATH=store_path)
+    completed = subprocess.run(
+        [sys.executable, "-c", _CHILD, app_path, json.dumps(HEAVY_MODULES)],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--ratio", type=float, default=STARTUP_TARGET_RATIO,
+                        help="Objetivo de la mediana como fracción de la referencia")
+    target.add_argument("--target", type=float, help="Objetivo absoluto de la mediana (s), sin medir la referencia")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store_path = os.path.join(tmp, "escenarios.sqlite")
+        runs = [measure_once(store_path, os.path.join(ROOT, "app.py")) for _ in range(args.runs)]
+        if args.target is None:
+            baseline_path = os.path.join(tmp, "referencia.py")
+            with open(baseline_path, "w", encoding="utf-8") as fh:
+                fh.write(_BASELINE_APP)
+            baseline = statistics.median(measure_once(store_path, baseline_path)["seconds"] for _ in range(args.runs))
+
+    seconds = [run["seconds"] for run in runs]
+    heavy = sorted({module for run in runs for module in run["heavy"]})
+    exceptions = [exc for run in runs for exc in run["exception"]]
+    median = statistics.median(seconds)
+    if args.target is None:
+        target_s = args.ratio * baseline
+        print(f"Referencia con los módulos pesados al inicio: mediana {baseline:.3f} s "
+              f"(objetivo {args.ratio:.0%}: {target_s:.3f} s)")
+    else:
+        target_s = args.target
+    print(f"Coste propio de la primera ejecución de app.py ({args.runs} procesos nuevos): mediana {median:.3f} s · "
+          f"mín {min(seconds):.3f} s · máx {max(seconds):.3f} s (objetivo {target_s:.3f} s)")
+    print(f"Módulos pesados cargados: {', '.join(heavy) or 'ninguno'}")
+    if exceptions:
+        print(f"Excepciones en la app: {exceptions[0]}")
+
+    ok = median <= target_s and not heavy and not exceptions
+    print("OK" if ok else "FALLO")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+"""
+Comprobación cruzada de la vía rápida ('fast_path') contra el MIP en
+instancias aleatorias de 1 y 2 tipos (demanda uniforme y por semana,
+subconjuntos de patrones, máximos que limitan o no).
+
+Uso (desde la raíz del repositorio):
+    python benchmarks/check_fast_path.py [--cases 500] [--seed 0]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fast_path import fast_result  # noqa: E402
+from optimizer import solve_model  # noqa: E402
+from patterns import WEEKS, patterns_for_services  # noqa: E402
+
+
+def random_instance(rng):
+    employee_types_data = {}
+    for type_name in "AB"[:rng.choice([1, 2])]:
+        patterns = []
+        while not patterns:
+            patterns = patterns_for_services(rng.randint(1, 6))
+        if rng.random() < 0.4:
+            patterns = rng.sample(patterns, k=rng.randint(1, len(patterns)))
+        max_employees = rng.choice([10**6, rng.randint(20, 300)])
+        employee_types_data[type_name] = {"max_employees": max_employees, "selected_patterns": patterns}
+    if rng.random() < 0.5:
+        demanda_sabado, demanda_domingo = rng.randint(0, 300), rng.randint(0, 300)
+    else:
+        demanda_sabado = [rng.randint(0, 300) for _ in WEEKS]
+        demanda_domingo = [rng.randint(0, 300) for _ in WEEKS]
+    return demanda_sabado, demanda_domingo, employee_types_data
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    certified = 0
+    fast_time = mip_time = 0.0
+    for _ in range(args.cases):
+        demanda_sabado, demanda_domingo, employee_types_data = random_instance(rng)
+
+        start = time.perf_counter()
+        fast, _, _ = fast_result(demanda_sabado, demanda_domingo, employee_types_data)
+        fast_time += time.perf_counter() - start
+        certified += fast is not None
+
+        start = time.perf_counter()
+        # "check" lanza CrossCheckError si las dos vías no coinciden
+        solve_model(demanda_sabado, demanda_domingo, employee_types_data, method="check")
+        mip_time += time.perf_counter() - start
+
+    print(f"{args.cases} casos sin discrepancias · certificados por la vía rápida: {certified} "
+          f"({100 * certified / args.cases:.0f} %)")
+    print(f"tiempo medio vía rápida: {1000 * fast_time / args.cases:.3f} ms · "
+          f"vía rápida + MIP: {1000 * mip_time / args.cases:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Instrumentación del flujo "Calcular Plantilla Óptima": tiempos por fase,
+memoria pico y un log JSON-lines para agregar entre sesiones.
+
+El log se activa con la variable de entorno OPTIMIZER_DIAG_LOG (ruta del
+fichero); sin ella, los diagnósticos solo se muestran en la interfaz.
+"""
+import contextlib
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DIAG_LOG_ENV = "OPTIMIZER_DIAG_LOG"
+
+_LOG_LOCK = threading.Lock()
+
+
+class PhaseTimer:
+    """
+    Cronómetro por fases:
+
+        timer = PhaseTimer()
+        with timer.phase("schedule"):
+            ...
+        timer.phases  # {"schedule": segundos}
+    """
+
+    def __init__(self):
+        self.phases = {}
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + time.perf_counter() - start
+
+    def add(self, name, seconds):
+        """Registra una fase medida en otro sitio (p. ej. dentro de solve_model)."""
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+
+def peak_memory_mb(include_children=False):
+    """
+    Memoria residente pico del proceso (MB) o None si no se puede medir.
+
+    Es el pico de todo el proceso, no solo de la última operación; basta
+    para ver si un escenario lo dispara. Las resoluciones se miden dentro
+    del proceso resolutor ('solve_service') con 'include_children', que
+    incluye el CBC que lanza PuLP como subproceso.
+    """
+    if resource is None:
+        return None
+    usage = [resource.RUSAGE_SELF] + ([resource.RUSAGE_CHILDREN] if include_children else [])
+    peak = max(resource.getrusage(who).ru_maxrss for who in usage)
+    # Linux lo da en KB y macOS en bytes
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def log_record(record, path=None):
+    """
+    Añade 'record' (dict serializable) como una línea JSON al log de
+    diagnóstico. Un fallo al escribir no debe romper la aplicación.
+    """
+    path = path or os.environ.get(DIAG_LOG_ENV)
+    if not path:
+        return
+    record = {"ts": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="milliseconds"), **record}
+    line = json.dumps(record, ensure_ascii=False, default=str)
+    try:
+        with _LOG_LOCK, open(path, "a", encoding="utf-8") as fh:
+            fh.write(line + "\n")
+    except OSError:
+        pass
@@ -0,0 +1,136 @@
+import importlib.util
+import io
+
+from schedule import SCHEDULE_LABELS
+
+SHEET_NAME = "Plantilla_Turnos"
+# Filas por bloque al volcar la plantilla: la memoria extra no crece con el tamaño
+CHUNK_ROWS = 10_000
+# Filas de muestra para estimar el ancho de columnas de texto libre
+WIDTH_SAMPLE_ROWS = 1_000
+MAX_COLUMN_WIDTH = 60
+
+EXPORT_FORMATS = {
+    "xlsx": ("Excel", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+    "csv": ("CSV", "text/csv"),
+    "parquet": ("Parquet", "application/vnd.apache.parquet"),
+}
+
+
+def available_formats():
+    """Formatos de exportación cuyas dependencias opcionales están instaladas."""
+    formats = ["csv"]
+    if importlib.util.find_spec("xlsxwriter") or importlib.util.find_spec("openpyxl"):
+        formats.insert(0, "xlsx")
+    if importlib.util.find_spec("pyarrow"):
+        formats.append("parquet")
+    return formats
+
+
+def _column_widths(df):
+    """
+    Ancho de cada columna sin recorrer todas las celdas: las columnas de
+    semana solo contienen etiquetas conocidas o totales, y para el resto
+    basta con una muestra (las primeras filas más el pie de totales).
+    """
+    known_label_len = max(len(label) for label in SCHEDULE_LABELS)
+    sample = df.head(WIDTH_SAMPLE_ROWS)
+    footer = df.tail(5)
+
+    widths = []
+    for col in df.columns:
+        values = list(sample[col].dropna()) + list(footer[col].dropna())
+        width = max((len(str(v)) for v in values), default=0)
+        if str(col).startswith("Semana"):
+            width = max(width, known_label_len)
+        widths.append(min(max(width, len(str(col))) + 2, MAX_COLUMN_WIDTH))
+    return widths
+
+
+def _iter_rows(df):
+    """Filas como tuplas, por bloques, con NaN -> None (celda vacía)."""
+    for start in range(0, len(df), CHUNK_ROWS):
+        chunk = df.iloc[start:start + CHUNK_ROWS].astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def write_xlsx(df, target):
+    """
+    Escribe la plantilla en XLSX en streaming: las filas se vuelcan por
+    bloques sin construir el libro completo en memoria. Usa XlsxWriter
+    ('constant_memory', ~3x más rápido) si está instalado y, si no,
+    openpyxl en modo 'write_only'. 'target' es una ruta o un fichero binario.
+    """
+    if importlib.util.find_spec("xlsxwriter"):
+        _write_xlsx_xlsxwriter(df, target)
+    else:
+        _write_xlsx_openpyxl(df, target)
+
+
+def _write_xlsx_xlsxwriter(df, target):
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(target, {"constant_memory": True, "in_memory": False})
+    worksheet = workbook.add_worksheet(SHEET_NAME)
+    for i, width in enumerate(_column_widths(df)):
+        worksheet.set_column(i, i, width)
+
+    worksheet.write_row(0, 0, [str(col) for col in df.columns])
+    for row_idx, row in enumerate(_iter_rows(df), start=1):
+        worksheet.write_row(row_idx, 0, row)
+    workbook.close()
+
+
+def _write_xlsx_openpyxl(df, target):
+    from openpyxl import Workbook
+    from openpyxl.utils import get_column_letter
+
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet(SHEET_NAME)
+    # En modo write_only los anchos deben fijarse antes de escribir filas
+    for i, width in enumerate(_column_widths(df), start=1):
+        worksheet.column_dimensions[get_column_letter(i)].width = width
+
+    worksheet.append([str(col) for col in df.columns])
+    for row in _iter_rows(df):
+        worksheet.append(row)
+    workbook.save(target)
+
+
+def write_csv(df, target):
+    # utf-8-sig para que Excel reconozca los acentos al abrir el CSV
+    df.to_csv(target, index=False, encoding="utf-8-sig", chunksize=CHUNK_ROWS)
+
+
+def write_parquet(df, target):
+    # Las filas de totales mezclan números y texto en la misma columna:
+    # Parquet exige un tipo por columna, así que las mixtas van como texto.
+    mixed_cols = [col for col in df.columns if df[col].dtype == object]
+    df.astype({col: "string" for col in mixed_cols}).to_parquet(target, index=False)
+
+
+_WRITERS = {"xlsx": write_xlsx, "csv": write_csv, "parquet": write_parquet}
+
+
+def export_schedule(df, fmt, target):
+    """Escribe 'df' en 'target' (ruta o fichero binario) con el formato dado."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Formato de exportación no soportado: {fmt}")
+    _WRITERS[fmt](df, target)
+
+
+def export_schedule_bytes(df, fmt):
+    """
+    Plantilla como bytes (para st.download_button). Los escritores vuelcan
+    por bloques; el fichero terminado se guarda entero en memoria, como
+    hace igualmente Streamlit al servir la descarga.
+    """
+    output = io.BytesIO()
+    export_schedule(df, fmt, output)
+    return output.getvalue()
+
+
+def convert_df_to_excel(df):
+    """Plantilla en XLSX como bytes (para st.download_button)."""
+    return export_schedule_bytes(df, "xlsx")
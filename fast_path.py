@@ -0,0 +1,303 @@
+"""
+Vía rápida exacta para instancias con 1 o 2 tipos de empleado: resuelve
+sin construir el modelo PuLP ni lanzar CBC.
+
+El modelo solo tiene 8 filas de cobertura (sábado y domingo de 4 semanas)
+y unas decenas de columnas (clases de simetría), así que:
+1. Se resuelve la relajación lineal con un símplex denso sobre el dual
+   (max b·y, A^T y <= 1, y >= 0). El origen es factible: no hay fase I.
+   Todo y dual factible da la cota inferior ceil(b·y) de la plantilla.
+2. La solución primal del símplex se redondea a entera de dos formas
+   (hacia arriba y poda del excedente; hacia abajo y relleno voraz).
+3. Si la mejor solución entera alcanza la cota, es óptima (certificado) y
+   cumple los máximos por tipo, se devuelve. Si no, 'solve_model' resuelve
+   el MIP y usa esa solución como arranque.
+
+El mismo símplex da 'lp_lower_bound': la cota de la relajación lineal del
+modelo completo (con los máximos por tipo) para cualquier número de
+tipos, que 'solve_model' calcula antes del MIP. No carga PuLP: la
+interfaz la muestra al pulsar "Calcular", antes de que termine el MIP.
+"""
+import math
+import time
+
+import numpy as np
+
+from patterns import WEEKS, column_groups_for, headcount_lower_bound, weekly_demand
+from solvers import FAST_BACKEND
+
+FAST_MAX_TYPES = 2
+
+_EPS = 1e-9
+
+
+def fast_path_eligible(employee_types_data):
+    """Instancias que intenta la vía rápida: 1 o 2 tipos, todos con patrones."""
+    return (
+        0 < len(employee_types_data) <= FAST_MAX_TYPES
+        and all(data["selected_patterns"] for data in employee_types_data.values())
+    )
+
+
+def _coverage_matrix(column_groups):
+    """Matriz A (8 filas: sábados y domingos por semana) y la columna (tipo, k) de cada índice."""
+    columns, vectors = [], []
+    for type_name, groups in column_groups.items():
+        for k, (vector, _) in enumerate(groups):
+            columns.append((type_name, k))
+            vectors.append([vector[week_idx][day] for day in (0, 1) for week_idx in range(len(WEEKS))])
+    return np.asarray(vectors, dtype=float).reshape(-1, 2 * len(WEEKS)).T, columns
+
+
+def _demand_vector(demanda_sabado, demanda_domingo):
+    """Demanda en el orden de las filas de '_coverage_matrix'."""
+    sat, sun = weekly_demand(demanda_sabado), weekly_demand(demanda_domingo)
+    return np.asarray([sat[w] for w in WEEKS] + [sun[w] for w in WEEKS], dtype=float)
+
+
+def _dual_bound(A, b, y):
+    """ceil(b·y) con y escalado para ser dual factible (A^T y <= 1, y >= 0): cota válida sin error numérico."""
+    y = np.maximum(y, 0.0)
+    scale = max(1.0, float((A.T @ y).max(initial=0.0)))
+    return math.ceil(float(b @ y) / scale - 1e-7)
+
+
+def lp_relaxation(A, b):
+    """
+    Relajación lineal  min 1·x  s.a.  A x >= b, x >= 0, resuelta por su dual
+    con símplex (regla de Bland, sin ciclos).
+
+    Devuelve (valor, x, y) o None si es infactible: el dual no está acotado
+    cuando alguna fila con demanda no la cubre ninguna columna.
+    """
+    m, n = A.shape
+    tableau = np.zeros((n + 1, m + n + 1))
+    tableau[:n, :m] = A.T
+    tableau[:n, m:m + n] = np.eye(n)
+    tableau[:n, -1] = 1.0
+    tableau[n, :m] = -b
+    basis = list(range(m, m + n))
+
+    while True:
+        entering = next((j for j in range(m + n) if tableau[n, j] < -_EPS), None)
+        if entering is None:
+            break
+        column = tableau[:n, entering]
+        candidates = [(tableau[i, -1] / column[i], basis[i], i) for i in range(n) if column[i] > _EPS]
+        if not candidates:
+            return None
+        _, _, row = min(candidates)
+        tableau[row] /= tableau[row, entering]
+        for i in range(n + 1):
+            if i != row and tableau[i, entering]:
+                tableau[i] -= tableau[i, entering] * tableau[row]
+        basis[row] = entering
+
+    y = np.zeros(m)
+    for i, var in enumerate(basis):
+        if var < m:
+            y[var] = tableau[i, -1]
+    # Los precios de las holguras del dual son la solución primal
+    x = np.maximum(tableau[n, m:m + n], 0.0)
+    return tableau[n, -1], x, y
+
+
+def _prune(counts, A, b):
+    """Quita el excedente, empezando por las columnas que menos filas cubren."""
+    coverage = A @ counts
+    for j in np.argsort(A.sum(axis=0), kind="stable"):
+        if not counts[j]:
+            continue
+        rows = A[:, j] > 0
+        removable = min(counts[j], int((coverage[rows] - b[rows]).min())) if rows.any() else counts[j]
+        if removable > 0:
+            counts[j] -= removable
+            coverage -= removable * A[:, j]
+    return counts
+
+
+def _fill(counts, A, b):
+    """Relleno voraz del déficit (columna que cubre más filas en déficit). None si no se puede."""
+    coverage = A @ counts
+    while True:
+        deficit = b - coverage
+        short = deficit > 0
+        if not short.any():
+            return counts
+        hits = A[short].sum(axis=0)
+        j = int(np.argmax(hits))
+        if not hits[j]:
+            return None
+        added = int(deficit[short & (A[:, j] > 0)].min())
+        counts[j] += added
+        coverage += added * A[:, j]
+
+
+def _rebalance(group_counts, column_groups, employee_types_data):
+    """
+    Mueve empleados de un tipo que supera su máximo a otro tipo con hueco
+    y una columna idéntica (misma contribución). True si se cumplen los máximos.
+    """
+    for type_name, counts in group_counts.items():
+        excess = sum(counts.values()) - employee_types_data[type_name]["max_employees"]
+        for other, other_counts in group_counts.items():
+            if excess <= 0 or other == type_name:
+                continue
+            room = employee_types_data[other]["max_employees"] - sum(other_counts.values())
+            other_index = {vector: k for k, (vector, _) in enumerate(column_groups[other])}
+            for k, (vector, _) in enumerate(column_groups[type_name]):
+                if excess <= 0 or room <= 0:
+                    break
+                if vector in other_index and counts[k]:
+                    moved = min(counts[k], excess, room)
+                    counts[k] -= moved
+                    other_counts[other_index[vector]] += moved
+                    excess -= moved
+                    room -= moved
+    return all(
+        sum(counts.values()) <= employee_types_data[type_name]["max_employees"]
+        for type_name, counts in group_counts.items()
+    )
+
+
+def solve_fast(demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=True):
+    """
+    Intenta resolver la instancia de forma exacta sin MIP.
+
+    Devuelve (estado, group_counts, column_groups, cota):
+    - ("Optimal", recuentos, ...) si la solución entera alcanza la cota;
+    - ("Infeasible", None, ...) si la cota demuestra que no hay solución;
+    - (None, incumbente o None, ...) si no se puede certificar: hay que
+      resolver el MIP (el incumbente, si existe, sirve de arranque).
+    """
+    column_groups = column_groups_for(employee_types_data, reduce_symmetry=reduce_symmetry)
+    A, columns = _coverage_matrix(column_groups)
+    b = _demand_vector(demanda_sabado, demanda_domingo)
+
+    lp = lp_relaxation(A, b)
+    if lp is None:
+        return "Infeasible", None, column_groups, None
+    _, x, y = lp
+
+    bound = max(
+        _dual_bound(A, b, y),
+        headcount_lower_bound(demanda_sabado, demanda_domingo, employee_types_data),
+    )
+    if bound > sum(data["max_employees"] for data in employee_types_data.values()):
+        return "Infeasible", None, column_groups, bound
+
+    candidates = [_prune(np.ceil(x - 1e-7).astype(np.int64), A, b)]
+    filled = _fill(np.floor(x + 1e-7).astype(np.int64), A, b)
+    if filled is not None:
+        candidates.append(_prune(filled, A, b))
+    counts = min(candidates, key=lambda c: int(c.sum()))
+
+    group_counts = {type_name: {k: 0 for k in range(len(groups))} for type_name, groups in column_groups.items()}
+    for (type_name, k), n in zip(columns, counts):
+        group_counts[type_name][k] = int(n)
+
+    within_limits = _rebalance(group_counts, column_groups, employee_types_data)
+    if int(counts.sum()) == bound and within_limits:
+        return "Optimal", group_counts, column_groups, bound
+    return None, group_counts if within_limits else None, column_groups, bound
+
+
+def _full_system(demanda_sabado, demanda_domingo, employee_types_data, column_groups):
+    """A x >= b del modelo completo: cobertura y máximos por tipo (-sum(x del tipo) >= -máximo)."""
+    A, columns = _coverage_matrix(column_groups)
+    type_names = list(employee_types_data)
+    limits = np.zeros((len(type_names), len(columns)))
+    for j, (type_name, _) in enumerate(columns):
+        limits[type_names.index(type_name), j] = -1.0
+    b = np.concatenate([
+        _demand_vector(demanda_sabado, demanda_domingo),
+        [-float(employee_types_data[type_name]["max_employees"]) for type_name in type_names],
+    ])
+    return np.vstack([A, limits]), b, columns
+
+
+def lp_lower_bound(demanda_sabado, demanda_domingo, employee_types_data, column_groups=None):
+    """
+    Cota inferior de la plantilla por la relajación lineal del modelo
+    completo (cobertura y máximos por tipo), con cualquier número de
+    tipos. Tarda milisegundos y no usa PuLP.
+
+    Devuelve { "value": valor de la relajación | None,
+               "bound": max(ceil(LP), 'headcount_lower_bound') | None,
+               "infeasible": True si la relajación no tiene solución (el MIP tampoco) }
+    """
+    if column_groups is None:
+        column_groups = column_groups_for(employee_types_data)
+    A, b, _ = _full_system(demanda_sabado, demanda_domingo, employee_types_data, column_groups)
+
+    lp = lp_relaxation(A, b)
+    if lp is None:
+        return {"value": None, "bound": None, "infeasible": True}
+    value, _, y = lp
+    bound = max(_dual_bound(A, b, y), headcount_lower_bound(demanda_sabado, demanda_domingo, employee_types_data))
+    return {"value": float(value), "bound": int(bound), "infeasible": False}
+
+
+def integral_lp_solution(demanda_sabado, demanda_domingo, employee_types_data, costs, column_groups=None):
+    """
+    Relajación lineal del modelo completo con coste por empleado de cada
+    tipo (1 si el tipo no está en 'costs'; p. ej. precios de 'pooling').
+    Con columnas escaladas (x' = coste * x) es el mismo símplex de coste 1.
+
+    Si el óptimo de la relajación es entero, también lo es del MIP:
+    devuelve (valor, group_counts, column_groups). Si no, o si es
+    infactible, None (hay que resolver el MIP).
+    """
+    if column_groups is None:
+        column_groups = column_groups_for(employee_types_data)
+    A, b, columns = _full_system(demanda_sabado, demanda_domingo, employee_types_data, column_groups)
+    c = np.asarray([costs.get(type_name, 1.0) for type_name, _ in columns], dtype=float)
+    lp = lp_relaxation(A / c, b) if len(columns) else None
+    if lp is None:
+        return None
+    value, x_scaled, _ = lp
+    x = x_scaled / c
+    counts = np.round(x)
+    if np.abs(x - counts).max() > 1e-7 or (A @ counts < b - 1e-7).any():
+        return None
+
+    group_counts = {type_name: {k: 0 for k in range(len(groups))} for type_name, groups in column_groups.items()}
+    for (type_name, k), n in zip(columns, counts):
+        group_counts[type_name][k] = int(n)
+    return float(c @ counts), group_counts, column_groups
+
+
+def fast_result(demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=True):
+    """
+    Resultado con el formato de 'solve_model' si la vía rápida certifica la
+    respuesta; si no, (None, incumbente, column_groups). Como no se
+    construye modelo, "timings" solo tiene "fast_path" y "extract" y
+    "model_size" es None.
+    """
+    start = time.perf_counter()
+    status, group_counts, column_groups, bound = solve_fast(
+        demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=reduce_symmetry
+    )
+    elapsed = time.perf_counter() - start
+    if status is None:
+        return None, group_counts, column_groups
+
+    # Sin modelo PuLP ni solver: las únicas fases son la vía rápida y la extracción
+    result = {
+        "status": status, "objective": None, "N": {}, "x": {}, "coverage": {"sat": {}, "sun": {}},
+        "timings": {"fast_path": elapsed, "extract": 0.0},
+        "model_size": None, "warm_start": None,
+        "solver": {"backend": FAST_BACKEND, "nodes": 0, "best_bound": bound,
+                   "gap": 0.0 if status == "Optimal" else None, "wall_time": elapsed},
+        # Cota de la relajación sin máximos por tipo (la vía rápida no expone su valor)
+        "lp_bound": {"value": None, "bound": bound, "infeasible": status == "Infeasible"},
+    }
+    if status == "Optimal":
+        # Importación diferida: 'optimizer' carga PuLP
+        from optimizer import _result_from_group_counts
+
+        result["objective"] = float(sum(sum(counts.values()) for counts in group_counts.values()))
+        start = time.perf_counter()
+        _result_from_group_counts(result, group_counts, column_groups, employee_types_data)
+        result["timings"]["extract"] = time.perf_counter() - start
+    return result, group_counts, column_groups
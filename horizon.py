@@ -0,0 +1,136 @@
+"""
+Planificación de un horizonte de varios meses: bloques consecutivos de 4
+semanas con demanda distinta por semana.
+
+Cada bloque es el modelo mensual de 'optimizer' (cada empleado descansa
+un fin de semana por bloque), y los bloques no comparten restricciones:
+el MIP del horizonte completo se descompone de forma exacta en un MIP
+por bloque. Se resuelve bloque a bloque ('rolling'):
+- un bloque con la misma demanda semanal que otro anterior reutiliza su
+  resultado sin resolver;
+- el resto arranca en caliente con la solución del bloque anterior
+  (reparada; si alcanza la cota inferior no se llama al solver).
+"""
+import time
+
+import pandas as pd
+
+from optimizer import solve_model
+from patterns import WEEKS, get_pattern_registry
+
+BLOCK_WEEKS = len(WEEKS)
+
+# Cómo se obtuvo cada bloque
+METHOD_SOLVED = "resuelto"
+METHOD_WARM = "resuelto (arranque en caliente)"
+METHOD_REPAIRED = "reparado (sin solver)"
+METHOD_REUSED = "reutilizado"
+
+
+def split_blocks(weekly_values):
+    """Divide una lista de demandas semanales en bloques de BLOCK_WEEKS."""
+    weekly_values = [int(v) for v in weekly_values]
+    if not weekly_values or len(weekly_values) % BLOCK_WEEKS:
+        raise ValueError(f"El horizonte debe tener un múltiplo de {BLOCK_WEEKS} semanas (hay {len(weekly_values)})")
+    return [weekly_values[i:i + BLOCK_WEEKS] for i in range(0, len(weekly_values), BLOCK_WEEKS)]
+
+
+def solve_horizon(sat_weekly, sun_weekly, employee_types_data, solver_options=None, progress=None, executor=None):
+    """
+    Resuelve el horizonte bloque a bloque.
+
+    'sat_weekly' / 'sun_weekly': demanda de cada semana del horizonte
+    (longitud múltiplo de 4). 'progress' (opcional) se llama con
+    (bloques_terminados, total). 'executor' (opcional): pool de procesos
+    en el que resolver cada bloque (el de 'SolveService' en la interfaz);
+    sin él se resuelve en este proceso.
+
+    Devuelve una lista con un dict por bloque:
+    { "block", "weeks": (primera, última), "demanda_sabado", "demanda_domingo",
+      "method", "seconds", "result" (el de solve_model) }
+    """
+    sat_blocks = split_blocks(sat_weekly)
+    sun_blocks = split_blocks(sun_weekly)
+    if len(sat_blocks) != len(sun_blocks):
+        raise ValueError("Las demandas de sábado y domingo deben cubrir las mismas semanas")
+
+    blocks = []
+    solved = {}            # (demanda sáb., demanda dom.) -> resultado
+    previous_x = None      # última solución factible, para el arranque en caliente
+    for i, (sat, sun) in enumerate(zip(sat_blocks, sun_blocks)):
+        start = time.perf_counter()
+        key = (tuple(sat), tuple(sun))
+        if key in solved:
+            result, method = solved[key], METHOD_REUSED
+        else:
+            args = (sat, sun, employee_types_data)
+            kwargs = {"warm_start": previous_x, "solver_options": solver_options}
+            result = executor.submit(solve_model, *args, **kwargs).result() if executor else solve_model(*args, **kwargs)
+            method = {
+                "skipped_solver": METHOD_REPAIRED,
+                "mip_start": METHOD_WARM,
+            }.get(result["warm_start"], METHOD_SOLVED)
+            solved[key] = result
+        if result["x"]:
+            previous_x = result["x"]
+
+        blocks.append({
+            "block": i + 1,
+            "weeks": (i * BLOCK_WEEKS + 1, (i + 1) * BLOCK_WEEKS),
+            "demanda_sabado": sat,
+            "demanda_domingo": sun,
+            "method": method,
+            "seconds": time.perf_counter() - start,
+            "result": result,
+        })
+        if progress:
+            progress(i + 1, len(sat_blocks))
+    return blocks
+
+
+def horizon_summary(blocks):
+    """Una fila por bloque: semanas, estado, plantilla total y por tipo, método y tiempo."""
+    type_names = []
+    for block in blocks:
+        type_names.extend(t for t in block["result"]["N"] if t not in type_names)
+
+    rows = []
+    for block in blocks:
+        result = block["result"]
+        first, last = block["weeks"]
+        row = {
+            "bloque": block["block"],
+            "semanas": f"{first}–{last}",
+            "estado": result["status"],
+            "plantilla": int(round(result["objective"])) if result["objective"] is not None else None,
+        }
+        for type_name in type_names:
+            row[f"Tipo {type_name}"] = result["N"].get(type_name)
+        row["metodo"] = block["method"]
+        row["tiempo_s"] = round(block["seconds"], 4)
+        rows.append(row)
+
+    df = pd.DataFrame(rows)
+    count_cols = ["plantilla"] + [f"Tipo {type_name}" for type_name in type_names]
+    return df.astype({col: "Int64" for col in count_cols})
+
+
+def horizon_detail(blocks):
+    """
+    Plan detallado: una fila por (bloque, tipo, patrón) con los empleados
+    que descansan en cada semana del bloque (1..4, relativa al bloque).
+    """
+    labels = get_pattern_registry().labels
+    rows = []
+    for block in blocks:
+        first, last = block["weeks"]
+        for type_name, by_pattern in block["result"]["x"].items():
+            for pattern_id, by_rest_week in by_pattern.items():
+                if not sum(by_rest_week.values()):
+                    continue
+                row = {"bloque": block["block"], "semanas": f"{first}–{last}", "tipo": type_name,
+                       "patron": labels[pattern_id], "empleados": sum(by_rest_week.values())}
+                for rest_week in WEEKS:
+                    row[f"descanso_semana_{rest_week}"] = by_rest_week[rest_week]
+                rows.append(row)
+    return pd.DataFrame(rows)
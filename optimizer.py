@@ -0,0 +1,387 @@
+import os
+import time
+
+import numpy as np
+import pulp
+
+# Los patrones viven en 'patterns' (sin PuLP); se reexportan aquí por compatibilidad
+from patterns import (  # noqa: F401
+    WEEKS, PatternRegistry, assign_weeks, column_groups_for, generate_3week_patterns, get_pattern_registry,
+    headcount_lower_bound, patterns_for_services, split_class_count, symmetry_classes, weekly_demand,
+)
+from solvers import INTEGRAL_GAP_ABS, STATUS_FEASIBLE, run_solver
+
+# Vía de resolución de 'solve_model' ("auto" | "mip" | "check")
+SOLVE_METHODS = ("auto", "mip", "check")
+SOLVE_METHOD_ENV = "OPTIMIZER_SOLVE_METHOD"
+
+
+class CrossCheckError(RuntimeError):
+    """La vía rápida y el MIP no coinciden (modo "check")."""
+
+
+# --- FUNCIÓN 5: CONSTRUCCIÓN DEL MODELO (DISPERSA) ---
+def build_model(demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=True, column_groups=None):
+    """
+    Construye el modelo PuLP de cobertura semanal. Las demandas pueden ser
+    un valor para todas las semanas o uno por semana ('weekly_demand').
+
+    Con 'reduce_symmetry' (por defecto) hay una variable por grupo de
+    columnas equivalentes ('symmetry_classes') en lugar de una por
+    (patrón, rest_week). 'column_groups' permite pasar otra agrupación ya
+    calculada (p. ej. por patrón en 'pattern_search').
+
+    Construcción dispersa: cada grupo solo registra sus coeficientes NO
+    nulos en las filas de cobertura, y cada restricción se crea
+    directamente como LpAffineExpression a partir de un dict
+    {variable: coeficiente}. El coste crece con los no nulos y no con
+    tipos x patrones x semanas.
+
+    Devuelve (model, N_vars, x_vars, column_groups).
+    """
+    employee_type_names = list(employee_types_data.keys())
+    sat_demand = weekly_demand(demanda_sabado)
+    sun_demand = weekly_demand(demanda_domingo)
+
+    model = pulp.LpProblem("Minimizar_Plantilla_Fin_de_Semana_Semanal", pulp.LpMinimize)
+
+    # Variables
+    N_vars = pulp.LpVariable.dicts("TotalEmpleados", employee_type_names, lowBound=0, cat='Integer')
+
+    # Una variable por grupo de columnas (sin reducción: un grupo por columna)
+    if column_groups is None:
+        column_groups = column_groups_for(employee_types_data, reduce_symmetry=reduce_symmetry)
+    x_vars = {}
+    for type_name in employee_type_names:
+        x_vars[type_name] = pulp.LpVariable.dicts(
+            name=f"Empleados_{type_name}",
+            indices=range(len(column_groups[type_name])),
+            lowBound=0,
+            cat='Integer'
+        )
+
+    # Objetivo (sin cambios)
+    model += pulp.lpSum(N_vars), "Minimizar_Plantilla_Total"
+
+    # -----------------------------------------------------------------
+    # --- RESTRICCIONES ---
+    # -----------------------------------------------------------------
+
+    # Índice disperso de cobertura: (día, semana) -> {variable: coeficiente != 0}
+    # día 0 = Sábado, 1 = Domingo
+    coverage_terms = {(day, w): {} for day in (0, 1) for w in WEEKS}
+    for type_name in employee_type_names:
+        # Vectores de los grupos como array denso (grupo, semana, día): solo se recorren los no nulos
+        vectors = np.asarray([vector for vector, _ in column_groups[type_name]], dtype=np.int8).reshape(-1, len(WEEKS), 2)
+        for k, week_idx, day in zip(*np.nonzero(vectors)):
+            coverage_terms[(int(day), WEEKS[week_idx])][x_vars[type_name][int(k)]] = int(vectors[k, week_idx, day])
+
+    # Restricciones de cobertura (UNA POR CADA SEMANA Y DÍA)
+    for w in WEEKS:
+        model += pulp.LpConstraint(
+            pulp.LpAffineExpression(coverage_terms[(0, w)]),
+            sense=pulp.LpConstraintGE, rhs=sat_demand[w], name=f"Cobertura_Sabado_Semana_{w}"
+        )
+        model += pulp.LpConstraint(
+            pulp.LpAffineExpression(coverage_terms[(1, w)]),
+            sense=pulp.LpConstraintGE, rhs=sun_demand[w], name=f"Cobertura_Domingo_Semana_{w}"
+        )
+
+    # Restricciones de vínculo y máximos
+    for type_name in employee_type_names:
+        link_terms = {var: 1 for var in x_vars[type_name].values()}
+        link_terms[N_vars[type_name]] = -1
+        model += pulp.LpConstraint(
+            pulp.LpAffineExpression(link_terms),
+            sense=pulp.LpConstraintEQ, rhs=0, name=f"Vinculo_Plantilla_{type_name}"
+        )
+
+        model += N_vars[type_name] <= employee_types_data[type_name]["max_employees"], f"Maximo_Empleados_{type_name}"
+
+    return model, N_vars, x_vars, column_groups
+
+
+def model_size(model):
+    """Tamaño del modelo: variables, restricciones y no nulos de la matriz."""
+    return {
+        "variables": len(model.variables()),
+        "constraints": len(model.constraints),
+        "nonzeros": sum(len(constraint) for constraint in model.constraints.values()),
+    }
+
+# --- ARRANQUE EN CALIENTE (WARM START) ---
+def _group_coverage(group_counts, column_groups):
+    """Cobertura { (día, semana): n } de unos recuentos por grupo."""
+    coverage = {(day, w): 0 for day in (0, 1) for w in WEEKS}
+    for type_name, counts in group_counts.items():
+        for k, num_empleados in counts.items():
+            if not num_empleados:
+                continue
+            vector = column_groups[type_name][k][0]
+            for week_idx, w in enumerate(WEEKS):
+                for day, coef in enumerate(vector[week_idx]):
+                    coverage[(day, w)] += coef * num_empleados
+    return coverage
+
+def repair_solution(previous_x, demanda_sabado, demanda_domingo, employee_types_data, column_groups):
+    """
+    Adapta una solución anterior { tipo: { id_patrón: { rest_week: n } } } a
+    la demanda y los máximos actuales, para usarla como arranque (MIP start).
+
+    1. Conserva los recuentos de los patrones que siguen permitidos y
+       recorta los tipos que superan su nuevo máximo.
+    2. Rellena el déficit de cobertura añadiendo empleados al grupo que
+       cubre más filas en déficit (voraz).
+    3. Quita el excedente que no hace falta para cubrir la demanda.
+
+    Devuelve { tipo: { k: n } } (k = índice de grupo) o None si no se
+    consigue una solución factible.
+    """
+    demand = {(0, w): n for w, n in weekly_demand(demanda_sabado).items()}
+    demand.update({(1, w): n for w, n in weekly_demand(demanda_domingo).items()})
+
+    group_counts = {}
+    for type_name, groups in column_groups.items():
+        previous_type = previous_x.get(type_name, {})
+        counts = {}
+        for k, (_, members) in enumerate(groups):
+            counts[k] = sum(previous_type.get(pattern_id, {}).get(rest_week, 0) for pattern_id, rest_week in members)
+        # Recortar si el máximo ha bajado (primero los grupos que menos aportan)
+        excess = sum(counts.values()) - employee_types_data[type_name]["max_employees"]
+        for k in sorted(counts, key=lambda k: sum(map(sum, groups[k][0]))):
+            if excess <= 0:
+                break
+            removed = min(counts[k], excess)
+            counts[k] -= removed
+            excess -= removed
+        group_counts[type_name] = counts
+
+    coverage = _group_coverage(group_counts, column_groups)
+
+    # --- Relleno voraz del déficit ---
+    while True:
+        deficit = {row: demand[row] - coverage[row] for row in demand if coverage[row] < demand[row]}
+        if not deficit:
+            break
+        best, best_rows = None, ()
+        for type_name, groups in column_groups.items():
+            if sum(group_counts[type_name].values()) >= employee_types_data[type_name]["max_employees"]:
+                continue
+            for k, (vector, _) in enumerate(groups):
+                rows = [(day, w) for week_idx, w in enumerate(WEEKS)
+                        for day, coef in enumerate(vector[week_idx]) if coef and (day, w) in deficit]
+                if len(rows) > len(best_rows):
+                    best, best_rows = (type_name, k), rows
+        if best is None:
+            return None
+        type_name, k = best
+        room = employee_types_data[type_name]["max_employees"] - sum(group_counts[type_name].values())
+        added = min(room, min(deficit[row] for row in best_rows))
+        group_counts[type_name][k] += added
+        for week_idx, w in enumerate(WEEKS):
+            for day, coef in enumerate(column_groups[type_name][k][0][week_idx]):
+                coverage[(day, w)] += coef * added
+
+    # --- Poda del excedente (primero los grupos que menos aportan) ---
+    candidates = [(type_name, k) for type_name, groups in column_groups.items() for k in range(len(groups))]
+    candidates.sort(key=lambda tk: sum(map(sum, column_groups[tk[0]][tk[1]][0])))
+    for type_name, k in candidates:
+        num_empleados = group_counts[type_name][k]
+        if not num_empleados:
+            continue
+        vector = column_groups[type_name][k][0]
+        rows = [(day, w) for week_idx, w in enumerate(WEEKS) for day, coef in enumerate(vector[week_idx]) if coef]
+        removable = min([num_empleados] + [coverage[row] - demand[row] for row in rows])
+        if removable > 0:
+            group_counts[type_name][k] -= removable
+            for row in rows:
+                coverage[row] -= removable
+
+    return group_counts
+
+def _result_from_group_counts(result, group_counts, column_groups, employee_types_data):
+    """Rellena N, x (desagregado) y cobertura del resultado a partir de recuentos por grupo."""
+    registry = get_pattern_registry()
+    for type_name, counts in group_counts.items():
+        result["N"][type_name] = sum(counts.values())
+        # Desagregar cada grupo en columnas (patrón, rest_week) concretas
+        x_counts = {
+            pattern_id: {rest_week: 0 for rest_week in WEEKS}
+            for pattern_id in registry.ids(employee_types_data[type_name]["selected_patterns"])
+        }
+        for k, (_, members) in enumerate(column_groups[type_name]):
+            for (pattern_id, rest_week), share in split_class_count(counts[k], members).items():
+                x_counts[pattern_id][rest_week] += share
+        result["x"][type_name] = x_counts
+
+    coverage = _group_coverage(group_counts, column_groups)
+    result["coverage"] = {
+        "sat": {w: coverage[(0, w)] for w in WEEKS},
+        "sun": {w: coverage[(1, w)] for w in WEEKS},
+    }
+    return result
+
+# --- FUNCIÓN 6: RESOLUCIÓN DEL MODELO ---
+def solve_model(demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=True, warm_start=None,
+                solver_options=None, method=None):
+    """
+    Construye ('build_model') y resuelve el modelo; los recuentos de los
+    grupos equivalentes se desagregan al final.
+
+    Resolución en dos fases: antes del MIP se calcula en milisegundos la
+    cota de la relajación lineal ('fast_path.lp_lower_bound'). Si la
+    relajación es infactible, el MIP también (no se llama al solver). Si
+    no, la cota se añade como corte (plantilla >= cota) y el solver para,
+    con gap absoluto < 1, en cuanto una solución entera la alcanza.
+
+    'warm_start' es una solución anterior { tipo: { id_patrón: { rest_week: n } } }
+    (p. ej. la última de la sesión). Se repara a la demanda actual
+    ('repair_solution'); si alcanza la cota inferior es óptima y no se
+    llama a CBC, y si no se pasa a CBC como solución inicial (MIP start).
+
+    'solver_options' elige backend, hilos, límite de tiempo y gap (ver
+    'solvers.DEFAULT_SOLVER_OPTIONS'). Si se agota el tiempo con una
+    solución entera, el estado es 'Feasible' (mejor encontrada en el límite).
+
+    'method' (por defecto, la variable de entorno OPTIMIZER_SOLVE_METHOD o "auto"):
+    - "auto": con 1 o 2 tipos se intenta antes la vía rápida exacta
+      ('fast_path'); si no certifica la respuesta se resuelve el MIP,
+      con su solución como arranque;
+    - "mip": siempre el MIP;
+    - "check": resuelve por ambas vías y lanza CrossCheckError si la vía
+      rápida certifica un estado u objetivo distinto del MIP.
+
+    Devuelve un resultado serializable (sin objetos PuLP) para poder
+    guardarlo en caché:
+    { "status", "objective", "N": {tipo: n},
+      "x": {tipo: {id_patrón: {rest_week: n}}}  (ids de 'get_pattern_registry'),
+      "coverage": {"sat": {semana: n}, "sun": {semana: n}},
+      "timings": {"build": s, "bound": s, "repair": s, "solve": s, "extract": s}
+                 ({"fast_path": s, "extract": s} si responde la vía rápida),
+      "lp_bound": {"value", "bound", "infeasible"} (ver 'lp_lower_bound'),
+      "model_size": {"variables", "constraints", "nonzeros"} | None (vía rápida),
+      "warm_start": None | "skipped_solver" | "mip_start" | "repair_failed" | "fast_incumbent",
+      "solver": {"backend", "nodes", "best_bound", "gap", "wall_time"} | None }
+    """
+    employee_type_names = list(employee_types_data.keys())
+    method = method or os.environ.get(SOLVE_METHOD_ENV, "auto")
+    if method not in SOLVE_METHODS:
+        raise ValueError(f"Método de resolución no soportado: {method}")
+
+    fast, fast_incumbent = None, None
+    if method != "mip":
+        # Importación diferida: fast_path importa este módulo
+        from fast_path import fast_path_eligible, fast_result
+        if fast_path_eligible(employee_types_data):
+            fast, fast_incumbent, _ = fast_result(
+                demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=reduce_symmetry
+            )
+            if method == "check":
+                mip = solve_model(
+                    demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=reduce_symmetry,
+                    warm_start=warm_start, solver_options=solver_options, method="mip",
+                )
+                return _cross_check(fast, mip)
+            if fast is not None:
+                return fast
+
+    # Importación diferida: fast_path importa este módulo
+    from fast_path import lp_lower_bound
+
+    start = time.perf_counter()
+    model, N_vars, x_vars, column_groups = build_model(
+        demanda_sabado, demanda_domingo, employee_types_data, reduce_symmetry=reduce_symmetry
+    )
+    build_time = time.perf_counter() - start
+
+    # Fase 1: cota de la relajación lineal
+    start = time.perf_counter()
+    lp_bound = lp_lower_bound(demanda_sabado, demanda_domingo, employee_types_data, column_groups=column_groups)
+    if not lp_bound["infeasible"]:
+        # Corte válido (ninguna solución entera tiene menos plantilla): el solver parte de la cota
+        model += pulp.lpSum(N_vars.values()) >= lp_bound["bound"], "Cota_Inferior_LP"
+    bound_time = time.perf_counter() - start
+
+    result = {
+        "status": None, "objective": None, "N": {}, "x": {}, "coverage": {"sat": {}, "sun": {}},
+        "timings": {"build": build_time, "bound": bound_time, "repair": 0.0, "solve": 0.0, "extract": 0.0},
+        "lp_bound": lp_bound, "model_size": model_size(model), "warm_start": None, "solver": None,
+    }
+    if lp_bound["infeasible"]:
+        result["status"] = "Infeasible"
+        return result
+
+    start = time.perf_counter()
+    start_counts = None
+    if warm_start is not None:
+        start_counts = repair_solution(warm_start, demanda_sabado, demanda_domingo, employee_types_data, column_groups)
+        if start_counts is None:
+            result["warm_start"] = "repair_failed"
+        else:
+            total = sum(sum(counts.values()) for counts in start_counts.values())
+            if total <= lp_bound["bound"]:
+                # La solución reparada alcanza la cota: es óptima sin resolver
+                result["status"] = "Optimal"
+                result["objective"] = float(total)
+                result["warm_start"] = "skipped_solver"
+                result["timings"]["repair"] = time.perf_counter() - start
+                start = time.perf_counter()
+                _result_from_group_counts(result, start_counts, column_groups, employee_types_data)
+                result["timings"]["extract"] = time.perf_counter() - start
+                return result
+
+            result["warm_start"] = "mip_start"
+    if start_counts is None and fast_incumbent is not None:
+        # La vía rápida no certificó la respuesta, pero su solución sirve de arranque
+        start_counts = fast_incumbent
+        result["warm_start"] = "fast_incumbent"
+    if start_counts is not None:
+        for type_name in employee_type_names:
+            N_vars[type_name].setInitialValue(sum(start_counts[type_name].values()))
+            for k, num_empleados in start_counts[type_name].items():
+                x_vars[type_name][k].setInitialValue(num_empleados)
+    result["timings"]["repair"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    # Fase 2: MIP; con objetivo entero para en cuanto incumbente - cota < 1
+    status, result["solver"] = run_solver(
+        model, solver_options, warm_start=start_counts is not None, gap_abs=INTEGRAL_GAP_ABS
+    )
+    result["timings"]["solve"] = time.perf_counter() - start
+
+    result["status"] = status
+    if status not in ('Optimal', STATUS_FEASIBLE):
+        return result
+
+    start = time.perf_counter()
+    result["objective"] = pulp.value(model.objective)
+
+    # Usamos round() y luego int() por seguridad con los floats de PuLP
+    group_counts = {
+        type_name: {k: int(round(var.value() or 0)) for k, var in x_vars[type_name].items()}
+        for type_name in employee_type_names
+    }
+    _result_from_group_counts(result, group_counts, column_groups, employee_types_data)
+    result["timings"]["extract"] = time.perf_counter() - start
+    return result
+
+
+def _cross_check(fast, mip):
+    """
+    Modo "check": compara la respuesta certificada por la vía rápida con la
+    del MIP y devuelve la del MIP con el detalle en "cross_check".
+    """
+    mip["cross_check"] = {
+        "fast_status": fast["status"] if fast else None,
+        "fast_objective": fast["objective"] if fast else None,
+    }
+    if fast is None or mip["status"] not in ("Optimal", "Infeasible"):
+        return mip
+    if fast["status"] != mip["status"] or (
+        mip["status"] == "Optimal" and round(fast["objective"]) != round(mip["objective"])
+    ):
+        raise CrossCheckError(
+            f"Vía rápida: {fast['status']} ({fast['objective']}) · MIP: {mip['status']} ({mip['objective']})"
+        )
+    return mip
+
@@ -0,0 +1,295 @@
+"""
+Conjunto mínimo de patrones: cuántas distribuciones distintas hacen falta
+como mínimo (por tipo, sumadas) para cubrir la demanda con la plantilla
+óptima, y cuánta plantilla cuesta permitir menos.
+
+Enumerar subconjuntos de patrones y resolver cada uno es exponencial. En
+su lugar se amplía el MIP de cobertura con una binaria y[tipo, patrón]
+("el tipo usa el patrón") y el vínculo x <= M·y en cada columna:
+1. plantilla óptima N* con todos los patrones ('solve_model', con la vía
+   rápida si aplica);
+2. mínimo de sum(y) con plantilla <= N*, arrancando con la solución del
+   paso 1: es el conjunto mínimo;
+3. curva de compromiso: para k = 1 .. mínimo - 1, plantilla mínima con
+   sum(y) <= k, arrancando cada punto con la solución del anterior.
+
+Las columnas se agrupan por clase de simetría DENTRO de cada patrón (las
+de 'symmetry_classes' mezclan patrones, y aquí importa cuál se usa). M es
+el menor de: el máximo del tipo y la mayor demanda de las filas que cubre
+la columna. Una columna con más empleados que eso sobrecubre todas sus
+filas y se puede rebajar sin perder cobertura ni añadir patrones, así
+que la M no excluye ninguna solución necesaria.
+"""
+import time
+
+import pandas as pd
+import pulp
+
+from fast_path import lp_lower_bound
+from optimizer import _result_from_group_counts, build_model, model_size, solve_model
+from patterns import WEEKS, get_pattern_registry, symmetry_classes, weekly_demand
+from solvers import STATUS_FEASIBLE, run_solver
+
+SOLVED_STATUSES = ("Optimal", STATUS_FEASIBLE)
+
+
+def pattern_column_groups(employee_types_data):
+    """Columnas por tipo: una por clase de simetría de cada patrón. Todos los miembros de un grupo son del mismo patrón."""
+    registry = get_pattern_registry()
+    return {
+        type_name: [
+            group
+            for pattern_id in registry.ids(data["selected_patterns"])
+            for group in symmetry_classes([pattern_id], registry)
+        ]
+        for type_name, data in employee_types_data.items()
+    }
+
+
+def build_pattern_model(demanda_sabado, demanda_domingo, employee_types_data, column_groups,
+                        max_headcount=None, max_patterns=None, minimize="headcount"):
+    """
+    Modelo de 'build_model' con las binarias de uso de patrón.
+
+    'minimize': "headcount" (plantilla total) o "patterns" (sum(y)).
+    'max_headcount' / 'max_patterns': límites opcionales de plantilla
+    total y de patrones usados.
+
+    Devuelve (model, N_vars, x_vars, y_vars) con y_vars[tipo][id_patrón].
+    """
+    model, N_vars, x_vars, _ = build_model(
+        demanda_sabado, demanda_domingo, employee_types_data, column_groups=column_groups
+    )
+    demand = {0: weekly_demand(demanda_sabado), 1: weekly_demand(demanda_domingo)}
+
+    y_vars = {}
+    for type_name, groups in column_groups.items():
+        pattern_ids = list(dict.fromkeys(members[0][0] for _, members in groups))
+        y_vars[type_name] = pulp.LpVariable.dicts(f"Usa_Patron_{type_name}", pattern_ids, cat="Binary")
+        max_employees = employee_types_data[type_name]["max_employees"]
+        for k, (vector, members) in enumerate(groups):
+            big_m = min(max_employees, max(
+                demand[day][w] for week_idx, w in enumerate(WEEKS) for day in (0, 1) if vector[week_idx][day]
+            ))
+            model += x_vars[type_name][k] <= big_m * y_vars[type_name][members[0][0]], f"Uso_{type_name}_{k}"
+
+    patterns_used = pulp.lpSum(var for by_pattern in y_vars.values() for var in by_pattern.values())
+    if minimize == "patterns":
+        model.setObjective(patterns_used)
+    if max_headcount is not None:
+        model += pulp.lpSum(N_vars.values()) <= max_headcount, "Plantilla_Maxima"
+    if max_patterns is not None:
+        model += patterns_used <= max_patterns, "Patrones_Maximos"
+    return model, N_vars, x_vars, y_vars
+
+
+def _group_counts_from_x(x_counts, column_groups):
+    """Solución { tipo: { id_patrón: { rest_week: n } } } -> recuentos por grupo (por patrón)."""
+    return {
+        type_name: {
+            k: sum(x_counts[type_name].get(pattern_id, {}).get(rest_week, 0) for pattern_id, rest_week in members)
+            for k, (_, members) in enumerate(groups)
+        }
+        for type_name, groups in column_groups.items()
+    }
+
+
+def _solve_pattern_model(model, N_vars, x_vars, y_vars, column_groups, solver_options, start_counts=None):
+    """Resuelve (con arranque opcional) y devuelve (estado, recuentos por grupo, estadísticas del solver)."""
+    if start_counts is not None:
+        for type_name, groups in column_groups.items():
+            N_vars[type_name].setInitialValue(sum(start_counts[type_name].values()))
+            used = set()
+            for k, (_, members) in enumerate(groups):
+                x_vars[type_name][k].setInitialValue(start_counts[type_name][k])
+                if start_counts[type_name][k]:
+                    used.add(members[0][0])
+            for pattern_id, var in y_vars[type_name].items():
+                var.setInitialValue(1 if pattern_id in used else 0)
+
+    status, stats = run_solver(model, solver_options, warm_start=start_counts is not None)
+    if status not in SOLVED_STATUSES:
+        return status, None, stats
+    group_counts = {
+        type_name: {k: int(round(var.value() or 0)) for k, var in x_vars[type_name].items()}
+        for type_name in x_vars
+    }
+    return status, group_counts, stats
+
+
+def _pattern_step(demanda_sabado, demanda_domingo, employee_types_data, column_groups, solver_options,
+                  start_counts=None, **limits):
+    """
+    Construye y resuelve un paso de la búsqueda ('limits': los de
+    'build_pattern_model'). Se puede ejecutar en un proceso del pool.
+
+    Devuelve (estado, recuentos por grupo, estadísticas del solver, tamaño del modelo).
+    """
+    model, N_vars, x_vars, y_vars = build_pattern_model(
+        demanda_sabado, demanda_domingo, employee_types_data, column_groups, **limits
+    )
+    status, group_counts, stats = _solve_pattern_model(
+        model, N_vars, x_vars, y_vars, column_groups, solver_options, start_counts=start_counts,
+    )
+    return status, group_counts, stats, model_size(model)
+
+
+def _patterns_used(group_counts, column_groups):
+    """{ tipo: [ids de patrón con algún empleado] } en el orden de la selección."""
+    return {
+        type_name: list(dict.fromkeys(
+            members[0][0] for k, (_, members) in enumerate(column_groups[type_name]) if group_counts[type_name][k]
+        ))
+        for type_name in column_groups
+    }
+
+
+def _tradeoff_point(max_patterns, status, group_counts, column_groups, seconds):
+    point = {"max_patterns": max_patterns, "status": status, "headcount": None,
+             "pattern_count": None, "patterns": {}, "seconds": seconds}
+    if group_counts is not None:
+        point["patterns"] = _patterns_used(group_counts, column_groups)
+        point["headcount"] = sum(sum(counts.values()) for counts in group_counts.values())
+        point["pattern_count"] = sum(len(ids) for ids in point["patterns"].values())
+    return point
+
+
+def minimum_pattern_set(demanda_sabado, demanda_domingo, employee_types_data, solver_options=None,
+                        tradeoff=True, progress=None, executor=None):
+    """
+    Conjunto mínimo de patrones con la plantilla óptima y curva de compromiso.
+
+    'progress' (opcional) se llama con un texto por paso. 'executor'
+    (opcional): pool de procesos en el que resolver cada paso (el de
+    'SolveService' en la interfaz); sin él se resuelve en este proceso.
+
+    Devuelve:
+    { "status", "optimal_headcount", "selected_count" (patrones permitidos),
+      "pattern_count", "patterns": {tipo: [id_patrón]},
+      "result" (formato de 'solve_model' restringido al conjunto mínimo),
+      "tradeoff": [ {"max_patterns", "status", "headcount", "pattern_count", "patterns", "seconds"} ]
+                  (de 1 patrón al mínimo; el último punto es el conjunto mínimo) }
+    """
+    def run(fn, *args, **kwargs):
+        return executor.submit(fn, *args, **kwargs).result() if executor else fn(*args, **kwargs)
+
+    registry = get_pattern_registry()
+    selected_count = sum(len(registry.ids(data["selected_patterns"])) for data in employee_types_data.values())
+    search = {"status": None, "optimal_headcount": None, "selected_count": selected_count,
+              "pattern_count": None, "patterns": {}, "result": None, "tradeoff": []}
+
+    # 1. Plantilla óptima con todos los patrones permitidos
+    if progress:
+        progress("Plantilla óptima con todos los patrones…")
+    base = run(solve_model, demanda_sabado, demanda_domingo, employee_types_data, solver_options=solver_options)
+    search["status"] = base["status"]
+    if base["status"] not in SOLVED_STATUSES:
+        return search
+    optimal_headcount = int(round(base["objective"]))
+    search["optimal_headcount"] = optimal_headcount
+
+    # 2. Mínimo de patrones con esa plantilla (la solución del paso 1 es factible)
+    if progress:
+        progress(f"Mínimo de patrones con plantilla {optimal_headcount}…")
+    column_groups = pattern_column_groups(employee_types_data)
+    start = time.perf_counter()
+    status, group_counts, stats, size = run(
+        _pattern_step, demanda_sabado, demanda_domingo, employee_types_data, column_groups, solver_options,
+        start_counts=_group_counts_from_x(base["x"], column_groups),
+        max_headcount=optimal_headcount, minimize="patterns",
+    )
+    minimum = _tradeoff_point(None, status, group_counts, column_groups, time.perf_counter() - start)
+    if group_counts is None:
+        search["status"] = status
+        return search
+    if status == STATUS_FEASIBLE or base["status"] == STATUS_FEASIBLE:
+        search["status"] = STATUS_FEASIBLE
+    search["pattern_count"] = minimum["pattern_count"]
+    search["patterns"] = minimum["patterns"]
+
+    # Resultado con el formato de solve_model (solo los patrones del conjunto mínimo)
+    minimal_types = {
+        type_name: dict(data, selected_patterns=search["patterns"][type_name])
+        for type_name, data in employee_types_data.items()
+    }
+    # Cota de la relajación LP del conjunto mínimo (fase 'bound' de solve_model)
+    start = time.perf_counter()
+    lp_bound = lp_lower_bound(demanda_sabado, demanda_domingo, minimal_types)
+    bound_time = time.perf_counter() - start
+    result = {
+        "status": status, "objective": float(minimum["headcount"]), "N": {}, "x": {},
+        "coverage": {"sat": {}, "sun": {}},
+        "timings": {"build": 0.0, "bound": bound_time, "repair": 0.0, "solve": minimum["seconds"], "extract": 0.0},
+        "lp_bound": lp_bound, "model_size": size, "warm_start": None, "solver": stats,
+    }
+    minimal_groups = {
+        type_name: [group for group in groups if group[1][0][0] in search["patterns"][type_name]]
+        for type_name, groups in column_groups.items()
+    }
+    minimal_counts = {
+        type_name: {
+            k: count for k, count in enumerate(
+                group_counts[type_name][j] for j, group in enumerate(column_groups[type_name])
+                if group[1][0][0] in search["patterns"][type_name]
+            )
+        }
+        for type_name in column_groups
+    }
+    search["result"] = _result_from_group_counts(result, minimal_counts, minimal_groups, minimal_types)
+
+    # 3. Curva de compromiso: plantilla mínima con menos patrones
+    points = []
+    previous_counts = None
+    for max_patterns in range(1, minimum["pattern_count"] if tradeoff else 1):
+        if progress:
+            progress(f"Plantilla mínima con {max_patterns} patrón(es) como máximo…")
+        start = time.perf_counter()
+        status, group_counts, _, _ = run(
+            _pattern_step, demanda_sabado, demanda_domingo, employee_types_data, column_groups, solver_options,
+            start_counts=previous_counts, max_patterns=max_patterns,
+        )
+        points.append(_tradeoff_point(max_patterns, status, group_counts, column_groups, time.perf_counter() - start))
+        if group_counts is not None:
+            # Factible también con un patrón más: arranque del siguiente punto
+            previous_counts = group_counts
+    minimum["max_patterns"] = minimum["pattern_count"]
+    search["tradeoff"] = points + [minimum]
+    return search
+
+
+def pattern_set_summary(search, employee_types_data):
+    """Una fila por (tipo, patrón) del conjunto mínimo con sus empleados."""
+    labels = get_pattern_registry().labels
+    rows = []
+    for type_name, pattern_ids in search["patterns"].items():
+        x_counts = search["result"]["x"][type_name]
+        for pattern_id in pattern_ids:
+            rows.append({
+                "tipo": type_name,
+                "patron": labels[pattern_id],
+                "empleados": sum(x_counts[pattern_id].values()),
+                "patrones_permitidos_tipo": len(employee_types_data[type_name]["selected_patterns"]),
+            })
+    return pd.DataFrame(rows)
+
+
+def tradeoff_frame(search):
+    """Curva de compromiso: una fila por límite de patrones con la plantilla mínima y el exceso sobre la óptima."""
+    labels = get_pattern_registry().labels
+    rows = []
+    for point in search["tradeoff"]:
+        rows.append({
+            "patrones_max": point["max_patterns"],
+            "estado": point["status"],
+            "plantilla": point["headcount"],
+            "exceso_plantilla": (point["headcount"] - search["optimal_headcount"]
+                                 if point["headcount"] is not None else None),
+            "patrones_usados": point["pattern_count"],
+            "patrones": " · ".join(
+                f"{type_name}: " + ", ".join(labels[i] for i in ids) for type_name, ids in point["patterns"].items() if ids
+            ),
+            "tiempo_s": round(point["seconds"], 4),
+        })
+    df = pd.DataFrame(rows, columns=["patrones_max", "estado", "plantilla", "exceso_plantilla",
+                                     "patrones_usados", "patrones", "tiempo_s"])
+    return df.astype({col: "Int64" for col in ["plantilla", "exceso_plantilla", "patrones_usados"]})
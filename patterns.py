@@ -0,0 +1,280 @@
+"""
+Datos estáticos de los patrones de trabajo: enumeración, asignación
+semanal, registro de contribuciones ('PatternRegistry'), columnas del
+modelo por tipo ('column_groups_for') y cota barata de la plantilla.
+
+Solo depende de numpy: la interfaz pinta los selectores de patrones sin
+cargar PuLP ni pandas, que se importan al resolver o al descargar
+('optimizer', 'schedule', 'export'). El registro se construye una vez
+por proceso (menos de 1 ms) con 'get_pattern_registry'.
+"""
+import functools
+import math
+
+import numpy as np
+
+# Semanas del mes: cada empleado descansa un fin de semana de los cuatro
+WEEKS = [1, 2, 3, 4]
+
+
+def weekly_demand(demand, weeks_list=WEEKS):
+    """
+    Demanda por semana { semana: n }. Acepta un único valor (el mismo todas
+    las semanas), una lista en el orden de 'weeks_list' o un dict por semana.
+    """
+    if isinstance(demand, dict):
+        return {w: int(demand[w]) for w in weeks_list}
+    if isinstance(demand, (list, tuple)):
+        if len(demand) != len(weeks_list):
+            raise ValueError(f"Se esperaban {len(weeks_list)} valores de demanda semanal, hay {len(demand)}")
+        return {w: int(n) for w, n in zip(weeks_list, demand)}
+    return {w: int(demand) for w in weeks_list}
+
+# --- FUNCIÓN 1: SIN CAMBIOS ---
+def generate_3week_patterns():
+    """
+    Genera TODOS los patrones de trabajo posibles que se pueden
+    realizar en 3 semanas de trabajo (1 finde libre).
+    
+    Devuelve: { "display_str": {"pulp": (Sáb/sem, Dom/sem), "components": (s,d,c)} }
+    """
+    pattern_map = {}
+    # s = sábados solos, d = domingos solos, c = fines de semana completos
+    for c in range(4): # 0, 1, 2, 3
+        for s in range(4): # 0, 1, 2, 3
+            for d in range(4): # 0, 1, 2, 3
+                
+                total_weekends_worked = s + d + c
+                
+                if total_weekends_worked > 0 and total_weekends_worked <= 3:
+                    
+                    # Aporte SEMANAL (promedio sobre las 3 semanas de trabajo)
+                    # NOTA: Este valor "pulp" ya no se usa en el modelo, pero se mantiene
+                    # para no alterar la estructura de datos.
+                    avg_s = (s + c) / 3.0
+                    avg_d = (d + c) / 3.0
+                    
+                    pulp_tuple = (avg_s, avg_d)
+                    components = (s, d, c)
+                    
+                    parts = []
+                    if s > 0: parts.append(f"{s} Sáb. solo(s)")
+                    if d > 0: parts.append(f"{d} Dom. solo(s)")
+                    if c > 0: parts.append(f"{c} Finde(s) Completo(s)")
+                    
+                    display_str = ", ".join(parts)
+
+                    if display_str:
+                        pattern_map[display_str] = {
+                            "pulp": pulp_tuple, # Clave "pulp" ya no se usa en el modelo
+                            "components": components,
+                            "work_weeks": total_weekends_worked
+                        }
+                        
+    return pattern_map
+
+# --- LÓGICA DE ASIGNACIÓN DETERMINÍSTICA (ÚNICA FUENTE) ---
+def assign_weeks(components, rest_week, weeks_list):
+    """
+    Asigna a cada semana del mes lo que trabaja un empleado con el patrón
+    (s, d, c) y la semana de descanso dada.
+
+    Es la ÚNICA implementación de la lógica de asignación: de ella sale el
+    array de contribuciones de 'PatternRegistry', que usan tanto el modelo
+    como 'generate_schedule_df' (plantilla), así que la cobertura del
+    modelo cuadra con la exportada.
+
+    Devuelve: { week: "Finde Completo" | "Sábado" | "Domingo" | "Descanso" | "Descanso (LIBRE)" }
+    """
+    s, d, c = components
+    work_weeks = [w for w in weeks_list if w != rest_week]
+
+    work_schedule = {rest_week: "Descanso (LIBRE)"}
+
+    weeks_for_c = work_weeks[:c]
+    for wk in weeks_for_c:
+        work_schedule[wk] = "Finde Completo"
+
+    available_weeks = [w for w in work_weeks if w not in work_schedule][:s]
+    for wk in available_weeks:
+        work_schedule[wk] = "Sábado"
+
+    available_weeks = [w for w in work_weeks if w not in work_schedule][:d]
+    for wk in available_weeks:
+        work_schedule[wk] = "Domingo"
+
+    available_weeks = [w for w in work_weeks if w not in work_schedule]
+    for wk in available_weeks:
+        work_schedule[wk] = "Descanso"
+
+    return work_schedule
+
+# --- FUNCIÓN 3: REGISTRO COMPACTO DE PATRONES ---
+# Aporte (sábado, domingo) de cada asignación semanal de 'assign_weeks'
+_DAY_CONTRIBUTION = {
+    "Finde Completo": (1, 1),
+    "Sábado": (1, 0),
+    "Domingo": (0, 1),
+    "Descanso": (0, 0),
+    "Descanso (LIBRE)": (0, 0),
+}
+
+
+class PatternRegistry:
+    """
+    Patrones indexados por un id entero (0..P-1), con sus datos en arrays:
+
+    - labels[i]: texto del patrón ("1 Sáb. solo(s), 2 Finde(s) Completo(s)"),
+      solo para la interfaz y los ficheros de salida;
+    - components[i] = (s, d, c)                          (int8, P x 3);
+    - contributions[i, r, w, día] = 1 si el patrón i, con descanso en la
+      semana weeks[r], trabaja ese día (0 = sábado, 1 = domingo) de la
+      semana weeks[w]                                    (int8, P x 4 x 4 x 2).
+
+    Las contribuciones salen de 'assign_weeks', la MISMA lógica que la
+    plantilla, así que la cobertura del modelo cuadra con la exportada.
+    El modelo, los resultados y la plantilla trabajan con ids; 'ids'
+    traduce las selecciones de la interfaz (textos) a ids.
+    """
+
+    __slots__ = ("labels", "index", "weeks", "components", "contributions")
+
+    def __init__(self, pattern_map, weeks_list=WEEKS):
+        self.labels = list(pattern_map)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.weeks = list(weeks_list)
+        self.components = np.array(
+            [pattern_map[label]["components"] for label in self.labels], dtype=np.int8
+        ).reshape(-1, 3)
+        self.contributions = np.zeros((len(self.labels), len(weeks_list), len(weeks_list), 2), dtype=np.int8)
+        for i, label in enumerate(self.labels):
+            for r, rest_week in enumerate(weeks_list):
+                work_schedule = assign_weeks(pattern_map[label]["components"], rest_week, weeks_list)
+                self.contributions[i, r] = [_DAY_CONTRIBUTION[work_schedule[w]] for w in weeks_list]
+
+    def __len__(self):
+        return len(self.labels)
+
+    def ids(self, patterns):
+        """Ids de una selección de patrones (textos de la interfaz o ids ya resueltos)."""
+        ids = []
+        for pattern in patterns:
+            if isinstance(pattern, str):
+                if pattern not in self.index:
+                    raise ValueError(f"Patrón desconocido: {pattern}")
+                ids.append(self.index[pattern])
+            else:
+                ids.append(int(pattern))
+        return ids
+
+    def services(self):
+        """Servicios al mes de cada patrón (s + d + 2c)."""
+        s, d, c = self.components.astype(np.int64).T
+        return s + d + 2 * c
+
+    def vector(self, pattern_id, rest_week):
+        """Contribución ((sáb., dom.) por semana) como tupla: clave de las clases de simetría."""
+        r = self.weeks.index(rest_week)
+        return tuple(map(tuple, self.contributions[pattern_id, r].tolist()))
+
+
+# --- PATRONES MEMORIZADOS POR PROCESO ---
+@functools.lru_cache(maxsize=None)
+def get_pattern_registry():
+    """
+    Los patrones y sus contribuciones son estáticos: el registro se
+    construye una vez por proceso y NO debe modificarse.
+    """
+    return PatternRegistry(generate_3week_patterns(), WEEKS)
+
+def patterns_for_services(services_per_employee):
+    """Textos de los patrones cuyo total de servicios/mes (s + d + 2c) coincide con el pedido."""
+    registry = get_pattern_registry()
+    return [registry.labels[i] for i in np.flatnonzero(registry.services() == services_per_employee)]
+
+# --- REDUCCIÓN DE SIMETRÍAS ---
+def symmetry_classes(pattern_ids, registry=None):
+    """
+    Agrupa las columnas (patrón, rest_week) con el MISMO vector de
+    contribución semanal. Dentro de un tipo son intercambiables en el
+    modelo, así que basta una variable entera por grupo: se eliminan
+    soluciones simétricas y el árbol de ramificación de CBC es menor.
+
+    Ej.: "1 Sáb. solo(s)" con descanso en la semana 2, 3 o 4 trabaja
+    siempre el sábado de la semana 1.
+
+    Devuelve [(vector, [(id_patrón, rest_week), ...])] en orden de
+    primera aparición; vector = ((s_contrib, d_contrib) por semana).
+    """
+    registry = registry or get_pattern_registry()
+    classes = {}
+    for pattern_id in pattern_ids:
+        for rest_week in registry.weeks:
+            classes.setdefault(registry.vector(pattern_id, rest_week), []).append((pattern_id, rest_week))
+    return list(classes.items())
+
+def split_class_count(num_empleados, members):
+    """
+    Reparte los empleados de un grupo agregado entre sus columnas
+    concretas. Todas aportan lo mismo, así que cualquier reparto mantiene
+    la cobertura; se reparte por igual para equilibrar las semanas de descanso.
+
+    Devuelve { (id_patrón, rest_week): n }
+    """
+    base, extra = divmod(num_empleados, len(members))
+    return {member: base + (1 if i < extra else 0) for i, member in enumerate(members)}
+
+def column_groups_for(employee_types_data, reduce_symmetry=True):
+    """
+    Columnas del modelo por tipo: [(vector, [(id_patrón, rest_week), ...])].
+    Con 'reduce_symmetry', un grupo por clase de columnas equivalentes;
+    sin ella, un grupo por (patrón, rest_week).
+    """
+    registry = get_pattern_registry()
+    column_groups = {}
+    for type_name, data in employee_types_data.items():
+        pattern_ids = registry.ids(data["selected_patterns"])
+        if reduce_symmetry:
+            column_groups[type_name] = symmetry_classes(pattern_ids, registry)
+        else:
+            column_groups[type_name] = [
+                (registry.vector(pattern_id, rest_week), [(pattern_id, rest_week)])
+                for pattern_id in pattern_ids
+                for rest_week in WEEKS
+            ]
+    return column_groups
+
+# --- COTA INFERIOR BARATA DE LA PLANTILLA ---
+def headcount_lower_bound(demanda_sabado, demanda_domingo, employee_types_data):
+    """
+    Cota inferior barata de la plantilla total (ignora los máximos por tipo):
+    - cada empleado cubre como mucho un sábado y un domingo por semana;
+    - en el mes hacen falta la suma de las demandas semanales de cada día,
+      y cada empleado aporta como mucho el máximo (s + c) / (d + c) /
+      servicios de los patrones permitidos.
+    Si una solución factible la alcanza, es óptima y no hace falta CBC.
+    """
+    registry = get_pattern_registry()
+    pattern_ids = [
+        pattern_id
+        for data in employee_types_data.values()
+        for pattern_id in registry.ids(data["selected_patterns"])
+    ]
+    if not pattern_ids:
+        return 0
+
+    sat_demand = weekly_demand(demanda_sabado)
+    sun_demand = weekly_demand(demanda_domingo)
+    month_sat, month_sun = sum(sat_demand.values()), sum(sun_demand.values())
+    s, d, c = registry.components[pattern_ids].astype(np.int64).T
+    max_sat = int((s + c).max())
+    max_sun = int((d + c).max())
+    max_services = int((s + d + 2 * c).max())
+
+    bounds = [max(sat_demand.values()), max(sun_demand.values()),
+              math.ceil((month_sat + month_sun) / max_services)]
+    if max_sat:
+        bounds.append(math.ceil(month_sat / max_sat))
+    if max_sun:
+        bounds.append(math.ceil(month_sun / max_sun))
+    return max(bounds)
@@ -0,0 +1,473 @@
+"""
+Optimización conjunta de varias sedes con bolsas compartidas de empleados
+por tipo (tipos que se mueven entre sedes cercanas).
+
+Cada sede mantiene su cobertura semanal y su máximo por tipo; además, para
+los tipos de 'pools', la plantilla sumada de todas las sedes no puede
+superar la bolsa: sum_sedes N[sede, tipo] <= pools[tipo].
+
+Descomposición de Dantzig-Wolfe (generación de columnas), en lugar de un
+único MIP con todas las sedes:
+- Una columna es un plan de una sede (N por tipo, con su asignación de
+  patrones). Se parte de la solución aislada de cada sede.
+- El maestro (LP) combina planes de cada sede respetando las bolsas; la
+  falta de bolsa se permite con una holgura muy penalizada (fase I).
+- Con los duales de las bolsas (pi <= 0), cada sede con tipos compartidos
+  resuelve su subproblema de precio: el modelo de 'build_model' con coste
+  (1 - pi[tipo]) por empleado. Las sedes se resuelven en paralelo; si la
+  relajación de la sede ya tiene óptimo entero
+  ('fast_path.integral_lp_solution'), no se llama al solver.
+- Cota inferior lagrangiana en cada iteración:
+  sum_sedes precio(sede) + sum_tipos pi[tipo] * pools[tipo].
+- Al no quedar planes con coste reducido negativo (o al agotar iteraciones
+  o tiempo), un maestro entero elige un plan por sede. Es 'Optimal' si
+  alcanza ceil(cota).
+- Si no la alcanza, o si ninguna combinación de los planes generados cabe
+  en las bolsas (la instancia puede ser factible igualmente), se resuelve
+  el MIP conjunto con ceil(cota) como corte y el plan del maestro como
+  arranque. Si el tiempo no da para demostrar el óptimo, el resultado es
+  'Feasible' con el gap frente a la cota.
+
+'method="monolithic"' resuelve el MIP conjunto completo (para comprobar
+la descomposición o con pocas sedes).
+"""
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pulp
+
+from fast_path import integral_lp_solution
+from optimizer import _result_from_group_counts, build_model, column_groups_for
+from patterns import WEEKS, weekly_demand
+from solvers import FAST_BACKEND, INTEGRAL_GAP_ABS, STATUS_FEASIBLE, run_solver
+
+POOL_METHODS = ("decomposition", "monolithic")
+
+# Iteraciones máximas de generación de columnas
+MAX_ITERATIONS = 100
+
+# Segundos que se dan al solver aunque el límite de tiempo ya se haya
+# agotado: basta para devolver una solución entera con el arranque
+MIN_SOLVE_SECONDS = 1.0
+
+_EPS = 1e-6
+
+
+def _empty_plan():
+    return {
+        "status": None, "objective": None, "N": {}, "x": {}, "coverage": {"sat": {}, "sun": {}},
+        "timings": {"build": 0.0, "solve": 0.0}, "solver": None,
+    }
+
+
+def price_site(demanda_sabado, demanda_domingo, employee_types_data, costs, solver_options=None):
+    """
+    Subproblema de precio de una sede: el modelo de 'build_model' con
+    objetivo sum_tipos costs[tipo] * N[tipo] (1 si el tipo no está en 'costs').
+
+    Devuelve (estado, cota, plan): 'cota' es una cota inferior válida del
+    valor del subproblema (None si el solver no la da) y 'plan' tiene el
+    formato de 'solve_model' (N, x, coverage, timings, solver).
+    """
+    plan = _empty_plan()
+    start = time.perf_counter()
+    integral = integral_lp_solution(demanda_sabado, demanda_domingo, employee_types_data, costs)
+    if integral is not None:
+        value, group_counts, column_groups = integral
+        _result_from_group_counts(plan, group_counts, column_groups, employee_types_data)
+        plan["objective"] = float(sum(plan["N"].values()))
+        plan["status"] = "Optimal"
+        plan["timings"]["solve"] = time.perf_counter() - start
+        plan["solver"] = {"backend": FAST_BACKEND, "nodes": 0, "best_bound": value, "gap": 0.0,
+                          "wall_time": plan["timings"]["solve"]}
+        return "Optimal", value, plan
+
+    start = time.perf_counter()
+    model, N_vars, x_vars, column_groups = build_model(demanda_sabado, demanda_domingo, employee_types_data)
+    model.setObjective(pulp.lpSum(costs.get(type_name, 1.0) * var for type_name, var in N_vars.items()))
+    plan["timings"]["build"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    status, plan["solver"] = run_solver(model, solver_options)
+    plan["timings"]["solve"] = time.perf_counter() - start
+    plan["status"] = status
+    if status not in ("Optimal", STATUS_FEASIBLE):
+        return status, None, plan
+
+    group_counts = {
+        type_name: {k: int(round(var.value() or 0)) for k, var in x_vars[type_name].items()}
+        for type_name in N_vars
+    }
+    _result_from_group_counts(plan, group_counts, column_groups, employee_types_data)
+    plan["objective"] = float(sum(plan["N"].values()))
+    value = pulp.value(model.objective)
+    best_bound = plan["solver"]["best_bound"]
+    if status == "Optimal":
+        bound = value if best_bound is None else min(value, best_bound)
+    else:
+        bound = best_bound
+    return status, bound, plan
+
+
+def _price_task(args):
+    """Precio de una sede (se ejecuta en un proceso del pool)."""
+    i, demanda_sabado, demanda_domingo, employee_types_data, costs, solver_options = args
+    return (i, *price_site(demanda_sabado, demanda_domingo, employee_types_data, costs, solver_options))
+
+
+def _remaining_options(solver_options, deadline):
+    """'solver_options' con el límite de tiempo recortado a lo que queda hasta 'deadline'."""
+    if deadline is None:
+        return solver_options
+    remaining = max(MIN_SOLVE_SECONDS, deadline - time.perf_counter())
+    options = dict(solver_options or {})
+    if options.get("time_limit") is None or options["time_limit"] > remaining:
+        options["time_limit"] = remaining
+    return options
+
+
+def _plan_key(plan):
+    return tuple(sorted(plan["N"].items()))
+
+
+def _pool_usage(plans, pools):
+    return {type_name: sum(plan["N"].get(type_name, 0) for plan in plans) for type_name in pools}
+
+
+def _master(columns, pools, penalty, integer):
+    """
+    Maestro de Dantzig-Wolfe sobre los planes generados. LP: holgura de
+    bolsa con coste 'penalty'; entero: un plan por sede y bolsas estrictas.
+    Devuelve (model, lam, slack).
+    """
+    cat = "Binary" if integer else "Continuous"
+    model = pulp.LpProblem("Maestro_Bolsas", pulp.LpMinimize)
+    lam = {
+        (i, k): pulp.LpVariable(f"Plan_{i}_{k}", lowBound=0, upBound=1, cat=cat)
+        for i, site_columns in enumerate(columns)
+        for k in range(len(site_columns))
+    }
+    slack = {} if integer else {
+        type_name: pulp.LpVariable(f"Falta_Bolsa_{j}", lowBound=0) for j, type_name in enumerate(pools)
+    }
+    model += (
+        pulp.lpSum(columns[i][k]["objective"] * var for (i, k), var in lam.items())
+        + pulp.lpSum(penalty * var for var in slack.values())
+    ), "Plantilla_Total"
+    for i, site_columns in enumerate(columns):
+        model += pulp.lpSum(lam[(i, k)] for k in range(len(site_columns))) == 1, f"Convexidad_{i}"
+    for j, (type_name, limit) in enumerate(pools.items()):
+        usage = pulp.lpSum(
+            columns[i][k]["N"][type_name] * var for (i, k), var in lam.items() if type_name in columns[i][k]["N"]
+        )
+        if type_name in slack:
+            usage -= slack[type_name]
+        model += usage <= limit, f"Bolsa_{j}"
+    return model, lam, slack
+
+
+def build_pooled_model(scenarios, pools):
+    """
+    MIP conjunto de todas las sedes (sin descomponer): la cobertura y los
+    máximos de cada sede como en 'build_model' más las restricciones de
+    bolsa. Devuelve (model, x_vars, column_groups) con x_vars[i][tipo][k]
+    y column_groups[i] por sede.
+    """
+    model = pulp.LpProblem("Minimizar_Plantilla_Sedes_Con_Bolsas", pulp.LpMinimize)
+    x_vars, all_groups, totals = [], [], []
+    pool_terms = {type_name: [] for type_name in pools}
+    for i, (_, demanda_sabado, demanda_domingo, employee_types_data) in enumerate(scenarios):
+        sat_demand, sun_demand = weekly_demand(demanda_sabado), weekly_demand(demanda_domingo)
+        column_groups = column_groups_for(employee_types_data)
+        site_vars = {
+            type_name: pulp.LpVariable.dicts(f"Empleados_{i}_{t}", range(len(column_groups[type_name])),
+                                             lowBound=0, cat="Integer")
+            for t, type_name in enumerate(employee_types_data)
+        }
+        coverage_terms = {(day, w): {} for day in (0, 1) for w in WEEKS}
+        for type_name, groups in column_groups.items():
+            for k, (vector, _) in enumerate(groups):
+                for week_idx, w in enumerate(WEEKS):
+                    for day, coef in enumerate(vector[week_idx]):
+                        if coef:
+                            coverage_terms[(day, w)][site_vars[type_name][k]] = coef
+            type_total = pulp.lpSum(site_vars[type_name].values())
+            model += type_total <= employee_types_data[type_name]["max_employees"], f"Maximo_{i}_{len(totals)}"
+            totals.append(type_total)
+            if type_name in pool_terms:
+                pool_terms[type_name].append(type_total)
+        for w in WEEKS:
+            model += pulp.LpAffineExpression(coverage_terms[(0, w)]) >= sat_demand[w], f"Cobertura_Sabado_{i}_{w}"
+            model += pulp.LpAffineExpression(coverage_terms[(1, w)]) >= sun_demand[w], f"Cobertura_Domingo_{i}_{w}"
+        x_vars.append(site_vars)
+        all_groups.append(column_groups)
+
+    model += pulp.lpSum(totals), "Plantilla_Total"
+    for j, (type_name, limit) in enumerate(pools.items()):
+        model += pulp.lpSum(pool_terms[type_name]) <= limit, f"Bolsa_{j}"
+    return model, x_vars, all_groups
+
+
+def _pooled_result(scenarios, pools, status, plans, lower_bound):
+    """Resultado conjunto a partir de un plan por sede (o None si no hay solución)."""
+    result = {
+        "status": status, "objective": None, "lower_bound": lower_bound, "gap": None,
+        "pools": dict(pools), "pool_usage": None, "sites": {},
+        "iterations": 0, "columns": 0, "history": [],
+        "timings": {"initial": 0.0, "pricing": 0.0, "master": 0.0, "integer": 0.0, "fallback": 0.0},
+    }
+    if plans is None:
+        return result
+    for (sede, *_), plan in zip(scenarios, plans):
+        result["sites"][sede] = dict(plan, status=status)
+    result["objective"] = float(sum(plan["objective"] for plan in plans))
+    result["pool_usage"] = _pool_usage(plans, pools)
+    if lower_bound is not None and result["objective"]:
+        result["gap"] = max(0.0, (result["objective"] - lower_bound) / result["objective"])
+    return result
+
+
+def _plan_group_counts(plan, column_groups):
+    """Recuentos por grupo de 'column_groups' de un plan { tipo: { id_patrón: { rest_week: n } } }."""
+    return {
+        type_name: {
+            k: sum(plan["x"][type_name].get(pattern_id, {}).get(rest_week, 0) for pattern_id, rest_week in members)
+            for k, (_, members) in enumerate(groups)
+        }
+        for type_name, groups in column_groups.items()
+    }
+
+
+def _solve_monolithic(scenarios, pools, solver_options, deadline=None, lower_bound=None, start_plans=None):
+    """
+    MIP conjunto ('build_pooled_model'). 'lower_bound' (opcional) se añade
+    como corte (plantilla >= cota) y 'start_plans' (un plan por sede) como
+    solución inicial.
+    """
+    start = time.perf_counter()
+    model, x_vars, all_groups = build_pooled_model(scenarios, pools)
+    if lower_bound is not None:
+        model += model.objective >= lower_bound, "Cota_Inferior"
+    if start_plans is not None:
+        for plan, site_vars, column_groups in zip(start_plans, x_vars, all_groups):
+            for type_name, counts in _plan_group_counts(plan, column_groups).items():
+                for k, num_empleados in counts.items():
+                    site_vars[type_name][k].setInitialValue(num_empleados)
+    build_time = time.perf_counter() - start
+    start = time.perf_counter()
+    status, stats = run_solver(model, _remaining_options(solver_options, deadline),
+                               warm_start=start_plans is not None, gap_abs=INTEGRAL_GAP_ABS)
+    solve_time = time.perf_counter() - start
+
+    plans = None
+    if status in ("Optimal", STATUS_FEASIBLE):
+        plans = []
+        for (_, _, _, employee_types_data), site_vars, column_groups in zip(scenarios, x_vars, all_groups):
+            plan = _empty_plan()
+            group_counts = {
+                type_name: {k: int(round(var.value() or 0)) for k, var in site_vars[type_name].items()}
+                for type_name in site_vars
+            }
+            _result_from_group_counts(plan, group_counts, column_groups, employee_types_data)
+            plan["objective"] = float(sum(plan["N"].values()))
+            plans.append(plan)
+    bounds = [bound for bound in (lower_bound, stats["best_bound"]) if bound is not None]
+    best_bound = math.ceil(max(bounds) - _EPS) if bounds else None
+    if status == STATUS_FEASIBLE and best_bound is not None:
+        # Parada por límite con un incumbente que ya alcanza la cota
+        if sum(plan["objective"] for plan in plans) <= best_bound:
+            status = "Optimal"
+    result = _pooled_result(scenarios, pools, status, plans, best_bound)
+    result["timings"].update(master=build_time, integer=solve_time)
+    result["solver"] = stats
+    return result
+
+
+def solve_pooled(scenarios, pools, workers=None, solver_options=None, method=None,
+                 max_iterations=MAX_ITERATIONS, time_limit=None, progress=None):
+    """
+    Plantilla mínima conjunta de varias sedes con bolsas compartidas por tipo.
+
+    scenarios: [(sede, demanda_sabado, demanda_domingo, employee_types_data)]
+      (ver 'batch.build_site_scenarios'); el máximo de cada tipo en cada
+      sede sigue aplicándose.
+    pools: { tipo: máximo conjunto en todas las sedes }.
+    method: "decomposition" (por defecto) o "monolithic".
+    max_iterations / time_limit (s): límites de la generación de columnas
+      (al menos una iteración); al agotarse se resuelve el maestro entero
+      con los planes que haya. El maestro entero (y el MIP conjunto con
+      "monolithic") solo dispone del tiempo que quede (MIN_SOLVE_SECONDS
+      como mínimo).
+    progress (opcional): se llama con (iteración, cota_inferior, valor_LP).
+
+    Devuelve { "status", "objective", "lower_bound", "gap", "pools",
+               "pool_usage": {tipo: n},
+               "sites": {sede: plan con el formato de 'solve_model'},
+               "iterations", "columns", "history": [{"iteration", "lp_value",
+               "lower_bound", "new_columns"}],
+               "timings": {"initial", "pricing", "master", "integer", "fallback"} }
+    y "infeasible_sites" si alguna sede no tiene solución ni siquiera aislada.
+    """
+    method = method or "decomposition"
+    if method not in POOL_METHODS:
+        raise ValueError(f"Método de bolsas no soportado: {method}")
+    site_types = {type_name for *_, employee_types_data in scenarios for type_name in employee_types_data}
+    unknown = sorted(set(pools) - site_types)
+    if unknown:
+        raise ValueError(f"Tipos de bolsa que no aparecen en ninguna sede: {', '.join(unknown)}")
+    deadline = time.perf_counter() + time_limit if time_limit else None
+    if method == "monolithic":
+        return _solve_monolithic(scenarios, pools, solver_options, deadline)
+
+    workers = min(workers or os.cpu_count() or 1, len(scenarios)) or 1
+    executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run(fn, tasks):
+        if executor is None:
+            return map(fn, tasks)
+        # Lotes por tarea para amortizar el envío entre procesos con muchas sedes
+        return executor.map(fn, tasks, chunksize=max(1, len(tasks) // (workers * 4)))
+
+    try:
+        return _column_generation(scenarios, pools, solver_options, max_iterations, deadline, progress, run)
+    finally:
+        if executor:
+            executor.shutdown()
+
+
+def _column_generation(scenarios, pools, solver_options, max_iterations, deadline, progress, run):
+    timings = {"initial": 0.0, "pricing": 0.0, "master": 0.0, "integer": 0.0, "fallback": 0.0}
+
+    # --- Columnas iniciales: cada sede aislada (coste 1 por empleado) ---
+    start = time.perf_counter()
+    standalone = [None] * len(scenarios)
+    tasks = [(i, sat, sun, types, {}, solver_options) for i, (_, sat, sun, types) in enumerate(scenarios)]
+    for i, status, bound, plan in run(_price_task, tasks):
+        standalone[i] = (status, bound, plan)
+    timings["initial"] = time.perf_counter() - start
+
+    infeasible = [scenarios[i][0] for i, (status, _, _) in enumerate(standalone) if status == "Infeasible"]
+    failed = [status for status, _, _ in standalone if status not in ("Optimal", STATUS_FEASIBLE)]
+    if failed:
+        result = _pooled_result(scenarios, pools, "Infeasible" if infeasible else failed[0], None, None)
+        result["infeasible_sites"] = infeasible
+        result["timings"] = timings
+        return result
+
+    plans = [plan for _, _, plan in standalone]
+    # Cada sede por separado es una relajación del problema conjunto
+    standalone_bound = None
+    if all(bound is not None for _, bound, _ in standalone):
+        standalone_bound = math.ceil(sum(bound for _, bound, _ in standalone) - _EPS)
+    if all(used <= pools[type_name] for type_name, used in _pool_usage(plans, pools).items()):
+        objective = sum(plan["objective"] for plan in plans)
+        status = "Optimal" if standalone_bound is not None and objective <= standalone_bound else STATUS_FEASIBLE
+        result = _pooled_result(scenarios, pools, status, plans, standalone_bound)
+        result["timings"] = timings
+        return result
+
+    columns = [[plan] for plan in plans]
+    known = [{_plan_key(plan)} for plan in plans]
+    pooled_sites = [i for i, (*_, types) in enumerate(scenarios) if set(types) & set(pools)]
+    # Coste fijo de las sedes sin tipos compartidos (su precio no cambia)
+    fixed_bound = sum(
+        standalone[i][1] if standalone[i][1] is not None else -math.inf
+        for i in range(len(scenarios)) if i not in pooled_sites
+    )
+    # Una unidad de holgura cuesta más que cualquier plantilla posible
+    penalty = 1.0 + sum(data["max_employees"] for *_, types in scenarios for data in types.values())
+    priced = {}  # (sede, costes) -> (estado, cota, plan)
+
+    best_bound = standalone_bound if standalone_bound is not None else -math.inf
+    history, iteration, lp_value, slack_used = [], 0, None, False
+    converged = False
+    while iteration < max_iterations:
+        iteration += 1
+        start = time.perf_counter()
+        model, lam, slack = _master(columns, pools, penalty, integer=False)
+        status, _ = run_solver(model, solver_options, mip=False)
+        timings["master"] += time.perf_counter() - start
+        if status != "Optimal":
+            break
+        lp_value = pulp.value(model.objective)
+        slack_used = any((var.value() or 0) > _EPS for var in slack.values())
+        pi = {type_name: min(0.0, model.constraints[f"Bolsa_{j}"].pi or 0.0) for j, type_name in enumerate(pools)}
+        mu = [model.constraints[f"Convexidad_{i}"].pi or 0.0 for i in range(len(scenarios))]
+
+        # --- Precio por sede, en paralelo (solo las sedes con costes nuevos) ---
+        start = time.perf_counter()
+        site_costs = {
+            i: {type_name: 1.0 - pi[type_name] for type_name in scenarios[i][3] if type_name in pools}
+            for i in pooled_sites
+        }
+        cost_keys = {i: (i, tuple(round(cost, 9) for cost in site_costs[i].values())) for i in pooled_sites}
+        tasks = [
+            (i, scenarios[i][1], scenarios[i][2], scenarios[i][3], site_costs[i], solver_options)
+            for i in pooled_sites if cost_keys[i] not in priced
+        ]
+        for i, price_status, bound, plan in run(_price_task, tasks):
+            priced[cost_keys[i]] = (price_status, bound, plan)
+        timings["pricing"] += time.perf_counter() - start
+
+        new_columns, bound_total = 0, fixed_bound
+        for i in pooled_sites:
+            price_status, bound, plan = priced[cost_keys[i]]
+            bound_total += bound if bound is not None else -math.inf
+            if price_status not in ("Optimal", STATUS_FEASIBLE):
+                continue
+            value = sum(site_costs[i].get(type_name, 1.0) * n for type_name, n in plan["N"].items())
+            if value - mu[i] < -_EPS and _plan_key(plan) not in known[i]:
+                columns[i].append(plan)
+                known[i].add(_plan_key(plan))
+                new_columns += 1
+        lagrangian = bound_total + sum(pi[type_name] * limit for type_name, limit in pools.items())
+        best_bound = max(best_bound, lagrangian)
+        history.append({"iteration": iteration, "lp_value": lp_value,
+                        "lower_bound": best_bound if best_bound > -math.inf else None, "new_columns": new_columns})
+        if progress:
+            progress(iteration, history[-1]["lower_bound"], lp_value)
+        if new_columns == 0 or lp_value - best_bound < _EPS:
+            converged = True
+            break
+        if deadline and time.perf_counter() > deadline:
+            break
+
+    lower_bound = math.ceil(best_bound - _EPS) if best_bound > -math.inf else None
+
+    # --- Maestro entero: un plan por sede ---
+    start = time.perf_counter()
+    model, lam, _ = _master(columns, pools, penalty, integer=True)
+    status, _ = run_solver(model, _remaining_options(solver_options, deadline), gap_abs=INTEGRAL_GAP_ABS)
+    timings["integer"] = time.perf_counter() - start
+
+    chosen, objective = None, None
+    if status in ("Optimal", STATUS_FEASIBLE):
+        chosen = [
+            next(columns[i][k] for k in range(len(columns[i])) if (lam[(i, k)].value() or 0) > 0.5)
+            for i in range(len(scenarios))
+        ]
+        objective = sum(plan["objective"] for plan in chosen)
+
+    if chosen is not None and lower_bound is not None and objective <= lower_bound:
+        result = _pooled_result(scenarios, pools, "Optimal", chosen, lower_bound)
+    elif chosen is None and converged and slack_used:
+        # Ni la relajación cabe en las bolsas: no hay solución
+        result = _pooled_result(scenarios, pools, "Infeasible", None, None)
+    else:
+        # El maestro entero solo combina los planes ya generados: si no
+        # alcanza la cota (o ninguna combinación cabe en las bolsas) se
+        # resuelve el MIP conjunto, con la cota como corte y el plan del
+        # maestro, si lo hay, como arranque.
+        start = time.perf_counter()
+        result = _solve_monolithic(scenarios, pools, solver_options, deadline,
+                                   lower_bound=lower_bound, start_plans=chosen)
+        timings["fallback"] = time.perf_counter() - start
+        if result["objective"] is None and chosen is not None:
+            # Sin tiempo para mejorar el plan del maestro entero
+            result = _pooled_result(scenarios, pools, STATUS_FEASIBLE, chosen, result["lower_bound"])
+
+    result.update(iterations=iteration, columns=sum(len(site_columns) for site_columns in columns),
+                  history=history, timings=timings)
+    return result
@@ -0,0 +1,314 @@
+"""
+Asignación de la plantilla real (roster) a las plazas resueltas.
+
+'generate_schedule_df' numera las plazas (A-1, A-2, ...). Este módulo lee
+la lista de empleados de cada tipo (CSV o Parquet, por bloques) y asigna
+cada persona a una plaza (patrón, semana de descanso):
+
+    id_empleado, nombre, tipo, descanso_anterior, patron_preferido, descanso_preferido
+
+Solo 'id_empleado' es obligatoria ('tipo' se puede indicar al leer).
+'descanso_anterior' es la semana (1-4) en que descansó el mes pasado: para
+mantener la rotación (un finde libre cada 4 semanas) conviene repetirla.
+
+Decenas de miles de empleados comparten unos pocos perfiles (descanso
+anterior, patrón preferido, descanso preferido), así que la asignación es
+un problema de transporte pequeño perfiles -> plazas, que se resuelve de
+forma exacta, y la expansión a filas se hace con NumPy. Las plazas de una
+misma clase de simetría aportan lo mismo a la cobertura: la asignación
+puede repartir la capacidad de la clase entre sus columnas según las
+preferencias sin cambiar la cobertura de la solución.
+"""
+import numpy as np
+import pandas as pd
+import pulp
+
+from patterns import WEEKS, get_pattern_registry, split_class_count, symmetry_classes
+from schedule import SCHEDULE_LABELS, week_template
+from solvers import run_solver
+
+ROSTER_COLUMNS = ["id_empleado", "nombre", "tipo", "descanso_anterior", "patron_preferido", "descanso_preferido"]
+# Filas por bloque al leer el roster
+ROSTER_CHUNK_ROWS = 50_000
+
+# Puntuación de cada asignación (se maximiza). Cubrir una plaza vale más que
+# cualquier combinación de preferencias: primero se asigna el máximo de personas.
+ASSIGN_WEIGHT = 100
+ROTATION_WEIGHT = 4        # por semana de desvío respecto al descanso anterior
+PATTERN_PREF_WEIGHT = 3
+REST_PREF_WEIGHT = 2
+
+UNASSIGNED_LABEL = "Sin asignar"
+VACANCY_PREFIX = "VACANTE"
+
+
+def _normalize_chunk(chunk, type_name):
+    if "id_empleado" not in chunk.columns:
+        raise ValueError("El roster debe tener la columna 'id_empleado'")
+    out = pd.DataFrame({"id_empleado": chunk["id_empleado"].astype(str)})
+    out["nombre"] = chunk["nombre"].astype(str) if "nombre" in chunk.columns else None
+    if type_name is not None:
+        out["tipo"] = type_name
+    elif "tipo" in chunk.columns:
+        out["tipo"] = chunk["tipo"].astype(str)
+    else:
+        raise ValueError("El roster no tiene columna 'tipo' y no se indicó el tipo")
+    # Semanas fuera de 1..4 o vacías = sin dato (0)
+    for col in ("descanso_anterior", "descanso_preferido"):
+        values = pd.to_numeric(chunk[col], errors="coerce") if col in chunk.columns else pd.Series(0, index=chunk.index)
+        out[col] = values.where(values.isin(WEEKS), 0).fillna(0).astype(np.int8)
+    out["patron_preferido"] = chunk["patron_preferido"].astype("string") if "patron_preferido" in chunk.columns else pd.NA
+    return out
+
+
+def _iter_chunks(source, chunk_rows):
+    name = getattr(source, "name", source)
+    if str(name).lower().endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        parquet = pq.ParquetFile(source)
+        columns = [col for col in ROSTER_COLUMNS if col in parquet.schema_arrow.names]
+        for batch in parquet.iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(
+            source, chunksize=chunk_rows, usecols=lambda col: col in ROSTER_COLUMNS,
+            dtype={"id_empleado": str, "nombre": str, "tipo": str, "patron_preferido": str},
+        )
+
+
+def read_roster(source, type_name=None, chunk_rows=ROSTER_CHUNK_ROWS):
+    """
+    Lee un roster CSV o Parquet (ruta o fichero con atributo 'name') por
+    bloques de 'chunk_rows' filas, leyendo solo las columnas conocidas.
+    Con 'type_name', todas las filas son de ese tipo (se ignora 'tipo').
+
+    Lanza ValueError si faltan columnas obligatorias o hay ids repetidos.
+    """
+    chunks = [_normalize_chunk(chunk, type_name) for chunk in _iter_chunks(source, chunk_rows)]
+    if not chunks:
+        return _normalize_chunk(pd.DataFrame({"id_empleado": []}), type_name or "")
+    roster = pd.concat(chunks, ignore_index=True)
+    duplicated = roster["id_empleado"].duplicated()
+    if duplicated.any():
+        raise ValueError(f"Hay {int(duplicated.sum())} 'id_empleado' repetidos en el roster")
+    return roster
+
+
+def _type_slots(x_counts_type, pattern_ids):
+    """
+    Plazas de un tipo: [(id_patrón, rest_week)], la clase de simetría de
+    cada una y la capacidad de cada clase (empleados resueltos en la clase).
+    """
+    slots, slot_class, capacities, members_by_class = [], [], [], []
+    for _, members in symmetry_classes(pattern_ids):
+        capacity = sum(x_counts_type[pattern_id][rest_week] for pattern_id, rest_week in members)
+        if not capacity:
+            continue
+        for member in members:
+            slots.append(member)
+            slot_class.append(len(capacities))
+        capacities.append(capacity)
+        members_by_class.append(members)
+    return slots, np.asarray(slot_class, dtype=np.int64), np.asarray(capacities, dtype=np.int64), members_by_class
+
+
+def _profiles(employees):
+    """Perfil de cada empleado: código y tabla (descanso anterior, id del patrón preferido, descanso preferido)."""
+    # Un patrón preferido desconocido cuenta como sin preferencia (-1)
+    preferred = employees["patron_preferido"].map(get_pattern_registry().index).fillna(-1).to_numpy(dtype=np.int64)
+    key = np.stack([
+        employees["descanso_anterior"].to_numpy(dtype=np.int64),
+        preferred,
+        employees["descanso_preferido"].to_numpy(dtype=np.int64),
+    ], axis=1)
+    profiles, inverse, sizes = np.unique(key, axis=0, return_inverse=True, return_counts=True)
+    return profiles, inverse.ravel(), sizes
+
+
+def _score_matrix(profiles, slots):
+    """Puntuación perfil x plaza (rotación y preferencias)."""
+    slot_pattern = np.asarray([pattern_id for pattern_id, _ in slots], dtype=np.int64)
+    slot_rest = np.asarray([rest_week for _, rest_week in slots], dtype=np.int64)
+    previous, preferred_pattern, preferred_rest = (profiles[:, i][:, None] for i in range(3))
+
+    score = np.full((len(profiles), len(slots)), ASSIGN_WEIGHT, dtype=np.int64)
+    score -= ROTATION_WEIGHT * np.where(previous > 0, np.abs(slot_rest[None, :] - previous), 0)
+    score += PATTERN_PREF_WEIGHT * (slot_pattern[None, :] == preferred_pattern)
+    score += REST_PREF_WEIGHT * ((preferred_rest > 0) & (slot_rest[None, :] == preferred_rest))
+    return score
+
+
+def match_profiles(sizes, score, slot_class, capacities, solver_options=None):
+    """
+    Problema de transporte perfiles -> plazas: max sum(score * f) con
+    sum_s f[p, s] <= sizes[p] y sum_{s en clase k} f[p, s] <= capacities[k].
+    La matriz es totalmente unimodular: se resuelve como LP (variables
+    continuas, vértice entero) y se redondea. Solo se usa el backend de
+    'solver_options': el límite de tiempo y el gap del MIP no aplican.
+
+    Devuelve f (perfiles x plazas, enteros).
+    """
+    n_profiles, n_slots = score.shape
+    model = pulp.LpProblem("Asignacion_Roster", pulp.LpMaximize)
+    flow = {
+        (p, s): pulp.LpVariable(f"f_{p}_{s}", lowBound=0, upBound=int(min(sizes[p], capacities[slot_class[s]])),
+                                cat="Continuous")
+        for p in range(n_profiles) for s in range(n_slots)
+    }
+    model += pulp.lpSum(int(score[p, s]) * var for (p, s), var in flow.items())
+    for p in range(n_profiles):
+        model += pulp.lpSum(flow[p, s] for s in range(n_slots)) <= int(sizes[p])
+    for k, capacity in enumerate(capacities):
+        model += pulp.lpSum(flow[p, s] for p in range(n_profiles) for s in np.flatnonzero(slot_class == k)) <= int(capacity)
+
+    status, _ = run_solver(model, {"backend": (solver_options or {}).get("backend")}, mip=False)
+    if status != "Optimal":
+        raise RuntimeError(f"La asignación del roster no se pudo resolver ({status})")
+    result = np.zeros((n_profiles, n_slots), dtype=np.int64)
+    for (p, s), var in flow.items():
+        result[p, s] = int(round(var.varValue or 0))
+    return result
+
+
+def assign_roster(roster, x_counts, employee_types_data, solver_options=None):
+    """
+    Asigna el roster a las plazas de la solución { tipo: { id_patrón: { rest_week: n } } }.
+
+    Devuelve (plantilla, resumen):
+    - plantilla: una fila por empleado asignado (con su patrón, semana de
+      descanso y las 4 semanas), por plaza vacante ('VACANTE ...') y por
+      empleado sin plaza ('Sin asignar');
+    - resumen: una fila por tipo con plazas, asignados, vacantes, sin
+      asignar y preferencias/rotación cumplidas.
+    """
+    type_names = list(employee_types_data.keys())
+    unknown = sorted(set(roster["tipo"].unique()) - set(type_names))
+    if unknown:
+        raise ValueError(f"Tipos del roster que no están en la solución: {', '.join(unknown)}")
+    registry = get_pattern_registry()
+
+    # Plazas globales (tipo, patrón, rest_week) con su plantilla semanal
+    slot_type, slot_pattern, slot_rest, slot_codes = [], [], [], []
+    row_employee, row_slot = [], []   # filas de salida: índice en roster (-1 = vacante), plaza (-1 = sin asignar)
+    summary = []
+
+    for type_idx, type_name in enumerate(type_names):
+        selected = registry.ids(employee_types_data[type_name]["selected_patterns"])
+        positions = np.flatnonzero((roster["tipo"] == type_name).to_numpy())
+        employees = roster.iloc[positions]
+        slots, slot_class, capacities, members_by_class = _type_slots(x_counts.get(type_name, {}), selected)
+
+        offset = len(slot_type)
+        for pattern_id, rest_week in slots:
+            slot_type.append(type_idx)
+            slot_pattern.append(pattern_id)
+            slot_rest.append(rest_week)
+            slot_codes.append(week_template(pattern_id, rest_week))
+
+        flow = np.zeros((0, len(slots)), dtype=np.int64)
+        inverse = np.zeros(len(positions), dtype=np.int64)
+        profiles = np.zeros((0, 3), dtype=np.int64)
+        if len(positions) and slots:
+            profiles, inverse, sizes = _profiles(employees)
+            score = _score_matrix(profiles, slots)
+            flow = match_profiles(sizes, score, slot_class, capacities, solver_options)
+            # Los empleados de un perfil se reparten en orden entre sus plazas
+            # (última columna = sin asignar): un np.repeat sobre la matriz de flujo.
+            unassigned = sizes - flow.sum(axis=1)
+            targets = np.repeat(
+                np.tile(np.append(np.arange(len(slots)) + offset, -1), len(profiles)),
+                np.column_stack([flow, unassigned]).ravel(),
+            )
+            order = np.argsort(inverse, kind="stable")
+            assigned_slot = np.empty(len(positions), dtype=np.int64)
+            assigned_slot[order] = targets
+        else:
+            assigned_slot = np.full(len(positions), -1, dtype=np.int64)
+        row_employee.append(positions)
+        row_slot.append(assigned_slot)
+
+        # Vacantes: la capacidad no cubierta de cada clase se reparte entre sus columnas
+        filled_by_slot = flow.sum(axis=0)
+        vacancies = 0
+        for k, members in enumerate(members_by_class):
+            free = int(capacities[k] - filled_by_slot[slot_class == k].sum())
+            vacancies += free
+            for member, n in split_class_count(free, members).items():
+                if n:
+                    row_employee.append(np.full(n, -1, dtype=np.int64))
+                    row_slot.append(np.full(n, offset + slots.index(member), dtype=np.int64))
+
+        summary.append(_type_summary(type_name, flow, profiles, slots, capacities, len(positions), vacancies))
+
+    df = _roster_frame(roster, type_names, registry.labels, row_employee, row_slot,
+                       slot_type, slot_pattern, slot_rest, slot_codes)
+    return df, pd.DataFrame(summary)
+
+
+def _type_summary(type_name, flow, profiles, slots, capacities, n_employees, vacancies):
+    """Fila del resumen: recuentos y preferencias cumplidas ('cumplidas/con dato')."""
+    assigned = int(flow.sum())
+    row = {"tipo": type_name, "empleados": n_employees, "plazas": int(capacities.sum()),
+           "asignados": assigned, "vacantes": vacancies, "sin_asignar": n_employees - assigned}
+    slot_pattern = np.asarray([pattern_id for pattern_id, _ in slots], dtype=np.int64)
+    slot_rest = np.asarray([rest_week for _, rest_week in slots], dtype=np.int64)
+    for label, column, slot_values in (
+        ("rotacion_mantenida", 0, slot_rest),
+        ("patron_preferido", 1, slot_pattern),
+        ("descanso_preferido", 2, slot_rest),
+    ):
+        wanted = profiles[:, column]
+        # Sin dato: 0 en las semanas, -1 en el patrón
+        has_value = wanted > (0 if column != 1 else -1)
+        met = flow * (slot_values[None, :] == wanted[:, None])
+        row[label] = f"{int(met[has_value].sum())}/{int(flow[has_value].sum())}"
+    return row
+
+
+def _roster_frame(roster, type_names, pattern_names, row_employee, row_slot,
+                  slot_type, slot_pattern, slot_rest, slot_codes):
+    """
+    Construye la plantilla. Cada fila es (empleado, plaza); -1 = vacante o
+    sin asignar. Las columnas se indexan con un centinela al final: el
+    índice -1 toma el valor vacío sin máscaras.
+    """
+    employee = np.concatenate(row_employee)
+    slot = np.concatenate(row_slot)
+    slot_type = np.append(np.asarray(slot_type, dtype=np.int64), -1)
+    slot_pattern = np.append(np.asarray(slot_pattern, dtype=np.int64), len(pattern_names))
+    slot_rest = np.append(np.asarray(slot_rest, dtype=np.int64), 0)
+    slot_codes = np.vstack([np.asarray(slot_codes, dtype=np.int8).reshape(-1, len(WEEKS)),
+                            np.full((1, len(WEEKS)), -1, dtype=np.int8)])
+
+    type_code = {type_name: i for i, type_name in enumerate(type_names)}
+    roster_type = np.append(roster["tipo"].map(type_code).to_numpy(dtype=np.int64), -1)
+    row_type = np.where(slot >= 0, slot_type[slot], roster_type[employee])
+
+    # Orden: tipo, asignados, vacantes y sin asignar, plaza, orden del roster
+    kind = np.where(employee < 0, 1, np.where(slot >= 0, 0, 2))
+    order = np.lexsort((employee, slot, kind, row_type))
+    employee, slot, row_type = employee[order], slot[order], row_type[order]
+
+    vacancy = employee < 0
+    ids = np.append(roster["id_empleado"].to_numpy(dtype=object), None)[employee]
+    if vacancy.any():
+        type_labels = np.asarray(type_names, dtype=object)[row_type[vacancy]]
+        number = pd.Series(type_labels).groupby(type_labels).cumcount().to_numpy() + 1
+        ids[vacancy] = f"{VACANCY_PREFIX} " + type_labels + "-" + number.astype(str).astype(object)
+
+    data = {"ID Empleado": ids}
+    if roster["nombre"].notna().any():
+        data["Nombre"] = np.append(roster["nombre"].to_numpy(dtype=object), None)[employee]
+    data["Tipo"] = pd.Categorical.from_codes(row_type, categories=[f"Tipo {t}" for t in type_names])
+    data["Patrón Asignado"] = pd.Categorical.from_codes(
+        slot_pattern[slot], categories=pattern_names + [UNASSIGNED_LABEL]
+    ).remove_unused_categories()
+    # 0 = sin semana (sin plaza o sin dato del mes anterior)
+    previous = np.append(roster["descanso_anterior"].to_numpy(dtype=np.int64), 0)[employee]
+    for col, weeks in (("Semana de descanso", slot_rest[slot]), ("Descanso anterior", previous)):
+        data[col] = pd.array(np.where(weeks > 0, weeks, 0), dtype="Int8")
+        data[col][weeks == 0] = pd.NA
+    for week_idx, week in enumerate(WEEKS):
+        data[f"Semana {week}"] = pd.Categorical.from_codes(slot_codes[slot, week_idx], categories=SCHEDULE_LABELS)
+    return pd.DataFrame(data)
@@ -0,0 +1,193 @@
+"""
+Histórico persistente de escenarios resueltos en SQLite.
+
+Cada resolución guarda sus entradas (sede, demanda, tipos), el resultado
+completo (N, x, cobertura, tiempos, solver) y la huella del escenario
+('scenario_fingerprint'). Índices por huella, por sede y por fecha:
+- una petición idéntica se sirve del histórico sin resolver ('lookup');
+- el historial y la comparación de ejecuciones leen solo columnas
+  pequeñas, sin deserializar los resultados, aunque haya miles.
+
+Una conexión por operación (modo WAL): es seguro entre los hilos de
+Streamlit y entre procesos (app y batch.py sobre el mismo fichero).
+"""
+import contextlib
+import datetime
+import json
+import sqlite3
+
+from patterns import weekly_demand
+from solve_cache import CACHEABLE_STATUSES, _restore_int_keys
+
+# Incrementar si cambia el esquema de la tabla
+STORE_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id             INTEGER PRIMARY KEY,
+    fingerprint    TEXT NOT NULL,
+    site           TEXT NOT NULL DEFAULT '',
+    created_at     TEXT NOT NULL,
+    status         TEXT NOT NULL,
+    objective      REAL,
+    headcount      TEXT NOT NULL,
+    demand         TEXT NOT NULL,
+    employee_types TEXT NOT NULL,
+    solve_seconds  REAL,
+    backend        TEXT,
+    result         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_fingerprint ON runs (fingerprint, created_at);
+CREATE INDEX IF NOT EXISTS runs_site ON runs (site, created_at);
+CREATE INDEX IF NOT EXISTS runs_created ON runs (created_at);
+"""
+
+_INSERT = (
+    "INSERT INTO runs (fingerprint, site, created_at, status, objective, headcount, demand, "
+    "employee_types, solve_seconds, backend, result) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+# Columnas del historial (sin el resultado completo)
+_SUMMARY_COLUMNS = "id, site, created_at, status, objective, headcount, demand, solve_seconds, backend"
+
+
+class ScenarioStore:
+    """Histórico de resoluciones en un fichero SQLite."""
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.execute(f"PRAGMA user_version = {STORE_VERSION}")
+
+    @contextlib.contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:  # commit o rollback
+                yield conn
+        finally:
+            conn.close()
+
+    def save(self, fingerprint, site, demanda_sabado, demanda_domingo, employee_types_data, result):
+        """Guarda una resolución y devuelve su id."""
+        with self._connect() as conn:
+            cursor = conn.execute(_INSERT, _run_row(
+                fingerprint, site, demanda_sabado, demanda_domingo, employee_types_data, result
+            ))
+            return cursor.lastrowid
+
+    def save_many(self, runs):
+        """
+        Guarda varias resoluciones en una sola transacción.
+        runs = [(huella, sede, demanda_sabado, demanda_domingo, tipos, resultado)]
+        """
+        with self._connect() as conn:
+            conn.executemany(_INSERT, (_run_row(*run) for run in runs))
+
+    def lookup(self, fingerprint):
+        """
+        Última resolución determinista (CACHEABLE_STATUSES) con esa huella:
+        { "id", "site", "created_at", "result" } o None.
+        """
+        placeholders = ", ".join("?" for _ in CACHEABLE_STATUSES)
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT id, site, created_at, result FROM runs WHERE fingerprint = ? AND status IN ({placeholders}) "
+                "ORDER BY created_at DESC, id DESC LIMIT 1",
+                (fingerprint, *CACHEABLE_STATUSES),
+            ).fetchone()
+        if row is None:
+            return None
+        run_id, site, created_at, raw = row
+        try:
+            result = _restore_int_keys(json.loads(raw))
+        except (ValueError, KeyError):
+            return None
+        return {"id": run_id, "site": site, "created_at": created_at, "result": result}
+
+    def sites(self):
+        """Sedes con ejecuciones guardadas (por orden alfabético)."""
+        with self._connect() as conn:
+            return [site for (site,) in conn.execute("SELECT DISTINCT site FROM runs ORDER BY site")]
+
+    def history(self, site=None, limit=200):
+        """
+        Últimas ejecuciones (de una sede o de todas), de la más reciente a
+        la más antigua: una fila por ejecución con la plantilla por tipo.
+        """
+        query = f"SELECT {_SUMMARY_COLUMNS} FROM runs"
+        params = []
+        if site is not None:
+            query += " WHERE site = ?"
+            params.append(site)
+        query += " ORDER BY created_at DESC, id DESC LIMIT ?"
+        params.append(int(limit))
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return _summary_frame(rows)
+
+    def compare(self, run_ids):
+        """Ejecuciones concretas (en el orden pedido) con la diferencia de plantilla respecto a la primera."""
+        run_ids = [int(run_id) for run_id in run_ids]
+        if not run_ids:
+            return _summary_frame([])
+        placeholders = ", ".join("?" for _ in run_ids)
+        with self._connect() as conn:
+            rows = conn.execute(f"SELECT {_SUMMARY_COLUMNS} FROM runs WHERE id IN ({placeholders})", run_ids).fetchall()
+        df = _summary_frame(rows).set_index("id").reindex(run_ids).reset_index()
+        df.insert(df.columns.get_loc("plantilla") + 1, "dif_plantilla", df["plantilla"] - df["plantilla"].iloc[0])
+        return df
+
+    def __len__(self):
+        with self._connect() as conn:
+            return conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+
+
+def _run_row(fingerprint, site, demanda_sabado, demanda_domingo, employee_types_data, result):
+    solver = result.get("solver") or {}
+    return (
+        fingerprint,
+        site or "",
+        datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        result["status"],
+        result["objective"],
+        json.dumps(result["N"], ensure_ascii=False),
+        json.dumps([list(weekly_demand(demanda_sabado).values()), list(weekly_demand(demanda_domingo).values())]),
+        json.dumps(employee_types_data, ensure_ascii=False, default=int),
+        sum(result["timings"].values()),
+        solver.get("backend"),
+        json.dumps(result, ensure_ascii=False, default=str),
+    )
+
+
+def _summary_frame(rows):
+    """Filas del historial -> DataFrame con una columna por tipo."""
+    # pandas se carga al consultar el historial, no al abrir el almacén
+    import pandas as pd
+
+    records = []
+    for run_id, site, created_at, status, objective, headcount, demand, solve_seconds, backend in rows:
+        sat, sun = json.loads(demand)
+        record = {
+            "id": run_id,
+            "sede": site,
+            "fecha": created_at,
+            "estado": status,
+            "plantilla": int(round(objective)) if objective is not None else None,
+            # Texto: un valor si es igual todas las semanas, si no "s1/s2/s3/s4"
+            "demanda_sabado": "/".join(map(str, sat)) if len(set(sat)) > 1 else str(sat[0]),
+            "demanda_domingo": "/".join(map(str, sun)) if len(set(sun)) > 1 else str(sun[0]),
+        }
+        record.update({f"Tipo {type_name}": n for type_name, n in json.loads(headcount).items()})
+        record["tiempo_s"] = round(solve_seconds, 4) if solve_seconds is not None else None
+        record["solver"] = backend
+        records.append(record)
+
+    columns = ["id", "sede", "fecha", "estado", "plantilla", "demanda_sabado", "demanda_domingo"]
+    df = pd.DataFrame(records, columns=columns + sorted(
+        {col for record in records for col in record if col.startswith("Tipo ")}
+    ) + ["tiempo_s", "solver"])
+    count_cols = ["plantilla"] + [col for col in df.columns if col.startswith("Tipo ")]
+    return df.astype({col: "Int64" for col in count_cols})
@@ -0,0 +1,126 @@
+import functools
+
+import numpy as np
+import pandas as pd
+
+from patterns import WEEKS, get_pattern_registry
+
+# Etiquetas de la plantilla; el índice es el código de las columnas categóricas
+SCHEDULE_LABELS = ["Finde Completo", "Sábado", "Domingo", "Descanso", "Descanso (LIBRE)"]
+FINDE, SABADO, DOMINGO, DESCANSO, LIBRE = range(len(SCHEDULE_LABELS))
+
+
+@functools.lru_cache(maxsize=None)
+def week_code_table():
+    """
+    Códigos de etiqueta [id_patrón, índice de rest_week, semana] (int8),
+    derivados del array de contribuciones del registro: trabajar sábado y
+    domingo es "Finde Completo", solo uno de los dos "Sábado"/"Domingo",
+    ninguno "Descanso", y la semana de descanso "Descanso (LIBRE)".
+    """
+    contributions = get_pattern_registry().contributions
+    sat, sun = contributions[..., 0].astype(bool), contributions[..., 1].astype(bool)
+    codes = np.where(sat & sun, FINDE, np.where(sat, SABADO, np.where(sun, DOMINGO, DESCANSO))).astype(np.int8)
+    weeks = np.arange(codes.shape[1])
+    codes[:, weeks, weeks] = LIBRE
+    return codes
+
+
+def week_template(pattern_id, rest_week, weeks_list=WEEKS):
+    """Códigos de etiqueta por semana para un (id_patrón, rest_week)."""
+    return week_code_table()[pattern_id, weeks_list.index(rest_week)].tolist()
+
+
+def generate_schedule_df(x_counts, employee_types_data):
+    """
+    Genera la plantilla de turnos detallada a partir de los recuentos
+    resueltos { type_name: { id_patrón: { rest_week: n } } }.
+
+    Versión vectorizada: cada grupo (tipo, patrón, rest_week) se expande
+    con np.repeat sobre su plantilla semanal precalculada ('week_code_table'),
+    y los totales semanales salen directamente de los recuentos, sin
+    recorrer las filas. Los textos de los patrones solo aparecen como
+    categorías de la columna 'Patrón Asignado'.
+    """
+    week_cols_final = [f"Semana {w}" for w in WEEKS]
+    type_names = list(employee_types_data.keys())
+    registry = get_pattern_registry()
+    code_table = week_code_table()
+
+    pattern_names = []
+    pattern_code = {}
+    group_type, group_pattern, group_counts, group_codes = [], [], [], []
+
+    for type_idx, type_name in enumerate(type_names):
+        for pattern_id in registry.ids(employee_types_data[type_name]["selected_patterns"]):
+            if pattern_id not in pattern_code:
+                pattern_code[pattern_id] = len(pattern_names)
+                pattern_names.append(registry.labels[pattern_id])
+            for rest_idx, rest_week in enumerate(WEEKS):
+                num_empleados = x_counts[type_name][pattern_id][rest_week]
+                if num_empleados > 0:
+                    group_type.append(type_idx)
+                    group_pattern.append(pattern_code[pattern_id])
+                    group_counts.append(num_empleados)
+                    group_codes.append(code_table[pattern_id, rest_idx])
+
+    if not group_counts:
+        return pd.DataFrame()
+
+    group_type = np.asarray(group_type, dtype=np.int64)
+    group_pattern = np.asarray(group_pattern, dtype=np.int64)
+    group_counts = np.asarray(group_counts, dtype=np.int64)
+    group_codes = np.asarray(group_codes, dtype=np.int8)
+
+    # --- Expansión a una fila por empleado ---
+    # Los grupos de un mismo tipo son contiguos: el índice dentro del tipo
+    # es la posición global menos el inicio del bloque del tipo.
+    row_group = np.repeat(np.arange(len(group_counts)), group_counts)
+    row_type = group_type[row_group]
+    type_sizes = np.bincount(group_type, weights=group_counts, minlength=len(type_names)).astype(np.int64)
+    type_start = np.concatenate(([0], np.cumsum(type_sizes)[:-1]))
+    employee_index = np.arange(len(row_group)) - type_start[row_type] + 1
+
+    # Mismo orden que antes: por índice de empleado y, a igualdad, por tipo
+    order = np.argsort(employee_index, kind="stable")
+    row_group = row_group[order]
+    row_type = row_type[order]
+    employee_index = employee_index[order]
+
+    id_prefix = pd.Series([f"{type_name}-" for type_name in type_names], dtype=object)
+    data = {
+        "ID Empleado": id_prefix.values[row_type] + employee_index.astype(str).astype(object),
+        "Tipo": pd.Categorical.from_codes(row_type, categories=[f"Tipo {t}" for t in type_names]),
+        "Patrón Asignado": pd.Categorical.from_codes(group_pattern[row_group], categories=pattern_names),
+    }
+    for week_idx, col_name in enumerate(week_cols_final):
+        data[col_name] = pd.Categorical.from_codes(group_codes[row_group, week_idx], categories=SCHEDULE_LABELS)
+    df = pd.DataFrame(data)
+
+    # --- Totales semanales directamente desde los recuentos ---
+    total_s_trab = {"ID Empleado": "TOTAL SÁB. TRABAJADOS (Semana)"}
+    total_d_trab = {"ID Empleado": "TOTAL DOM. TRABAJADOS (Semana)"}
+    total_finde_desc = {"ID Empleado": "TOTAL FINDES DESCANSO (Semana)"}
+
+    for week_idx, col_name in enumerate(week_cols_final):
+        by_label = np.bincount(group_codes[:, week_idx], weights=group_counts, minlength=len(SCHEDULE_LABELS)).astype(np.int64)
+        total_s_trab[col_name] = by_label[SABADO] + by_label[FINDE]
+        total_d_trab[col_name] = by_label[DOMINGO] + by_label[FINDE]
+        total_finde_desc[col_name] = by_label[DESCANSO] + by_label[LIBRE]
+
+    total_s_mes = sum(total_s_trab[col] for col in week_cols_final)
+    total_d_mes = sum(total_d_trab[col] for col in week_cols_final)
+
+    gt_s = {"ID Empleado": "GRAN TOTAL SÁBADOS (Mes)", "Semana 1": total_s_mes}
+    gt_d = {"ID Empleado": "GRAN TOTAL DOMINGOS (Mes)", "Semana 1": total_d_mes}
+
+    for col in week_cols_final[1:] + ["Tipo", "Patrón Asignado"]:
+        if col not in gt_s: gt_s[col] = ""
+        if col not in gt_d: gt_d[col] = ""
+
+    # Las filas de totales mezclan números y texto: las columnas pasan a object
+    df = df.astype(object)
+    footer_df = pd.DataFrame([total_s_trab, total_d_trab, total_finde_desc, gt_s, gt_d])
+    df = pd.concat([df, footer_df], ignore_index=True)
+
+    return df
@@ -0,0 +1,126 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from patterns import get_pattern_registry, weekly_demand
+
+# Incrementar si cambia la formulación del modelo o el formato del resultado:
+# invalida las entradas en disco.
+CACHE_VERSION = 6
+
+# Solo se guardan estados deterministas; un fallo o una parada por límite
+# de tiempo ('Feasible') se vuelve a intentar.
+CACHEABLE_STATUSES = ("Optimal", "Infeasible")
+
+
+def _demand_key(demand):
+    """Un valor si la demanda es igual todas las semanas; si no, la lista semanal."""
+    weekly = list(weekly_demand(demand).values())
+    return weekly[0] if len(set(weekly)) == 1 else weekly
+
+
+def scenario_fingerprint(demanda_sabado, demanda_domingo, employee_types_data, gap_rel=None):
+    """
+    Huella normalizada de un escenario (demanda + límites + patrones).
+
+    El orden de los patrones seleccionados en el multiselect no cambia el
+    modelo, así que se guardan sus ids ordenados. Un gap relativo > 0
+    puede cambiar la solución 'óptima', así que forma parte de la huella.
+    """
+    registry = get_pattern_registry()
+    payload = {
+        "version": CACHE_VERSION,
+        "demanda": [_demand_key(demanda_sabado), _demand_key(demanda_domingo)],
+        "tipos": {
+            type_name: {
+                "max_employees": int(data["max_employees"]),
+                "selected_patterns": sorted(registry.ids(data["selected_patterns"])),
+            }
+            for type_name, data in employee_types_data.items()
+        },
+    }
+    if gap_rel:
+        payload["gap_rel"] = float(gap_rel)
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _restore_int_keys(result):
+    """JSON convierte los ids de patrón y las semanas (int) en str: se restauran al leer de disco."""
+    result["x"] = {
+        type_name: {
+            int(pattern_id): {int(rw): n for rw, n in by_rw.items()}
+            for pattern_id, by_rw in by_pattern.items()
+        }
+        for type_name, by_pattern in result["x"].items()
+    }
+    result["coverage"] = {
+        day: {int(w): v for w, v in by_week.items()}
+        for day, by_week in result["coverage"].items()
+    }
+    return result
+
+
+class SolveCache:
+    """
+    Caché LRU en memoria de resultados de resolución, con un nivel
+    opcional en disco (un JSON por huella) compartido entre procesos.
+
+    Es segura entre hilos: Streamlit atiende cada sesión en un hilo propio.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), encoding="utf-8") as fh:
+                result = _restore_int_keys(json.load(fh))
+        except (OSError, ValueError, KeyError):
+            return None
+
+        self._remember(key, result)
+        return result
+
+    def put(self, key, result):
+        self._remember(key, result)
+        if not self.disk_dir:
+            return
+        # Escritura atómica para no dejar ficheros a medias si otro proceso lee
+        tmp_path = f"{self._disk_path(key)}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as fh:
+                json.dump(result, fh, ensure_ascii=False)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError:
+            # El nivel en disco es opcional: un fallo no debe romper la resolución
+            pass
+
+    def _remember(self, key, result):
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
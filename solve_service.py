@@ -0,0 +1,259 @@
+"""
+Servicio local de resolución: una cola de trabajos asyncio delante de un
+pool acotado de procesos resolutores.
+
+La interfaz no resuelve en el hilo del script: envía el escenario
+('submit'), consulta su estado ('poll') y puede cancelarlo ('cancel').
+El bucle asyncio vive en un hilo propio; 'max_workers' procesos limitan
+cuántas resoluciones compiten por CPU a la vez y 'max_queue' cuántas
+pueden esperar (si ya hay tantos en espera, 'submit' lanza ServiceBusy).
+
+Cancelar un trabajo en cola lo descarta al instante y libera su plaza en
+la cola (el consumidor se salta su id al sacarlo). Un trabajo que ya se
+está resolviendo no se puede interrumpir dentro del pool: se marca como
+cancelado y su resultado se ignora al terminar (el límite de tiempo del
+solver acota cuánto ocupa el proceso).
+
+Además de escenarios sueltos, 'submit_task' encola tareas largas (barrido
+de demanda, ...): la tarea se orquesta en un hilo del servicio y envía
+sus resoluciones al MISMO pool de procesos ('executor'), e informa de su
+avance con 'progress' (visible en 'poll'). Cancelar una tarea en curso la
+detiene en su siguiente aviso de avance.
+
+Si un proceso resolutor muere (p. ej. sin memoria), el pool queda roto
+('BrokenProcessPool'): los trabajos que corrían en él fallan con un error
+claro y se crea un pool nuevo para los siguientes.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+JOB_CANCELLED = "cancelled"
+FINISHED_STATES = (JOB_DONE, JOB_FAILED, JOB_CANCELLED)
+
+# Segundos que se conservan los trabajos terminados para poder consultarlos
+JOB_TTL = 600
+
+WORKER_CRASHED_ERROR = (
+    "El proceso resolutor terminó de forma inesperada (p. ej. por falta de memoria). "
+    "El servicio se ha reiniciado; puede volver a intentarlo."
+)
+
+
+class ServiceBusy(RuntimeError):
+    """Ya hay 'max_queue' trabajos esperando."""
+
+
+class JobCancelled(RuntimeError):
+    """La tarea se canceló: lo lanza su 'progress' para detenerla."""
+
+
+def _run_job(demanda_sabado, demanda_domingo, employee_types_data, warm_start, solver_options):
+    """
+    Resuelve un escenario (se ejecuta en un proceso del pool). El resultado
+    lleva "peak_memory_mb": la memoria pico del proceso resolutor (con CBC),
+    no la del servidor de Streamlit.
+    """
+    # Solo el proceso resolutor carga el modelo (y PuLP); la interfaz no
+    from diagnostics import peak_memory_mb
+    from optimizer import solve_model
+
+    result = solve_model(
+        demanda_sabado, demanda_domingo, employee_types_data,
+        warm_start=warm_start, solver_options=solver_options,
+    )
+    result["peak_memory_mb"] = peak_memory_mb(include_children=True)
+    return result
+
+
+class SolveService:
+    """
+    Cola de trabajos de resolución. Los métodos públicos son síncronos y
+    seguros entre hilos (cada sesión de Streamlit llama desde su hilo).
+    """
+
+    def __init__(self, max_workers=None, max_queue=32):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._jobs = {}
+        # Trabajos en estado JOB_QUEUED: los cancelados siguen en la asyncio.Queue pero no cuentan
+        self._queued = 0
+        self._lock = threading.Lock()
+        self._pool = self._new_pool()
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, name="solve-service", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def _new_pool(self):
+        # 'spawn': el servidor de Streamlit tiene muchos hilos y 'fork' no es seguro ahí
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    # --- Bucle asyncio (hilo del servicio) ---
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        # Sin 'maxsize': la capacidad se comprueba en 'submit' con los trabajos vivos en cola
+        self._queue = asyncio.Queue()
+        # Un consumidor por proceso: nunca hay más trabajos en curso que procesos
+        # (una tarea puede enviar varias resoluciones a la vez; esperan en el pool)
+        self._consumers = [self._loop.create_task(self._consume()) for _ in range(self.max_workers)]
+        self._ready.set()
+        self._loop.run_forever()
+
+    async def _consume(self):
+        while True:
+            job_id = await self._queue.get()
+            try:
+                with self._lock:
+                    job = self._jobs.get(job_id)
+                    if job is None or job["state"] != JOB_QUEUED:
+                        continue  # cancelado mientras esperaba
+                    job["state"] = JOB_RUNNING
+                    self._queued -= 1
+                    job["started"] = time.time()
+                    fn, args, kwargs, in_pool = job["call"]
+                pool = self._pool
+                try:
+                    if in_pool:
+                        result = await self._loop.run_in_executor(pool, partial(fn, *args, **kwargs))
+                    else:
+                        # Tarea: se orquesta en un hilo y resuelve en el pool del servicio
+                        task = partial(fn, *args, executor=pool, progress=partial(self._progress, job_id), **kwargs)
+                        result = await self._loop.run_in_executor(None, task)
+                except BrokenProcessPool:
+                    self._replace_pool(pool)
+                    self._finish(job_id, JOB_FAILED, error=WORKER_CRASHED_ERROR)
+                except Exception as exc:  # el error se devuelve en 'poll'
+                    self._finish(job_id, JOB_FAILED, error=f"{type(exc).__name__}: {exc}")
+                else:
+                    self._finish(job_id, JOB_DONE, result=result)
+            finally:
+                self._queue.task_done()
+
+    def _replace_pool(self, broken):
+        """
+        Sustituye un pool roto por uno nuevo. Los consumidores comparten el
+        hilo del bucle: solo el primero que ve el pool roto lo cambia.
+        """
+        if self._pool is broken:
+            self._pool = self._new_pool()
+            broken.shutdown(wait=False, cancel_futures=True)
+
+    def _progress(self, job_id, *values):
+        """Avance de una tarea (se llama desde su hilo). Lanza JobCancelled si se canceló."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] == JOB_CANCELLED:
+                raise JobCancelled(job_id)
+            job["progress"] = values
+
+    def _finish(self, job_id, state, result=None, error=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] == JOB_CANCELLED:
+                return
+            job.update(state=state, result=result, error=error, finished=time.time())
+
+    # --- API pública ---
+
+    def submit(self, demanda_sabado, demanda_domingo, employee_types_data, warm_start=None, solver_options=None):
+        """Encola un escenario y devuelve su id. Lanza ServiceBusy si la cola está llena."""
+        return self._enqueue(
+            _run_job, (demanda_sabado, demanda_domingo, employee_types_data, warm_start, solver_options), {}, True
+        )
+
+    def submit_task(self, fn, *args, **kwargs):
+        """
+        Encola una tarea larga y devuelve su id. Se llama como
+        fn(*args, executor=pool, progress=callback, **kwargs): 'fn' envía
+        sus resoluciones a 'executor' (el pool del servicio; funciones
+        importables, como en cualquier ProcessPoolExecutor) y llama a
+        'progress' con su avance. Lanza ServiceBusy si la cola está llena.
+        """
+        return self._enqueue(fn, args, kwargs, False)
+
+    def _enqueue(self, fn, args, kwargs, in_pool):
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._prune()
+            if self._queued >= self.max_queue:
+                raise ServiceBusy(f"Cola de resolución llena ({self.max_queue} trabajos en espera)")
+            self._queued += 1
+            self._jobs[job_id] = {
+                "id": job_id, "state": JOB_QUEUED, "result": None, "error": None,
+                "submitted": time.time(), "started": None, "finished": None, "progress": None,
+                "call": (fn, args, kwargs, in_pool),
+            }
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, job_id)
+        return job_id
+
+    def poll(self, job_id):
+        """
+        Estado de un trabajo (o None si no existe o ha caducado):
+        { "id", "state", "position" (en cola, 1 = el siguiente),
+          "wait" (s en cola), "elapsed" (s resolviendo), "progress" (último
+          aviso de una tarea, como tupla; None si no hay), "result", "error" }
+        """
+        now = time.time()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            position = None
+            if job["state"] == JOB_QUEUED:
+                position = 1 + sum(
+                    1 for other in self._jobs.values()
+                    if other["state"] == JOB_QUEUED and other["submitted"] < job["submitted"]
+                )
+            started, finished = job["started"], job["finished"]
+            return {
+                "id": job_id,
+                "state": job["state"],
+                "position": position,
+                "wait": (started or finished or now) - job["submitted"],
+                "elapsed": ((finished or now) - started) if started else 0.0,
+                "progress": job["progress"],
+                "result": job["result"],
+                "error": job["error"],
+            }
+
+    def cancel(self, job_id):
+        """Cancela un trabajo pendiente o en curso. Devuelve False si ya había terminado."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["state"] in FINISHED_STATES:
+                return False
+            if job["state"] == JOB_QUEUED:
+                self._queued -= 1
+            job.update(state=JOB_CANCELLED, finished=time.time())
+            return True
+
+    def shutdown(self):
+        async def stop_consumers():
+            for task in self._consumers:
+                task.cancel()
+            await asyncio.gather(*self._consumers, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(stop_consumers(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self._pool.shutdown(cancel_futures=True)
+
+    def _prune(self):
+        """Olvida los trabajos terminados hace más de JOB_TTL (con el lock tomado)."""
+        limit = time.time() - JOB_TTL
+        for job_id in [jid for jid, job in self._jobs.items() if job["finished"] and job["finished"] < limit]:
+            del self._jobs[job_id]
@@ -0,0 +1,162 @@
+import importlib.util
+import math
+import os
+import re
+import tempfile
+import time
+
+# Equivale al antiguo PULP_CBC_CMD(msg=0): CBC, sin límite de tiempo ni de gap
+DEFAULT_SOLVER_OPTIONS = {
+    "backend": "cbc",    # "cbc" | "highs"
+    "threads": None,     # hilos del solver (None = valor por defecto del solver)
+    "time_limit": None,  # segundos; al agotarse se devuelve la mejor solución encontrada
+    "gap_rel": None,     # gap relativo para parar (0.01 = 1 %)
+}
+
+BACKEND_LABELS = {"cbc": "CBC", "highs": "HiGHS"}
+
+# Backend que figura en los resultados de la vía rápida exacta ('fast_path'), sin solver
+FAST_BACKEND = "fast"
+FAST_BACKEND_LABEL = "Vía rápida exacta"
+
+# Estado cuando el solver para por límite con una solución entera no demostrada óptima
+STATUS_FEASIBLE = "Feasible"
+
+# Gap absoluto para objetivos enteros: si incumbente - cota < 1, el
+# incumbente ya es óptimo y el solver puede parar
+INTEGRAL_GAP_ABS = 0.999
+
+
+def available_backends():
+    """
+    Solvers disponibles: CBC viene con PuLP; HiGHS requiere 'highspy'.
+    Se comprueba sin importar PuLP (la interfaz lo llama al pintar la barra lateral).
+    """
+    backends = ["cbc"]
+    if importlib.util.find_spec("highspy"):
+        backends.append("highs")
+    return backends
+
+
+def solver_options(options=None):
+    """Completa unas opciones parciales con los valores por defecto."""
+    merged = dict(DEFAULT_SOLVER_OPTIONS)
+    merged.update({key: value for key, value in (options or {}).items() if value is not None})
+    if merged["backend"] not in BACKEND_LABELS:
+        raise ValueError(f"Solver no soportado: {merged['backend']}")
+    return merged
+
+
+# HiGHS crea un planificador de hilos global en la primera resolución del
+# proceso y rechaza ('Not Solved') otro número de hilos después: si la
+# petición cambia, se reinicia el planificador antes de resolver.
+_HIGHS_POOL = {}
+
+
+def _highs_threads(requested):
+    if _HIGHS_POOL.get("threads", requested) != requested:
+        import highspy
+
+        highspy.Highs.resetGlobalScheduler(True)
+    _HIGHS_POOL["threads"] = requested
+    return requested
+
+
+def make_solver(options, warm_start=False, log_path=None, mip=True, gap_abs=None):
+    # PuLP se importa al resolver, no al importar el módulo
+    import pulp
+
+    options = solver_options(options)
+    if options["backend"] == "highs":
+        # La interfaz de PuLP para HiGHS no admite solución inicial
+        return pulp.HiGHS(
+            mip=mip, msg=False, threads=_highs_threads(options["threads"]),
+            timeLimit=options["time_limit"], gapRel=options["gap_rel"], gapAbs=gap_abs,
+        )
+    return pulp.PULP_CBC_CMD(
+        mip=mip, msg=0, threads=options["threads"], timeLimit=options["time_limit"],
+        gapRel=options["gap_rel"], gapAbs=gap_abs, warmStart=warm_start, logPath=log_path,
+    )
+
+
+def _parse_cbc_log(text):
+    """Nodos, mejor cota y gap del resumen final del log de CBC."""
+    def number(pattern):
+        match = re.search(pattern, text)
+        return float(match.group(1)) if match else None
+
+    objective = number(r"Objective value:\s+(\S+)")
+    best_bound = number(r"Lower bound:\s+(\S+)")
+    gap = number(r"Gap:\s+(\S+)")
+    if "Optimal solution found" in text and objective is not None:
+        best_bound = objective if best_bound is None else best_bound
+        gap = 0.0 if gap is None else gap
+    nodes = number(r"Enumerated nodes:\s+(\d+)")
+    return {"nodes": int(nodes) if nodes is not None else None, "best_bound": best_bound, "gap": gap}
+
+
+def _highs_stats(model):
+    try:
+        info = model.solverModel.getInfo()
+    except AttributeError:
+        return {"nodes": None, "best_bound": None, "gap": None}
+    return {"nodes": int(info.mip_node_count), "best_bound": info.mip_dual_bound, "gap": info.mip_gap}
+
+
+def _proven_optimal(objective, best_bound, gap_abs):
+    """
+    True si la cota demuestra que el incumbente es óptimo. Con 'gap_abs'
+    el objetivo es entero y basta con alcanzar ceil(cota).
+    """
+    if objective is None or best_bound is None:
+        return False
+    if gap_abs is not None:
+        return objective <= math.ceil(best_bound - 1e-6) + 1e-6
+    return objective - best_bound <= 1e-6 * max(1.0, abs(objective))
+
+
+def run_solver(model, options=None, warm_start=False, mip=True, gap_abs=None):
+    """
+    Resuelve 'model' con las opciones dadas y devuelve (estado, estadísticas).
+
+    estado: el de PuLP ('Optimal', 'Infeasible', ...) o 'Feasible' si el
+    solver paró por límite de tiempo con una solución entera (la mejor
+    encontrada, sin demostrar optimalidad). Con 'gap_rel' el solver da
+    'Optimal' al entrar en el gap: solo se mantiene si la cota demuestra
+    el óptimo; si no, 'Feasible' (no se guarda en caché ni sirve de
+    deducción en el barrido).
+    estadísticas: { "backend", "threads", "nodes", "best_bound", "gap", "wall_time" }
+    ("threads": hilos pedidos al solver; None = valor por defecto del solver)
+
+    'gap_abs': gap absoluto para parar (INTEGRAL_GAP_ABS si el objetivo es entero).
+    """
+    import pulp
+
+    options = solver_options(options)
+    log_path = None
+    if options["backend"] == "cbc":
+        fd, log_path = tempfile.mkstemp(prefix="cbc_", suffix=".log")
+        os.close(fd)
+
+    start = time.perf_counter()
+    try:
+        model.solve(make_solver(options, warm_start=warm_start, log_path=log_path, mip=mip, gap_abs=gap_abs))
+        wall_time = time.perf_counter() - start
+        if log_path:
+            with open(log_path, encoding="utf-8", errors="replace") as fh:
+                stats = _parse_cbc_log(fh.read())
+        else:
+            stats = _highs_stats(model)
+    finally:
+        if log_path:
+            os.remove(log_path)
+
+    status = pulp.LpStatus[model.status]
+    if status == "Optimal" and model.sol_status == pulp.LpSolutionIntegerFeasible:
+        status = STATUS_FEASIBLE
+    elif status == "Optimal" and mip and options["gap_rel"]:
+        if not _proven_optimal(pulp.value(model.objective), stats["best_bound"], gap_abs):
+            status = STATUS_FEASIBLE
+
+    stats.update(backend=options["backend"], threads=options["threads"], wall_time=wall_time)
+    return status, stats
@@ -0,0 +1,180 @@
+"""
+Barrido de sensibilidad: plantilla mínima en una rejilla de demandas
+(sábado x domingo) sobre el mismo modelo de 'optimizer'.
+
+La plantilla mínima es monótona (no decreciente) en ambas demandas, y la
+infactibilidad también: si (a, b) es infactible lo es todo (a' >= a, b' >= b).
+Se aprovecha así:
+- Se resuelven las esquinas de cada caja de la rejilla. Si la esquina
+  inferior es infactible, toda la caja lo es; si ambas esquinas dan la
+  misma plantilla, toda la caja tiene ese valor. Si no, se divide en 4.
+- Cota por sándwich: en un punto interior, max(esquina inferior, cota
+  inferior) <= f <= esquina superior; si coinciden, no se resuelve. Se
+  prueba primero la cota cerrada ('headcount_lower_bound') y, si no basta,
+  la de la relajación LP con los máximos por tipo ('lp_lower_bound',
+  milisegundos sin PuLP).
+- Los puntos que sí hay que resolver se lanzan por oleadas en un pool de
+  procesos, con la solución de la esquina inferior como arranque en caliente.
+  La interfaz pasa el pool de 'SolveService' ('executor'); sin él se crea
+  uno propio de 'workers' procesos (lotes, benchmarks).
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from fast_path import lp_lower_bound
+from optimizer import headcount_lower_bound, solve_model
+
+# Cómo se obtuvo el valor de cada punto
+METHOD_SOLVED = "resuelto"
+METHOD_MONOTONE = "monotonía"
+METHOD_BOUND = "cota"
+METHOD_LP_BOUND = "cota LP"
+
+
+def _solve_point(args):
+    """Resuelve un punto de la rejilla (se ejecuta en un proceso del pool)."""
+    point, demanda_sabado, demanda_domingo, employee_types_data, warm_start, solver_options = args
+    result = solve_model(demanda_sabado, demanda_domingo, employee_types_data, warm_start=warm_start,
+                         solver_options=solver_options)
+    objective = int(round(result["objective"])) if result["status"] == "Optimal" else None
+    return point, result["status"], objective, result["x"]
+
+
+def _split(box):
+    """Divide una caja (i0, i1, j0, j1) en hasta 4 subcajas disjuntas."""
+    i0, i1, j0, j1 = box
+    im, jm = (i0 + i1) // 2, (j0 + j1) // 2
+    i_ranges = [(i0, im), (im + 1, i1)] if i1 > i0 else [(i0, i1)]
+    j_ranges = [(j0, jm), (jm + 1, j1)] if j1 > j0 else [(j0, j1)]
+    return [(a, b, c, d) for a, b in i_ranges for c, d in j_ranges]
+
+
+def demand_sweep(sat_values, sun_values, employee_types_data, workers=None, progress=None, solver_options=None,
+                 executor=None):
+    """
+    Plantilla mínima para cada (demanda_sabado, demanda_domingo) de la rejilla.
+
+    'solver_options' se aplica a cada punto resuelto (ver 'solvers.DEFAULT_SOLVER_OPTIONS').
+
+    'executor' (opcional): pool de procesos ya creado en el que resolver
+    los puntos (no se cierra al terminar). Sin él se usa un pool propio de
+    'workers' procesos, o ninguno si 'workers' es 1.
+
+    'progress' (opcional) se llama con (puntos_resueltos_o_deducidos, total).
+
+    Devuelve un DataFrame largo con columnas:
+    demanda_sabado, demanda_domingo, estado, plantilla_minima, metodo
+    """
+    sat_values = sorted(set(int(v) for v in sat_values))
+    sun_values = sorted(set(int(v) for v in sun_values))
+    total_points = len(sat_values) * len(sun_values)
+    workers = workers or os.cpu_count() or 1
+    own_executor = executor is None and workers > 1
+
+    values = {}     # (i, j) -> (estado, plantilla, método)
+    solutions = {}  # (i, j) -> x (para arranques en caliente)
+    boxes = [(0, len(sat_values) - 1, 0, len(sun_values) - 1)] if total_points else []
+
+    if own_executor:
+        # 'spawn': un proceso con hilos (p. ej. un servidor) no puede usar 'fork' con seguridad
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    try:
+        while boxes:
+            # 1. Resolver (en paralelo) las esquinas aún desconocidas
+            pending = {}
+            for i0, i1, j0, j1 in boxes:
+                for corner in ((i0, j0), (i1, j1)):
+                    if corner not in values and corner not in pending:
+                        pending[corner] = _warm_start_for(corner, solutions)
+            tasks = [
+                (point, sat_values[point[0]], sun_values[point[1]], employee_types_data, warm_start, solver_options)
+                for point, warm_start in pending.items()
+            ]
+            solved = executor.map(_solve_point, tasks) if executor else map(_solve_point, tasks)
+            for point, status, objective, x in solved:
+                values[point] = (status, objective, METHOD_SOLVED)
+                if status == "Optimal":
+                    solutions[point] = x
+
+            # 2. Rellenar por monotonía / cota o dividir
+            next_boxes = []
+            for box in boxes:
+                i0, i1, j0, j1 = box
+                lo_status, lo_value, _ = values[(i0, j0)]
+                hi_status, hi_value, _ = values[(i1, j1)]
+                if lo_status == "Infeasible":
+                    _fill(values, box, ("Infeasible", None, METHOD_MONOTONE))
+                elif lo_status == "Optimal" and hi_status == "Optimal" and lo_value == hi_value:
+                    _fill(values, box, ("Optimal", lo_value, METHOD_MONOTONE))
+                elif (i0, j0) != (i1, j1):
+                    # Solo una esquina inferior óptima es cota inferior (una 'Feasible' es cota superior)
+                    if lo_status == "Optimal" and hi_status == "Optimal":
+                        _fill_by_bound(values, box, lo_value, hi_value, sat_values, sun_values, employee_types_data)
+                    next_boxes.extend(
+                        sub for sub in _split(box)
+                        if any((i, j) not in values for i in range(sub[0], sub[1] + 1) for j in range(sub[2], sub[3] + 1))
+                    )
+            boxes = next_boxes
+
+            if progress:
+                progress(len(values), total_points)
+    finally:
+        if own_executor:
+            executor.shutdown()
+
+    rows = []
+    for (i, j), (status, objective, method) in sorted(values.items()):
+        rows.append({
+            "demanda_sabado": sat_values[i],
+            "demanda_domingo": sun_values[j],
+            "estado": status,
+            "plantilla_minima": objective,
+            "metodo": method,
+        })
+    df = pd.DataFrame(rows, columns=["demanda_sabado", "demanda_domingo", "estado", "plantilla_minima", "metodo"])
+    df["plantilla_minima"] = df["plantilla_minima"].astype("Int64")
+    return df
+
+
+def _warm_start_for(point, solutions):
+    """Solución resuelta más cercana por debajo-izquierda del punto (o None)."""
+    i, j = point
+    candidates = [(pi, pj) for pi, pj in solutions if pi <= i and pj <= j]
+    if not candidates:
+        return None
+    return solutions[max(candidates, key=lambda p: p[0] + p[1])]
+
+
+def _fill(values, box, value):
+    i0, i1, j0, j1 = box
+    for i in range(i0, i1 + 1):
+        for j in range(j0, j1 + 1):
+            values.setdefault((i, j), value)
+
+
+def _fill_by_bound(values, box, lo_value, hi_value, sat_values, sun_values, employee_types_data):
+    """
+    Cota por sándwich: si max(esquina inferior, cota) == esquina superior, el
+    punto vale eso. Primero la cota cerrada; si no basta, la de la relajación LP.
+    """
+    i0, i1, j0, j1 = box
+    for i in range(i0, i1 + 1):
+        for j in range(j0, j1 + 1):
+            if (i, j) in values:
+                continue
+            bound = headcount_lower_bound(sat_values[i], sun_values[j], employee_types_data)
+            if max(lo_value, bound) >= hi_value:
+                values[(i, j)] = ("Optimal", hi_value, METHOD_BOUND)
+                continue
+            # Factible (está por debajo de la esquina superior óptima): la relajación también lo es
+            lp_bound = lp_lower_bound(sat_values[i], sun_values[j], employee_types_data)
+            if max(lo_value, lp_bound["bound"]) >= hi_value:
+                values[(i, j)] = ("Optimal", hi_value, METHOD_LP_BOUND)
+
+
+def sweep_pivot(df):
+    """Tabla sábado x domingo con la plantilla mínima (NaN = infactible)."""
+    return df.pivot(index="demanda_sabado", columns="demanda_domingo", values="plantilla_minima")
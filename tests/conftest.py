@@ -0,0 +1,41 @@
+import os
+import sys
+
+# Los módulos viven en la raíz del repositorio (sin paquete), como en 'benchmarks'
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from patterns import WEEKS, column_groups_for, patterns_for_services  # noqa: E402
+
+
+def random_instance(rng, max_types=2, services=(3, 4), patterns=(1, None), max_employees=(10, 150),
+                    max_count=8, slack=0):
+    """
+    Instancia aleatoria con demanda alcanzable para los tests cruzados.
+
+    1..'max_types' tipos (A, B, ...), cada uno con un nº de servicios de
+    'services', entre patterns[0] y patterns[1] distribuciones (None =
+    todas las de ese nº) y un máximo en el rango 'max_employees'. La
+    demanda es la cobertura de una plantilla aleatoria (0..'max_count'
+    empleados en cada columna de 'column_groups_for') menos 0..'slack' por
+    fila: hay solución si la plantilla cabe en los máximos.
+
+    Devuelve (demanda_sabado, demanda_domingo, employee_types_data).
+    """
+    employee_types_data = {}
+    for type_name in "ABC"[:rng.randint(1, max_types)]:
+        options = patterns_for_services(rng.choice(services))
+        low, high = patterns
+        high = len(options) if high is None else min(high, len(options))
+        employee_types_data[type_name] = {
+            "max_employees": rng.randint(*max_employees),
+            "selected_patterns": rng.sample(options, rng.randint(low, high)),
+        }
+    demand = [[0] * len(WEEKS), [0] * len(WEEKS)]
+    for groups in column_groups_for(employee_types_data).values():
+        for vector, _ in groups:
+            n = rng.randint(0, max_count)
+            for week_idx, days in enumerate(vector):
+                for day in (0, 1):
+                    demand[day][week_idx] += n * days[day]
+    demanda_sabado, demanda_domingo = ([max(0, n - rng.randint(0, slack)) for n in day] for day in demand)
+    return demanda_sabado, demanda_domingo, employee_types_data
@@ -0,0 +1,48 @@
+"""Vía rápida exacta frente al MIP en instancias aleatorias."""
+import random
+
+import pytest
+
+from conftest import random_instance
+from fast_path import fast_path_eligible, fast_result
+from optimizer import solve_model
+from patterns import WEEKS
+
+
+def fast_instance(seed):
+    """
+    1 o 2 tipos. En las semillas pares la demanda es alcanzable
+    ('random_instance'); en las impares es libre y suele pedir días que
+    los patrones no cubren (infactible).
+    """
+    rng = random.Random(seed)
+    demanda_sabado, demanda_domingo, employee_types_data = random_instance(rng, services=(2, 3, 4), slack=5)
+    if seed % 2:
+        demanda_sabado = [rng.randint(0, 25) for _ in WEEKS]
+        demanda_domingo = [rng.randint(0, 25) for _ in WEEKS]
+    return demanda_sabado, demanda_domingo, employee_types_data
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_fast_path_matches_mip(seed):
+    demanda_sabado, demanda_domingo, employee_types_data = fast_instance(seed)
+    assert fast_path_eligible(employee_types_data)
+    fast, _, _ = fast_result(demanda_sabado, demanda_domingo, employee_types_data)
+    mip = solve_model(demanda_sabado, demanda_domingo, employee_types_data, method="mip")
+    if fast is None:
+        # Sin certificado "auto" resuelve el MIP arrancando con el incumbente de la vía rápida
+        fast = solve_model(demanda_sabado, demanda_domingo, employee_types_data, method="auto")
+
+    assert fast["status"] == mip["status"]
+    assert fast["objective"] == mip["objective"]
+    if fast["status"] == "Optimal":
+        for type_name, data in employee_types_data.items():
+            assert fast["N"][type_name] <= data["max_employees"]
+        for day, demand in (("sat", demanda_sabado), ("sun", demanda_domingo)):
+            assert all(fast["coverage"][day][week] >= n for week, n in zip(WEEKS, demand))
+
+
+def test_fast_path_certifies_most_instances():
+    """La vía rápida debe responder la mayoría de instancias de 1-2 tipos (si no, no ahorra nada)."""
+    certified = sum(fast_result(*fast_instance(seed))[0] is not None for seed in range(40))
+    assert certified >= 20
@@ -0,0 +1,55 @@
+"""Conjunto mínimo de patrones frente a la enumeración de subconjuntos."""
+import itertools
+import random
+
+import pytest
+
+from conftest import random_instance
+from optimizer import solve_model
+from pattern_search import minimum_pattern_set
+
+
+def brute_force(demanda_sabado, demanda_domingo, employee_types_data):
+    """{ nº de patrones: plantilla óptima con ese subconjunto } resolviendo cada subconjunto por separado."""
+    options = [
+        [(type_name, combo) for size in range(len(data["selected_patterns"]) + 1)
+         for combo in itertools.combinations(data["selected_patterns"], size)]
+        for type_name, data in employee_types_data.items()
+    ]
+    best = {}
+    for choice in itertools.product(*options):
+        subset = {type_name: dict(employee_types_data[type_name], selected_patterns=list(combo))
+                  for type_name, combo in choice if combo}
+        if not subset:
+            continue
+        result = solve_model(demanda_sabado, demanda_domingo, subset)
+        if result["status"] == "Optimal":
+            count = sum(len(combo) for _, combo in choice)
+            best[count] = min(best.get(count, result["objective"]), result["objective"])
+    return best
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_minimum_pattern_set_matches_brute_force(seed):
+    # 2-4 patrones por tipo: la enumeración de subconjuntos sigue siendo pequeña
+    demanda_sabado, demanda_domingo, employee_types_data = random_instance(
+        random.Random(seed), patterns=(2, 4), max_employees=(200, 200), max_count=5,
+    )
+    search = minimum_pattern_set(demanda_sabado, demanda_domingo, employee_types_data)
+    best = brute_force(demanda_sabado, demanda_domingo, employee_types_data)
+
+    optimal_headcount = min(best.values())
+    assert search["status"] == "Optimal"
+    assert search["optimal_headcount"] == optimal_headcount
+    assert search["pattern_count"] == min(count for count, headcount in best.items() if headcount == optimal_headcount)
+    assert search["result"]["objective"] == optimal_headcount
+
+    # Curva: con k patrones como máximo, la mejor plantilla de los subconjuntos de tamaño <= k
+    for point in search["tradeoff"]:
+        feasible = [headcount for count, headcount in best.items() if count <= point["max_patterns"]]
+        if feasible:
+            assert point["status"] == "Optimal"
+            assert point["headcount"] == min(feasible)
+            assert point["pattern_count"] <= point["max_patterns"]
+        else:
+            assert point["status"] == "Infeasible"
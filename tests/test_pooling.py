@@ -0,0 +1,89 @@
+"""Descomposición por sedes ('pooling') frente al MIP conjunto."""
+import random
+
+import pytest
+
+from patterns import patterns_for_services
+from pooling import solve_pooled
+
+POOLED_TYPES = ("F", "G")
+
+
+def random_sites(num_sites, seed):
+    """Sedes como las de 'benchmarks/bench_pooling.py': un tipo local, dos compartidos y uno de pocos servicios."""
+    rng = random.Random(seed)
+    scenarios = []
+    for i in range(num_sites):
+        four, few = patterns_for_services(4), patterns_for_services(rng.choice([2, 3]))
+        employee_types_data = {
+            "A": {"max_employees": rng.randint(3, 25), "selected_patterns": rng.sample(four, rng.randint(1, 3))},
+            "F": {"max_employees": 40, "selected_patterns": four},
+            "G": {"max_employees": 30, "selected_patterns": rng.sample(four, 4)},
+            "B": {"max_employees": rng.randint(20, 40), "selected_patterns": rng.sample(few, rng.randint(1, len(few)))},
+        }
+        scenarios.append((
+            f"S{i}",
+            [rng.randint(2, 18) for _ in range(4)],
+            [rng.randint(2, 18) for _ in range(4)],
+            employee_types_data,
+        ))
+    return scenarios
+
+
+def tight_pools(scenarios, fraction):
+    """Bolsas que limitan: una fracción de lo que usan las sedes resueltas por separado."""
+    isolated = solve_pooled(scenarios, {type_name: 10 ** 6 for type_name in POOLED_TYPES}, workers=1)
+    return {type_name: int(used * fraction) for type_name, used in isolated["pool_usage"].items()}
+
+
+def check_plans(result, scenarios, pools):
+    """Cada plan cubre la demanda de su sede y respeta sus máximos; la suma cabe en las bolsas."""
+    usage = {type_name: 0 for type_name in pools}
+    for sede, demanda_sabado, demanda_domingo, employee_types_data in scenarios:
+        plan = result["sites"][sede]
+        for day, demand in (("sat", demanda_sabado), ("sun", demanda_domingo)):
+            assert all(plan["coverage"][day][w] >= n for w, n in zip(sorted(plan["coverage"][day]), demand))
+        for type_name, data in employee_types_data.items():
+            assert plan["N"][type_name] <= data["max_employees"]
+            if type_name in usage:
+                usage[type_name] += plan["N"][type_name]
+    assert all(usage[type_name] <= limit for type_name, limit in pools.items())
+    assert result["objective"] == sum(plan["objective"] for plan in result["sites"].values())
+
+
+@pytest.mark.parametrize("num_sites, seed, fraction", [
+    (10, 1, 0.8),  # el maestro entero restringido no cabe en las bolsas
+    (6, 2, 0.8),
+    (6, 3, 0.7),
+    (8, 4, 0.9),
+    (8, 5, 0.6),   # bolsas demasiado pequeñas: las dos vías dan 'Infeasible'
+    (12, 7, 0.8),
+])
+def test_decomposition_matches_monolithic(num_sites, seed, fraction):
+    scenarios = random_sites(num_sites, seed)
+    pools = tight_pools(scenarios, fraction)
+
+    decomposition = solve_pooled(scenarios, pools, workers=1)
+    monolithic = solve_pooled(scenarios, pools, method="monolithic")
+
+    assert monolithic["status"] in ("Optimal", "Infeasible")
+    assert (decomposition["status"], decomposition["objective"]) == (monolithic["status"], monolithic["objective"])
+    if decomposition["status"] == "Optimal":
+        check_plans(decomposition, scenarios, pools)
+
+
+def test_pools_too_small_are_infeasible():
+    scenarios = random_sites(4, 11)
+    # Sin empleados compartidos y con tipos locales que no bastan
+    for _, _, _, employee_types_data in scenarios:
+        employee_types_data["A"]["max_employees"] = 0
+        employee_types_data["B"]["max_employees"] = 0
+    pools = {type_name: 0 for type_name in POOLED_TYPES}
+
+    assert solve_pooled(scenarios, pools, workers=1)["status"] == "Infeasible"
+    assert solve_pooled(scenarios, pools, method="monolithic")["status"] == "Infeasible"
+
+
+def test_unknown_pool_type_is_rejected():
+    with pytest.raises(ValueError):
+        solve_pooled(random_sites(2, 0), {"Z": 3}, workers=1)
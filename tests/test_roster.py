@@ -0,0 +1,61 @@
+"""El roster asignado ocupa todas las plazas de la solución y mantiene su cobertura."""
+import random
+
+import pandas as pd
+import pytest
+
+from conftest import random_instance
+from optimizer import solve_model
+from patterns import WEEKS, get_pattern_registry
+from roster import UNASSIGNED_LABEL, VACANCY_PREFIX, assign_roster
+
+WORKS_SATURDAY = {"Finde Completo", "Sábado"}
+WORKS_SUNDAY = {"Finde Completo", "Domingo"}
+
+
+def random_roster(employee_types_data, N, rng):
+    """Por tipo, menos, tantos o más empleados que plazas, con preferencias aleatorias (a veces vacías)."""
+    labels = get_pattern_registry().labels
+    rows = []
+    for type_name in employee_types_data:
+        size = max(0, N[type_name] + rng.choice([-5, -1, 0, 0, 3]))
+        for i in range(size):
+            rows.append({
+                "id_empleado": f"{type_name}{i}",
+                "nombre": None,
+                "tipo": type_name,
+                "descanso_anterior": rng.choice([0, 1, 2, 3, 4]),
+                "patron_preferido": rng.choice([pd.NA, rng.choice(labels)]),
+                "descanso_preferido": rng.choice([0, 1, 2, 3, 4]),
+            })
+    return pd.DataFrame(rows, columns=["id_empleado", "nombre", "tipo", "descanso_anterior",
+                                       "patron_preferido", "descanso_preferido"]).astype({"patron_preferido": "string"})
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_roster_fills_every_slot(seed):
+    rng = random.Random(seed)
+    demanda_sabado, demanda_domingo, employee_types_data = random_instance(
+        rng, max_types=3, patterns=(2, 2), max_employees=(200, 200), max_count=6, slack=3,
+    )
+    result = solve_model(demanda_sabado, demanda_domingo, employee_types_data)
+    assert result["status"] == "Optimal"
+    roster = random_roster(employee_types_data, result["N"], rng)
+
+    df, summary = assign_roster(roster, result["x"], employee_types_data)
+
+    slots = df[df["Patrón Asignado"] != UNASSIGNED_LABEL]
+    employees = df[~df["ID Empleado"].str.startswith(VACANCY_PREFIX)]
+    # Cada empleado aparece una vez; las plazas (asignadas + vacantes) son las de la solución
+    assert sorted(employees["ID Empleado"]) == sorted(roster["id_empleado"])
+    for type_name in employee_types_data:
+        n_employees = int((roster["tipo"] == type_name).sum())
+        assert (slots["Tipo"] == f"Tipo {type_name}").sum() == result["N"][type_name]
+        row = summary.set_index("tipo").loc[type_name]
+        assert row["asignados"] == min(n_employees, result["N"][type_name])
+        assert row["asignados"] + row["vacantes"] == result["N"][type_name]
+    # Repartir dentro de una clase de simetría no cambia la cobertura
+    for week in WEEKS:
+        column = slots[f"Semana {week}"].astype(str)
+        assert column.isin(WORKS_SATURDAY).sum() == result["coverage"]["sat"][week]
+        assert column.isin(WORKS_SUNDAY).sum() == result["coverage"]["sun"][week]